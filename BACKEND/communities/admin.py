@@ -1,4 +1,5 @@
 from django.contrib import admin
+from social_feed_prj.admin import AutocompleteListFilter, LargeTableAdmin
 from .models import Community, CommunityMember
 
 
@@ -6,23 +7,27 @@ from .models import Community, CommunityMember
 class CommunityAdmin(admin.ModelAdmin):
     list_display = ('name', 'created_by', 'created_at', 'member_count_display', 'post_count_display')
     list_filter = ('created_at',)
+    list_select_related = ('created_by',)
     search_fields = ('name', 'description', 'created_by__username')
+    autocomplete_fields = ('created_by',)
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
     
+    @admin.display(description='Members', ordering='member_count')
     def member_count_display(self, obj):
         return obj.get_member_count()
-    member_count_display.short_description = 'Members'
     
+    @admin.display(description='Posts', ordering='post_count')
     def post_count_display(self, obj):
         return obj.get_post_count()
-    post_count_display.short_description = 'Posts'
 
 
 @admin.register(CommunityMember)
-class CommunityMemberAdmin(admin.ModelAdmin):
+class CommunityMemberAdmin(LargeTableAdmin):
     list_display = ('user', 'community', 'joined_at')
-    list_filter = ('joined_at', 'community')
+    list_filter = ('joined_at', ('community', AutocompleteListFilter))
+    list_select_related = ('user', 'community')
     search_fields = ('user__username', 'community__name')
+    autocomplete_fields = ('user', 'community')
     readonly_fields = ('joined_at',)
     ordering = ('-joined_at',)
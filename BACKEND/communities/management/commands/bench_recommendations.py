@@ -0,0 +1,92 @@
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from communities import recommendations
+from communities.models import Community, CommunityMember
+from social_feed_prj.benchmark import isolated_database, measure, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark building the co-membership matrix for synthetic users whose '
+        'memberships follow a Zipf distribution, and the recommendations API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--communities', type=int, default=10_000)
+        parser.add_argument('--memberships-per-user', type=int, default=8,
+                            help='Mean; each user joins between 1 and twice this many.')
+        parser.add_argument('--engine', choices=recommendations.ENGINES, action='append',
+                            help='Engines to time (repeatable); defaults to every installed one.')
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        engines = options['engine'] or [
+            engine for engine in recommendations.ENGINES
+            if engine != 'scipy' or recommendations.sparse is not None
+        ]
+        with isolated_database():
+            self.seed(random.Random(options['seed']), options)
+            self.stdout.write(f"\n{'build':<24} {'compute s':>10} {'total s':>9} {'rows':>9}")
+            for engine in engines:
+                self.bench_build(engine)
+            self.bench_api(options['repeat'])
+
+    def seed(self, rng, options):
+        self.stdout.write(
+            f"Seeding {options['users']} users and {options['communities']} communities..."
+        )
+        users = User.objects.bulk_create(
+            [User(username=f'user{i}') for i in range(options['users'])], batch_size=10_000
+        )
+        communities = Community.objects.bulk_create([
+            Community(name=f'Community {i}', description='', created_by=users[i % len(users)])
+            for i in range(options['communities'])
+        ], batch_size=10_000)
+        # Zipf: the community at rank r is joined with weight 1 / r
+        cum_weights = list(accumulate(1 / rank for rank in range(1, len(communities) + 1)))
+        mean = options['memberships_per_user']
+        total, batch = 0, []
+        for user in users:
+            joined = set(rng.choices(communities, cum_weights=cum_weights, k=rng.randint(1, 2 * mean)))
+            batch.extend(CommunityMember(user=user, community=community) for community in joined)
+            if len(batch) >= 20_000:
+                CommunityMember.objects.bulk_create(batch)
+                total, batch = total + len(batch), []
+        CommunityMember.objects.bulk_create(batch)
+        self.stdout.write(f'{total + len(batch)} memberships.')
+        self.reader = users[0]
+
+    def bench_build(self, engine):
+        compute = getattr(recommendations, f'affinities_{engine}')
+        start = time.perf_counter()
+        entries = sum(1 for _ in compute(recommendations.memberships(), recommendations.get_neighbors()))
+        compute_s = time.perf_counter() - start
+        start = time.perf_counter()
+        rows = recommendations.build(engine)
+        total_s = time.perf_counter() - start
+        assert rows == entries
+        self.stdout.write(f'{engine:<24} {compute_s:>10.2f} {total_s:>9.2f} {rows:>9}')
+
+    def bench_api(self, repeat):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+
+        def run():
+            return client.get('/api/communities/recommended/')
+
+        self.stdout.write(f"\n{'GET /api/communities/recommended/':<34} {'p50 ms':>9} {'p95 ms':>9}")
+        with override_settings(FEED_CACHE_ENABLED=False):
+            self.report('uncached', summarize(measure(run, repeat)))
+        self.report('cached', summarize(measure(run, repeat)))
+
+    def report(self, label, summary):
+        self.stdout.write(f"{label:<34} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from communities import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the community co-membership matrix (CommunityAffinity) that '
+        'backs /api/communities/recommended/, and drop cached recommendations.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engine', choices=recommendations.ENGINES,
+                            help='Defaults to scipy when installed, else python.')
+        parser.add_argument('--neighbors', type=int,
+                            help='Affinities kept per community (RECOMMENDATION_NEIGHBORS).')
+
+    def handle(self, *args, **options):
+        engine = options['engine'] or recommendations.default_engine()
+        start = time.perf_counter()
+        try:
+            rows = recommendations.build(engine, options['neighbors'])
+        except ImportError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} affinities with the {engine} engine '
+            f'in {time.perf_counter() - start:.2f}s.'
+        ))
@@ -0,0 +1,77 @@
+"""
+Per-request membership resolver.
+
+The viewer's community ids are loaded with one query the first time any
+permission check needs them and memoized on the underlying HttpRequest, so
+serializers, views and overlays in the same request share a single lookup.
+"""
+from .models import CommunityMember
+
+CACHE_ATTR = '_community_ids'
+
+
+def _http_request(request):
+    # DRF's Request wraps the HttpRequest; memoize on the shared inner object
+    return getattr(request, '_request', request)
+
+
+def community_ids(request):
+    """Return the frozenset of community ids the request user belongs to."""
+    http_request = _http_request(request)
+    ids = getattr(http_request, CACHE_ATTR, None)
+    if ids is None:
+        user = request.user
+        if user.is_authenticated:
+            ids = frozenset(
+                CommunityMember.objects.filter(user=user)
+                .order_by()
+                .values_list('community_id', flat=True)
+            )
+        else:
+            ids = frozenset()
+        setattr(http_request, CACHE_ATTR, ids)
+    return ids
+
+
+async def acommunity_ids(request):
+    """community_ids for async views, loaded with the async ORM."""
+    http_request = _http_request(request)
+    ids = getattr(http_request, CACHE_ATTR, None)
+    if ids is None:
+        user = request.user
+        if user.is_authenticated:
+            ids = frozenset([
+                community_id async for community_id in
+                CommunityMember.objects.filter(user=user)
+                .order_by()
+                .values_list('community_id', flat=True)
+            ])
+        else:
+            ids = frozenset()
+        setattr(http_request, CACHE_ATTR, ids)
+    return ids
+
+
+def to_id(community_id):
+    try:
+        return int(community_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_member(request, community_id):
+    """Check if the request user is a member of the community."""
+    community_id = to_id(community_id)
+    return community_id is not None and community_id in community_ids(request)
+
+
+async def ais_member(request, community_id):
+    community_id = to_id(community_id)
+    return community_id is not None and community_id in await acommunity_ids(request)
+
+
+def forget(request):
+    """Drop the memoized ids after the request itself changes a membership."""
+    http_request = _http_request(request)
+    if hasattr(http_request, CACHE_ATTR):
+        delattr(http_request, CACHE_ATTR)
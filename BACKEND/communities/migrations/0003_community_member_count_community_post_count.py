@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_member_count(apps, schema_editor):
+    Community = apps.get_model('communities', 'Community')
+    CommunityMember = apps.get_model('communities', 'CommunityMember')
+    members = CommunityMember.objects.filter(
+        community=OuterRef('pk')
+    ).order_by().values('community').annotate(total=Count('pk')).values('total')
+    Community.objects.update(member_count=Coalesce(Subquery(members), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0002_communitymember_communities_joined__6de397_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='community',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_member_count, migrations.RunPython.noop),
+    ]
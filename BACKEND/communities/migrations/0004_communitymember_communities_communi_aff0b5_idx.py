@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0003_community_member_count_community_post_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitymember',
+            index=models.Index(fields=['community', '-joined_at'], name='communities_communi_aff0b5_idx'),
+        ),
+    ]
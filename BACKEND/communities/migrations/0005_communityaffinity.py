@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0004_communitymember_communities_communi_aff0b5_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityAffinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shared_members', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='affinities', to='communities.community')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='affinities_from', to='communities.community')),
+            ],
+            options={
+                'verbose_name_plural': 'Community affinities',
+                'unique_together': {('community', 'related')},
+            },
+        ),
+    ]
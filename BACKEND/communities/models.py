@@ -2,6 +2,14 @@ from django.db import models
 from django.contrib.auth.models import User
 
 
+def saved_fields(instance, counter_fields):
+    """The fields an update of `instance` writes: all but its counters."""
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in counter_fields
+    ]
+
+
 class Community(models.Model):
     """
     Represents a community created by a user.
@@ -14,6 +22,12 @@ class Community(models.Model):
         on_delete=models.CASCADE,
         related_name='created_communities'
     )
+    # Written only by F() updates, never by save() (see save)
+    COUNTER_FIELDS = ('member_count', 'post_count')
+
+    # Denormalized counters maintained by communities.signals / posts.signals
+    member_count = models.PositiveIntegerField(default=0, editable=False)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name_plural = 'Communities'
@@ -23,18 +37,21 @@ class Community(models.Model):
         return self.name
 
     def get_member_count(self):
-        """Return the number of members in this community."""
-        return self.members.count()
+        """Return the number of members in this community (stored counter)."""
+        return self.member_count
 
     def get_post_count(self):
-        """Return the number of posts in this community."""
-        return self.posts.count()
+        """Return the number of posts in this community (stored counter)."""
+        return self.post_count
 
     def save(self, *args, **kwargs):
         """
-        Override save to automatically add creator as a member.
+        Override save to automatically add creator as a member. Updates
+        leave the counters alone, like Post.save.
         """
         is_new = self.pk is None
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = saved_fields(self, self.COUNTER_FIELDS)
         super().save(*args, **kwargs)
         
         if is_new:
@@ -64,7 +81,38 @@ class CommunityMember(models.Model):
         ordering = ['-joined_at']
         indexes = [
             models.Index(fields=['-joined_at']),
+            models.Index(fields=['community', '-joined_at']),
         ]
 
     def __str__(self):
         return f"{self.user.username} - {self.community.name}"
+
+
+class CommunityAffinity(models.Model):
+    """
+    One entry of the precomputed co-membership matrix: how strongly members
+    of `community` also belong to `related`. Only each community's strongest
+    neighbours are kept; rows are rebuilt in batch by
+    ``manage.py build_recommendations`` (see communities.recommendations).
+    """
+    community = models.ForeignKey(
+        Community,
+        on_delete=models.CASCADE,
+        related_name='affinities'
+    )
+    related = models.ForeignKey(
+        Community,
+        on_delete=models.CASCADE,
+        related_name='affinities_from'
+    )
+    # Members of both communities
+    shared_members = models.PositiveIntegerField()
+    # Cosine similarity of the two member sets
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = 'Community affinities'
+        unique_together = ('community', 'related')
+
+    def __str__(self):
+        return f"{self.community_id} -> {self.related_id} ({self.score:.3f})"
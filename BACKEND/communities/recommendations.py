@@ -0,0 +1,176 @@
+"""
+Community recommendations from co-membership.
+
+Two communities are similar when their member sets overlap: the affinity of
+A and B is the cosine similarity ``shared / sqrt(|A| * |B|)``, which keeps the
+largest communities from being everyone's nearest neighbour. The full
+community x community matrix is built in batch from CommunityMember and only
+each community's RECOMMENDATION_NEIGHBORS strongest neighbours are stored as
+CommunityAffinity rows, so it stays sparse.
+
+A user's recommendations sum the affinities of the communities they belong
+to, excluding those they already joined: an indexed aggregate over at most
+RECOMMENDATION_NEIGHBORS rows per joined community, cached per user for
+RECOMMENDATION_CACHE_TIMEOUT seconds.
+
+With SciPy installed the matrix is computed as ``M.T @ M`` over a sparse
+user x community incidence matrix, a block of communities at a time;
+otherwise by counting pairs per user in pure Python.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from social_feed_prj import cache as feed_cache
+from .models import Community, CommunityAffinity, CommunityMember
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover - optional dependency
+    np = sparse = None
+
+ENGINES = ('scipy', 'python')
+CHUNK_SIZE = 20000
+BLOCK_SIZE = 1000
+
+
+def get_neighbors():
+    return getattr(settings, 'RECOMMENDATION_NEIGHBORS', 50)
+
+
+def get_timeout():
+    return getattr(settings, 'RECOMMENDATION_CACHE_TIMEOUT', 3600)
+
+
+def default_engine():
+    return 'scipy' if sparse is not None else 'python'
+
+
+def memberships():
+    """Every ``(user_id, community_id)`` pair, grouped by user."""
+    return CommunityMember.objects.order_by('user_id').values_list(
+        'user_id', 'community_id'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+# Matrix builds; both yield (community_id, related_id, shared, score)
+
+def affinities_python(pairs, neighbors):
+    sizes = Counter()
+    shared = defaultdict(Counter)
+    for _, group in groupby(pairs, key=itemgetter(0)):
+        joined = [community_id for _, community_id in group]
+        sizes.update(joined)
+        for community_id in joined:
+            row = shared[community_id]
+            for related_id in joined:
+                if related_id != community_id:
+                    row[related_id] += 1
+    for community_id, row in shared.items():
+        size = sizes[community_id]
+        scored = (
+            (count / math.sqrt(size * sizes[related_id]), related_id, count)
+            for related_id, count in row.items()
+        )
+        for score, related_id, count in heapq.nlargest(neighbors, scored):
+            yield community_id, related_id, count, score
+
+
+def affinities_scipy(pairs, neighbors):
+    rows = np.fromiter(
+        (value for pair in pairs for value in pair), dtype=np.int64
+    ).reshape(-1, 2)
+    if not len(rows):
+        return
+    _, users = np.unique(rows[:, 0], return_inverse=True)
+    community_ids, communities = np.unique(rows[:, 1], return_inverse=True)
+    incidence = sparse.csc_matrix(
+        (np.ones(len(rows)), (users, communities)),
+        shape=(users.max() + 1, len(community_ids)),
+    )
+    sizes = np.asarray(incidence.sum(axis=0)).ravel()
+    incidence_t = incidence.T.tocsr()
+    # A block of rows at a time keeps the dense-ish product bounded in memory
+    for start in range(0, len(community_ids), BLOCK_SIZE):
+        block = (incidence_t[start:start + BLOCK_SIZE] @ incidence).tocsr()
+        for offset in range(block.shape[0]):
+            index = start + offset
+            begin, end = block.indptr[offset], block.indptr[offset + 1]
+            related, counts = block.indices[begin:end], block.data[begin:end]
+            keep = related != index
+            related, counts = related[keep], counts[keep]
+            scores = counts / np.sqrt(sizes[index] * sizes[related])
+            if len(scores) > neighbors:
+                top = np.argpartition(-scores, neighbors - 1)[:neighbors]
+                related, counts, scores = related[top], counts[top], scores[top]
+            for position in np.argsort(-scores, kind='stable'):
+                yield (
+                    int(community_ids[index]), int(community_ids[related[position]]),
+                    int(counts[position]), float(scores[position]),
+                )
+
+
+def build(engine=None, neighbors=None, batch_size=5000):
+    """
+    Replace every CommunityAffinity row with a fresh build from the current
+    memberships and drop cached recommendations. Returns the row count.
+    """
+    engine = engine or default_engine()
+    if engine == 'scipy' and sparse is None:
+        raise ImportError('The scipy engine needs numpy and scipy installed')
+    compute = affinities_scipy if engine == 'scipy' else affinities_python
+    entries = compute(memberships(), neighbors or get_neighbors())
+
+    total = 0
+    with transaction.atomic():
+        CommunityAffinity.objects.all().delete()
+        batch = []
+        for community_id, related_id, shared, score in entries:
+            batch.append(CommunityAffinity(
+                community_id=community_id, related_id=related_id,
+                shared_members=shared, score=score,
+            ))
+            if len(batch) >= batch_size:
+                CommunityAffinity.objects.bulk_create(batch)
+                total, batch = total + len(batch), []
+        CommunityAffinity.objects.bulk_create(batch)
+        total += len(batch)
+    feed_cache.invalidate(feed_cache.recommendations_scope())
+    return total
+
+
+# Reads
+
+def recommend(joined, limit):
+    """
+    Communities outside `joined` ranked by summed affinity to it, topped up
+    with the largest communities when there is too little signal (new users,
+    or before the first build). Each has a `score` attribute.
+    """
+    # Driven from the affinity side: at most NEIGHBORS rows per joined community
+    scores = dict(
+        CommunityAffinity.objects.filter(community__in=joined)
+        .exclude(related__in=joined)
+        .values('related_id')
+        .annotate(total=Sum('score'))
+        .order_by('-total', 'related_id')
+        .values_list('related_id', 'total')[:limit]
+    ) if joined else {}
+    if len(scores) < limit:
+        popular = Community.objects.exclude(pk__in=[*joined, *scores]).order_by('-member_count', 'id')
+        for community_id in popular.values_list('id', flat=True)[:limit - len(scores)]:
+            scores[community_id] = 0.0
+    communities = Community.objects.select_related('created_by').in_bulk(list(scores))
+    ranked = []
+    for community_id, score in scores.items():
+        if community_id in communities:
+            community = communities[community_id]
+            community.score = score
+            ranked.append(community)
+    return ranked
@@ -1,5 +1,9 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
+from social_feed_prj import lean
+from social_feed_prj.fieldsets import SparseFieldsMixin
+from . import membership
 from .models import Community, CommunityMember
 
 
@@ -14,8 +18,8 @@ class CommunityMemberSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'joined_at')
 
 
-class CommunitySerializer(serializers.ModelSerializer):
-    """Serializer for Community - list and detail views."""
+class CommunitySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer for Community - list views; ?fields= / ?omit= prune it."""
     created_by = serializers.StringRelatedField()
     created_by_id = serializers.IntegerField(source='created_by.id', read_only=True)
     member_count = serializers.IntegerField(read_only=True)
@@ -32,16 +36,39 @@ class CommunitySerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'created_by')
     
     def get_is_member(self, obj):
-        """Check if current user is a member."""
+        """Check if current user is a member (one lookup per request)."""
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return CommunityMember.objects.filter(
-                user=request.user,
-                community=obj
-            ).exists()
+        if request:
+            return membership.is_member(request, obj.pk)
         return False
 
 
+# CommunitySerializer's output, is_member left to the view (social_feed_prj.lean)
+COMMUNITY_PLAN = lean.Plan({
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'created_at': ('created_at', lean.datetime_format),
+    # User.__str__ is the username
+    'created_by': 'created_by__username',
+    'created_by_id': 'created_by_id',
+    'member_count': 'member_count',
+    'post_count': 'post_count',
+    'is_member': lean.Constant(False),
+})
+
+
+class RecommendedCommunitySerializer(CommunitySerializer):
+    """A recommended community with its summed co-membership affinity."""
+    score = serializers.SerializerMethodField()
+
+    class Meta(CommunitySerializer.Meta):
+        fields = CommunitySerializer.Meta.fields + ('score',)
+
+    def get_score(self, obj):
+        return round(obj.score or 0.0, 6)
+
+
 class CommunityCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating a new community."""
     class Meta:
@@ -50,13 +77,17 @@ class CommunityCreateSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class CommunityDetailSerializer(serializers.ModelSerializer):
-    """Detailed serializer for Community - includes members list."""
+class CommunityDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Detailed serializer for Community - includes a preview of the most
+    recently joined members. The full list is paginated at /members/.
+    ?fields= / ?omit= prune it.
+    """
     created_by = serializers.StringRelatedField()
     created_by_id = serializers.IntegerField(source='created_by.id', read_only=True)
     member_count = serializers.IntegerField(read_only=True)
     post_count = serializers.IntegerField(read_only=True)
-    members = CommunityMemberSerializer(many=True, read_only=True)
+    members_preview = serializers.SerializerMethodField()
     is_member = serializers.SerializerMethodField()
     
     class Meta:
@@ -64,16 +95,19 @@ class CommunityDetailSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'name', 'description', 'created_at', 
             'created_by', 'created_by_id', 'member_count', 
-            'post_count', 'members', 'is_member'
+            'post_count', 'members_preview', 'is_member'
         )
         read_only_fields = ('id', 'created_at', 'created_by')
     
+    def get_members_preview(self, obj):
+        """The most recently joined members, capped at COMMUNITY_MEMBERS_PREVIEW."""
+        limit = getattr(settings, 'COMMUNITY_MEMBERS_PREVIEW', 10)
+        members = obj.members.select_related('user').order_by('-joined_at', '-id')[:limit]
+        return CommunityMemberSerializer(members, many=True).data
+    
     def get_is_member(self, obj):
-        """Check if current user is a member."""
+        """Check if current user is a member (one lookup per request)."""
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return CommunityMember.objects.filter(
-                user=request.user,
-                community=obj
-            ).exists()
+        if request:
+            return membership.is_member(request, obj.pk)
         return False
@@ -0,0 +1,40 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from social_feed_prj import cache as feed_cache
+from .models import Community, CommunityMember
+
+
+def invalidate_community(community_id):
+    """Drop cached community list and detail payloads after a count change."""
+    feed_cache.invalidate(
+        feed_cache.communities_scope(),
+        feed_cache.community_scope(community_id)
+    )
+
+
+@receiver(post_save, sender=CommunityMember)
+def increment_member_count(sender, instance, created, **kwargs):
+    """Keep Community.member_count in sync when a membership is created."""
+    if created:
+        Community.objects.filter(pk=instance.community_id).update(
+            member_count=F('member_count') + 1
+        )
+        invalidate_community(instance.community_id)
+
+
+@receiver(post_delete, sender=CommunityMember)
+def decrement_member_count(sender, instance, **kwargs):
+    """Keep Community.member_count in sync when a membership is removed."""
+    Community.objects.filter(pk=instance.community_id, member_count__gt=0).update(
+        member_count=F('member_count') - 1
+    )
+    invalidate_community(instance.community_id)
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_delete, sender=Community)
+def invalidate_community_payloads(sender, instance, **kwargs):
+    """Community edits change the list, the detail and community_name in feeds."""
+    invalidate_community(instance.pk)
+    feed_cache.invalidate_feed(instance.pk)
@@ -1,3 +1,398 @@
-from django.test import TestCase
+import json
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import mock, skipIf
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from posts.management.commands.sync_replicas import copy_sqlite_database
+from social_feed_prj import instrumentation, routers
+from social_feed_prj.testing import QueryBudgetMixin, clear_caches
+from . import recommendations
+from .models import Community, CommunityAffinity, CommunityMember
 
-# Create your tests here.
+
+class CommunityTestCase(TestCase):
+    """Shared fixtures: a community with its creator and an outside user."""
+
+    def setUp(self):
+        clear_caches()
+        self.creator = User.objects.create_user(username='creator', password='pass12345')
+        self.visitor = User.objects.create_user(username='visitor', password='pass12345')
+        self.community = Community.objects.create(
+            name='Testers', description='A community for tests', created_by=self.creator
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.visitor)
+
+
+class MemberCountTests(CommunityTestCase):
+    """member_count is maintained on join and leave."""
+
+    def test_creator_is_counted(self):
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.member_count, 1)
+
+    def test_join_and_leave_update_counter(self):
+        self.client.post(f'/api/communities/{self.community.id}/join/')
+        response = self.client.get(f'/api/communities/{self.community.id}/')
+        self.assertEqual(response.data['member_count'], 2)
+
+        self.client.post(f'/api/communities/{self.community.id}/leave/')
+        response = self.client.get(f'/api/communities/{self.community.id}/')
+        self.assertEqual(response.data['member_count'], 1)
+
+
+class CommunityCacheTests(CommunityTestCase):
+    """Community payloads are cached and is_member is per viewer."""
+
+    def test_list_hit_overlays_membership(self):
+        creator_client = APIClient()
+        creator_client.force_authenticate(self.creator)
+        response = creator_client.get('/api/communities/')
+        self.assertTrue(response.data['results'][0]['is_member'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/communities/')
+        self.assertFalse(response.data['results'][0]['is_member'])
+
+    def test_detail_revalidates(self):
+        url = f'/api/communities/{self.community.id}/'
+        tag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post(f'/api/communities/{self.community.id}/join/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_member'])
+
+    def test_sparse_detail_skips_the_members_preview(self):
+        url = f'/api/communities/{self.community.id}/?fields=name,member_count'
+        # Generations are cached; the community row only, without its creator
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data, {'id': self.community.id, 'name': 'Testers', 'member_count': 1})
+
+    def test_sparse_list_keeps_is_member_overlay(self):
+        self.client.get('/api/communities/?fields=is_member')
+        response = self.client.get('/api/communities/?fields=is_member')
+        self.assertEqual(response.data['results'], [{'id': self.community.id, 'is_member': False}])
+
+    def test_stats_are_admin_only(self):
+        self.client.get('/api/communities/')
+        self.client.get('/api/communities/')
+        self.assertEqual(self.client.get('/api/cache/stats/').status_code, 403)
+
+        admin = User.objects.create_superuser(username='admin')
+        admin_client = APIClient()
+        admin_client.force_authenticate(admin)
+        stats = admin_client.get('/api/cache/stats/').data['kinds']['community-list']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+class IsMemberQueryCountTests(QueryBudgetMixin, CommunityTestCase):
+    """is_member is resolved once per request, not once per community."""
+
+    def setUp(self):
+        super().setUp()
+        # Real token authentication so the budget covers the user lookup
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.visitor)}')
+
+    def create_communities(self, count):
+        communities = Community.objects.bulk_create([
+            Community(name=f'Community {i}', description='', created_by=self.creator)
+            for i in range(Community.objects.count(), count)
+        ])
+        CommunityMember.objects.bulk_create([
+            CommunityMember(user=self.visitor, community=community)
+            for community in communities[::3]
+        ])
+
+    @override_settings(FEED_CACHE_ENABLED=False)
+    def test_list_cost_is_independent_of_rows(self):
+        query_counts = []
+        for count in (3, 20):
+            self.create_communities(count)
+            response = self.assertWithinQueryBudget('get', '/api/communities/')
+            self.assertEqual(len(response.data['results']), count)
+            query_counts.append(response.instrumentation.queries)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_is_member_per_community(self):
+        self.client.post(f'/api/communities/{self.community.id}/join/')
+        response = self.client.get(f'/api/communities/{self.community.id}/')
+        self.assertTrue(response.data['is_member'])
+        anonymous = APIClient().get('/api/communities/')
+        self.assertFalse(anonymous.data['results'][0]['is_member'])
+
+
+class MemberListTests(CommunityTestCase):
+    """Members are cursor paginated, previewed in detail and exportable."""
+
+    def setUp(self):
+        super().setUp()
+        users = User.objects.bulk_create([User(username=f'user{i}') for i in range(45)])
+        for user in users:
+            CommunityMember.objects.create(user=user, community=self.community)
+        self.url = f'/api/communities/{self.community.id}/members/'
+
+    def test_cursor_pages_cover_every_member(self):
+        usernames, url = [], self.url
+        while url:
+            response = self.client.get(url)
+            usernames += [member['username'] for member in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(usernames), 46)
+        self.assertEqual(usernames[0], 'user44')
+        self.assertEqual(usernames[-1], 'creator')
+        self.assertNotIn('count', response.data)
+
+    @override_settings(COMMUNITY_MEMBERS_PREVIEW=5)
+    def test_detail_carries_capped_preview(self):
+        response = self.client.get(f'/api/communities/{self.community.id}/')
+        self.assertNotIn('members', response.data)
+        self.assertEqual(
+            [member['username'] for member in response.data['members_preview']],
+            [f'user{i}' for i in range(44, 39, -1)]
+        )
+
+    @override_settings(EXPORT_CHUNK_SIZE=10)
+    def test_ndjson_export_streams_all_members(self):
+        response = self.client.get(self.url, {'export': 'ndjson'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 46)
+        self.assertEqual(set(rows[0]), {'id', 'user_id', 'username', 'joined_at'})
+
+
+class RecommendationTests(QueryBudgetMixin, CommunityTestCase):
+    """GET /api/communities/recommended/ ranks by co-membership."""
+
+    def setUp(self):
+        super().setUp()
+        self.close = self.make_community('Close')
+        self.far = self.make_community('Far')
+        self.unrelated = Community.objects.create(
+            name='Unrelated', description='', created_by=self.make_user('alone')
+        )
+        for i in range(4):
+            self.join(self.make_user(f'both-{i}'), self.community, self.close)
+        self.join(self.make_user('one'), self.community, self.far)
+        self.join(self.make_user('other'), self.unrelated)
+        self.join(self.visitor, self.community)
+
+    def make_user(self, username):
+        return User.objects.create_user(username=username)
+
+    def make_community(self, name):
+        return Community.objects.create(name=name, description='', created_by=self.creator)
+
+    def join(self, user, *communities):
+        for community in communities:
+            CommunityMember.objects.get_or_create(user=user, community=community)
+
+    def recommended(self, **params):
+        response = self.client.get('/api/communities/recommended/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [community['id'] for community in response.data['results']]
+
+    def affinities(self):
+        return {
+            (a, b): (shared, round(score, 6))
+            for a, b, shared, score in CommunityAffinity.objects.values_list(
+                'community_id', 'related_id', 'shared_members', 'score'
+            )
+        }
+
+    def test_ranked_by_shared_members(self):
+        recommendations.build('python')
+        # Unrelated shares no members; it is only a popularity top-up
+        self.assertEqual(self.recommended(), [self.close.id, self.far.id, self.unrelated.id])
+        results = self.client.get('/api/communities/recommended/').data['results']
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual(results[2]['score'], 0)
+        self.assertFalse(any(result['is_member'] for result in results))
+        self.assertEqual(self.recommended(limit=1), [self.close.id])
+
+    def test_joined_communities_drop_out(self):
+        recommendations.build('python')
+        self.assertEqual(self.recommended()[0], self.close.id)
+        self.client.post(f'/api/communities/{self.close.id}/join/')
+        self.assertNotIn(self.close.id, self.recommended())
+
+    def test_cached_until_rebuild(self):
+        def scores():
+            response = self.client.get('/api/communities/recommended/')
+            return [result['score'] for result in response.data['results']]
+
+        # Before the first build everything is a popularity top-up
+        self.assertEqual(scores(), [0, 0, 0])
+        CommunityAffinity.objects.create(
+            community=self.community, related=self.far, shared_members=1, score=0.5
+        )
+        self.assertEqual(scores(), [0, 0, 0])
+        recommendations.build('python')
+        self.assertTrue(all(score > 0 for score in scores()[:2]))
+
+    def test_neighbors_are_capped(self):
+        recommendations.build('python', neighbors=1)
+        self.assertEqual(
+            list(CommunityAffinity.objects.filter(community=self.community).values_list('related_id', flat=True)),
+            [self.close.id]
+        )
+
+    @skipIf(recommendations.sparse is None, 'scipy is not installed')
+    def test_engines_agree(self):
+        recommendations.build('python')
+        expected = self.affinities()
+        recommendations.build('scipy')
+        self.assertEqual(self.affinities(), expected)
+
+    def test_requires_login_and_valid_limit(self):
+        self.assertEqual(self.client.get('/api/communities/recommended/', {'limit': 0}).status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/communities/recommended/').status_code, 401)
+
+    def test_query_budget(self):
+        recommendations.build('python')
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.visitor)}')
+        self.assertWithinQueryBudget('get', '/api/communities/recommended/')
+
+
+class InstrumentationTests(CommunityTestCase):
+    """Requests carry Server-Timing and feed per-endpoint histograms."""
+
+    def setUp(self):
+        super().setUp()
+        instrumentation.reset_stats()
+
+    def test_server_timing_header(self):
+        response = self.client.get(f'/api/communities/{self.community.id}/')
+        self.assertEqual(response.instrumentation.endpoint, 'CommunityViewSet.retrieve')
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'serialize;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertIn(f'"{response.instrumentation.queries} queries"', timing)
+
+    def test_metrics_are_admin_only(self):
+        for _ in range(3):
+            self.client.get(f'/api/communities/{self.community.id}/members/')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+        admin = User.objects.create_superuser(username='admin')
+        admin_client = APIClient()
+        admin_client.force_authenticate(admin)
+        endpoints = admin_client.get('/api/metrics/').data['endpoints']
+        members = endpoints['CommunityViewSet.members']
+        self.assertEqual(members['queries']['count'], 3)
+        self.assertEqual(members['query_budget'], 2)
+        self.assertEqual(members['over_budget'], 0)
+
+        self.assertEqual(admin_client.delete('/api/metrics/').status_code, 204)
+        self.assertNotIn('CommunityViewSet.members', admin_client.get('/api/metrics/').data['endpoints'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(CommunityTestCase):
+    """Read-only actions read from a replica, except right after a write."""
+
+    def setUp(self):
+        super().setUp()
+        # The test database has no replica; route "replica" reads to it anyway
+        patcher = mock.patch.object(routers, 'choose_replica', return_value='default')
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_only_actions_use_a_replica(self):
+        self.assertEqual(self.client.get(f'/api/communities/{self.community.id}/members/').status_code, 200)
+        self.choose_replica.assert_called_once_with(['replica1'])
+
+    def test_other_actions_use_the_primary(self):
+        self.client.get('/api/communities/recommended/')
+        self.client.post(f'/api/communities/{self.community.id}/join/')
+        self.choose_replica.assert_not_called()
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        self.assertEqual(self.client.post(f'/api/communities/{self.community.id}/join/').status_code, 201)
+        self.assertTrue(routers.is_pinned(self.visitor.pk))
+        response = self.client.get(f'/api/communities/{self.community.id}/')
+        self.assertTrue(response.data['is_member'])
+        self.choose_replica.assert_not_called()
+        # Other users still read from a replica
+        self.client.force_authenticate(self.creator)
+        self.client.get(f'/api/communities/{self.community.id}/')
+        self.choose_replica.assert_called_once()
+
+    def test_replica_reads_do_not_reach_pinned_writers(self):
+        self.assertEqual(self.client.post(f'/api/communities/{self.community.id}/join/').status_code, 201)
+        # The creator reads from a replica that has not caught up with the join
+        Community.objects.filter(pk=self.community.pk).update(member_count=1)
+        creator_client = APIClient()
+        creator_client.force_authenticate(self.creator)
+        response = creator_client.get(f'/api/communities/{self.community.id}/')
+        self.assertEqual(response.data['member_count'], 1)
+        self.assertNotIn('ETag', response)
+        self.choose_replica.assert_called_once()
+        Community.objects.filter(pk=self.community.pk).update(member_count=2)
+        # The writer, pinned to the primary, sees their join
+        response = self.client.get(f'/api/communities/{self.community.id}/')
+        self.assertEqual((response.data['member_count'], response.data['is_member']), (2, True))
+        self.assertIn('ETag', response)
+        self.assertEqual(self.client.get(
+            f'/api/communities/{self.community.id}/', HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, 304)
+
+    def test_failed_writes_do_not_pin(self):
+        self.client.post('/api/communities/999999/join/')
+        self.assertFalse(routers.is_pinned(self.visitor.pk))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_the_primary(self):
+        self.client.get(f'/api/communities/{self.community.id}/members/')
+        self.choose_replica.assert_not_called()
+
+    def test_replicas_are_not_migrated(self):
+        router = routers.ReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica1', 'communities'))
+        self.assertIsNone(router.allow_migrate('default', 'communities'))
+
+
+class SqliteDeploymentTests(TestCase):
+    """Connection settings and replica files for the SQLite deployment."""
+
+    def test_connections_apply_the_pragmas(self):
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+    def test_copy_sqlite_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source, target = Path(directory, 'primary.sqlite3'), Path(directory, 'replica.sqlite3')
+            with sqlite3.connect(source) as db:
+                db.execute('CREATE TABLE t (x)')
+                db.execute('INSERT INTO t VALUES (1), (2)')
+            db.close()
+            copy_sqlite_database(source, target)
+            copy = sqlite3.connect(target)
+            try:
+                self.assertEqual(copy.execute('SELECT count(*) FROM t').fetchone()[0], 2)
+                self.assertEqual(copy.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            finally:
+                copy.close()
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_sync_replicas_needs_replicas(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_replicas')
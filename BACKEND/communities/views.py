@@ -1,18 +1,39 @@
+from functools import partial
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from django.db.models import Count
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from django.db.models import F
+from social_feed_prj import cache as feed_cache
+from social_feed_prj import export
+from social_feed_prj.fieldsets import SparseQuerysetMixin
+from social_feed_prj.lean import LeanListMixin
+from social_feed_prj.pagination import MemberCursorPagination
+from social_feed_prj.renderers import FastJSONRenderer
+from . import membership, recommendations
 from .models import Community, CommunityMember
 from .serializers import (
+    COMMUNITY_PLAN,
     CommunitySerializer, 
     CommunityCreateSerializer, 
     CommunityDetailSerializer,
-    CommunityMemberSerializer
+    CommunityMemberSerializer,
+    RecommendedCommunitySerializer
 )
 
 
-class CommunityViewSet(viewsets.ModelViewSet):
+def overlay_membership(communities, request):
+    """Set the per-viewer is_member flag on shared (cached) community payloads."""
+    if not communities or 'is_member' not in communities[0]:
+        # Left out by a sparse fieldset
+        return
+    community_ids = membership.community_ids(request)
+    for community in communities:
+        community['is_member'] = community['id'] in community_ids
+
+
+class CommunityViewSet(LeanListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Community CRUD operations.
     
@@ -24,16 +45,25 @@ class CommunityViewSet(viewsets.ModelViewSet):
     destroy: DELETE /api/communities/{id}/ - Delete community (creator only)
     join: POST /api/communities/{id}/join/ - Join community
     leave: POST /api/communities/{id}/leave/ - Leave community
-    members: GET /api/communities/{id}/members/ - Get community members
+    members: GET /api/communities/{id}/members/ - Get community members (cursor paginated)
+    recommended: GET /api/communities/recommended/ - Communities to join, by co-membership
+
+    list and retrieve payloads are served from social_feed_prj.cache. Reads
+    accept ?fields= / ?omit= (social_feed_prj.fieldsets).
     """
     permission_classes = [IsAuthenticatedOrReadOnly]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    lean_plan = COMMUNITY_PLAN
+    recommended_limit = 20
+    recommended_max_limit = 50
+    # SQL statements per request, authentication included
+    query_budgets = {'list': 3, 'retrieve': 3, 'members': 2, 'recommended': 4}
+    # Read from a replica (social_feed_prj.routers)
+    replica_actions = {'list', 'retrieve', 'members'}
     
     def get_queryset(self):
-        """Annotate queryset with counts."""
-        return Community.objects.annotate(
-            member_count=Count('members', distinct=True),
-            post_count=Count('posts', distinct=True)
-        ).select_related('created_by').order_by('-created_at')
+        """Counts are read from the stored counter columns."""
+        return Community.objects.select_related('created_by').order_by('-created_at')
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
@@ -47,6 +77,42 @@ class CommunityViewSet(viewsets.ModelViewSet):
         """Set the creator as the current user."""
         serializer.save(created_by=self.request.user)
     
+    def lean_data(self, rows, plan):
+        communities = super().lean_data(rows, plan)
+        overlay_membership(communities, self.request)
+        return communities
+    
+    def list(self, request, *args, **kwargs):
+        """Serve the shared list payload from cache, overlaying is_member."""
+        build = partial(super().list, request, *args, **kwargs)
+        payload, hit = feed_cache.cached_payload(
+            feed_cache.COMMUNITY_LIST,
+            [feed_cache.communities_scope()],
+            request,
+            lambda: build().data
+        )
+        if hit:
+            overlay_membership(payload['results'], request)
+        return Response(payload)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve the shared detail payload from cache, overlaying is_member, or
+        304 when If-None-Match matches the community's generation.
+        """
+        build = partial(super().retrieve, request, *args, **kwargs)
+        scopes = [feed_cache.community_scope(kwargs['pk'])]
+
+        def respond():
+            payload, hit = feed_cache.cached_payload(
+                feed_cache.COMMUNITY_DETAIL, scopes, request, lambda: build().data
+            )
+            if hit:
+                overlay_membership([payload], request)
+            return Response(payload)
+
+        return feed_cache.conditional_response(feed_cache.COMMUNITY_DETAIL, scopes, request, respond)
+    
     def update(self, request, *args, **kwargs):
         """Only creator can update community."""
         community = self.get_object()
@@ -77,7 +143,7 @@ class CommunityViewSet(viewsets.ModelViewSet):
         user = request.user
         
         # Check if already a member
-        if CommunityMember.objects.filter(user=user, community=community).exists():
+        if membership.is_member(request, community.pk):
             return Response(
                 {'message': 'You are already a member of this community'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -85,6 +151,7 @@ class CommunityViewSet(viewsets.ModelViewSet):
         
         # Create membership
         CommunityMember.objects.create(user=user, community=community)
+        membership.forget(request)
         
         return Response(
             {'message': f'Successfully joined {community.name}'},
@@ -107,16 +174,17 @@ class CommunityViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check if member
-        membership = CommunityMember.objects.filter(user=user, community=community).first()
-        if not membership:
+        # Check if member (the row is needed for the delete anyway)
+        member = CommunityMember.objects.filter(user=user, community=community).first()
+        if not member:
             return Response(
                 {'error': 'You are not a member of this community'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Delete membership
-        membership.delete()
+        member.delete()
+        membership.forget(request)
         
         return Response(
             {'message': f'Successfully left {community.name}'},
@@ -127,10 +195,58 @@ class CommunityViewSet(viewsets.ModelViewSet):
     def members(self, request, pk=None):
         """
         GET /api/communities/{id}/members/
-        Get list of community members.
+        Get community members, most recently joined first, one cursor page
+        at a time. ?export=ndjson streams the full list instead.
         """
         community = self.get_object()
-        members = community.members.select_related('user').order_by('-joined_at')
-        serializer = CommunityMemberSerializer(members, many=True)
-        return Response(serializer.data)
-
+        members = community.members.all()
+        if export.wants_export(request):
+            return export.stream_ndjson(
+                members.order_by('-joined_at', '-id').values(
+                    'id', 'user_id', 'joined_at', username=F('user__username')
+                ),
+                f'community-{community.pk}-members.ndjson'
+            )
+        
+        paginator = MemberCursorPagination()
+        page = paginator.paginate_queryset(members.select_related('user'), request, view=self)
+        serializer = CommunityMemberSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
+    # Scores are floats, which FastJSONRenderer may write differently
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+            renderer_classes=[JSONRenderer, BrowsableAPIRenderer])
+    def recommended(self, request):
+        """
+        GET /api/communities/recommended/?limit=20
+        Communities the user has not joined, ranked by how many members they
+        share with the user's communities. Cached per user and membership set.
+        """
+        try:
+            limit = int(request.query_params.get('limit', self.recommended_limit))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.recommended_max_limit:
+            return Response(
+                {'error': f'limit must be between 1 and {self.recommended_max_limit}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        joined = membership.community_ids(request)
+        
+        def build():
+            communities = recommendations.recommend(joined, limit)
+            serializer = RecommendedCommunitySerializer(
+                communities, many=True, context=self.get_serializer_context()
+            )
+            return {'results': serializer.data}
+        
+        payload, _ = feed_cache.cached_payload(
+            feed_cache.RECOMMENDATIONS,
+            [feed_cache.recommendations_scope()],
+            request,
+            build,
+            vary=(request.user.pk, *sorted(joined)),
+            timeout=recommendations.get_timeout()
+        )
+        return Response(payload)
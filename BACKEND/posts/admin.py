@@ -1,12 +1,15 @@
 from django.contrib import admin
+from social_feed_prj.admin import AutocompleteListFilter, LargeTableAdmin
 from .models import Post, Like
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('author', 'community', 'content_preview', 'created_at', 'like_count_display')
-    list_filter = ('created_at', 'community')
+    list_filter = ('created_at', ('community', AutocompleteListFilter))
+    list_select_related = ('author', 'community')
     search_fields = ('content', 'author__username', 'community__name')
+    autocomplete_fields = ('author', 'community')
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
 
@@ -14,15 +17,18 @@ class PostAdmin(admin.ModelAdmin):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Content'
     
+    @admin.display(description='Likes', ordering='like_count')
     def like_count_display(self, obj):
         return obj.get_like_count()
-    like_count_display.short_description = 'Likes'
 
 
 @admin.register(Like)
-class LikeAdmin(admin.ModelAdmin):
+class LikeAdmin(LargeTableAdmin):
     list_display = ('user', 'post', 'created_at')
     list_filter = ('created_at',)
+    # Post.__str__ reads the author and community
+    list_select_related = ('user', 'post__author', 'post__community')
     search_fields = ('user__username', 'post__content')
+    autocomplete_fields = ('user', 'post')
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
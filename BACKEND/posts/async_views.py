@@ -0,0 +1,247 @@
+"""
+Async versions of the hottest post endpoints, served under ASGI through
+social_feed_prj.urls_asgi at the same paths as their DRF counterparts, with
+the same responses and query budgets, and the real-time feed streams, which
+only exist under ASGI.
+"""
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework import status
+from rest_framework.response import Response
+from django.http import StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from communities import membership
+from social_feed_prj import cache as feed_cache, fieldsets, lean
+from social_feed_prj.async_api import AsyncAPIView, AsyncEventSourceAuthentication
+from social_feed_prj.events import BrokerFull, get_broker
+from social_feed_prj.renderers import FastJSONRenderer
+from users import revocation
+from users.authentication import session_expiry
+from . import events, like_buffer
+from .models import Post, Like
+from .serializers import POST_PLAN, PostSerializer
+from .views import (
+    FeedSortMixin, PostViewSet, apply_like, like_response, like_state_payload,
+    like_state_rows, not_member_response, requested_post_ids, viewer_liked,
+)
+
+
+async def aoverlay_likes(posts, user):
+    """overlay_likes for async views."""
+    if not posts or 'is_liked' not in posts[0]:
+        return
+    liked_ids = set()
+    if user.is_authenticated:
+        liked_ids = {
+            post_id async for post_id in Like.objects.filter(
+                user=user, post_id__in=[post['id'] for post in posts]
+            ).values_list('post_id', flat=True)
+        }
+    for post in posts:
+        post['is_liked'] = post['id'] in liked_ids
+
+
+class AsyncPendingLikesMixin:
+    """like_buffer.PendingLikesMixin for async views."""
+
+    def render(self, response):
+        like_buffer.overlay_response(self.request, response)
+        return super().render(response)
+
+
+class AsyncFeedView(AsyncPendingLikesMixin, FeedSortMixin, AsyncAPIView):
+    """A sorted, cursor-paginated post list, first page cached per community."""
+    renderer = FastJSONRenderer()
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    async def build_page(self):
+        queryset = self.get_queryset()
+        if lean.is_enabled():
+            # LeanListMixin's read path
+            plan = POST_PLAN.for_request(self.request)
+            rows = plan.rows(queryset, *self.paginator.key_fields)
+            page = await self.paginator.apaginate_queryset(rows, self.request, view=self)
+            data = plan.dump(page)
+        else:
+            context = {'request': self.request, 'view': self}
+            if fieldsets.requested(self.request) is not None:
+                # SparseQuerysetMixin
+                queryset = fieldsets.prune_queryset(
+                    queryset, PostSerializer(context=context), self.paginator.key_fields
+                )
+            page = await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+            data = PostSerializer(page, many=True, context=context).data
+        return self.paginator.get_paginated_response(data).data
+
+    async def respond(self):
+        return Response(await self.build_page())
+
+    async def cached_first_page(self, community_id):
+        """cached_first_page from posts.views."""
+        if self.request.query_params.get(self.paginator.cursor_query_param):
+            return Response(await self.build_page())
+        payload, hit = await feed_cache.acached_payload(
+            feed_cache.COMMUNITY_FEED,
+            [feed_cache.feed_scope(community_id)],
+            self.request,
+            self.build_page
+        )
+        if hit:
+            await aoverlay_likes(payload['results'], self.request.user)
+        return Response(payload)
+
+
+class AsyncPostListView(AsyncFeedView):
+    """
+    GET /api/posts/ - PostViewSet.list (optionally ?community=);
+    POST goes to PostViewSet.create.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    query_budgets = {'get': 1}
+    replica_actions = {'get'}
+
+    def get_queryset(self):
+        queryset = Post.objects.select_related(
+            'author', 'community'
+        ).annotate(
+            is_liked=viewer_liked(self.request.user)
+        )
+        community_id = self.request.query_params.get('community')
+        if community_id:
+            queryset = queryset.filter(community_id=community_id)
+        return self.sort_queryset(queryset)
+
+    async def get(self, request):
+        community_id = request.query_params.get('community')
+        if not community_id:
+            return await feed_cache.aconditional_response(
+                feed_cache.POST_LIST, [feed_cache.posts_scope()], request, self.respond,
+                vary=(like_buffer.viewer_version(request.user),)
+            )
+        return await feed_cache.aconditional_response(
+            feed_cache.COMMUNITY_FEED, [feed_cache.feed_scope(community_id)], request,
+            partial(self.cached_first_page, community_id),
+            vary=(like_buffer.viewer_version(request.user),)
+        )
+
+
+class AsyncCommunityPostListView(AsyncFeedView):
+    """GET /api/posts/community/{community_id}/ - CommunityPostListView."""
+    permission_classes = [IsAuthenticated]
+    query_budgets = {'get': 2}
+    replica_actions = {'get'}
+
+    def get_queryset(self):
+        if not self.member:
+            return Post.objects.none()
+        return self.sort_queryset(Post.objects.filter(
+            community_id=self.kwargs['community_id']
+        ).select_related(
+            'author', 'community'
+        ).annotate(
+            is_liked=viewer_liked(self.request.user)
+        ))
+
+    async def get(self, request, community_id):
+        self.member = await membership.ais_member(request, community_id)
+        respond = partial(self.cached_first_page, community_id) if self.member else self.respond
+        return await feed_cache.aconditional_response(
+            feed_cache.COMMUNITY_FEED, [feed_cache.feed_scope(community_id)], request, respond,
+            vary=(self.member, like_buffer.viewer_version(request.user))
+        )
+
+
+class AsyncPostLikeView(AsyncAPIView):
+    """
+    POST/PUT/DELETE /api/posts/{id}/like/ - PostViewSet.like. The write runs
+    in a transaction, which the async ORM cannot open, so it goes to a thread.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budgets = {'post': 4, 'put': 4, 'delete': 4}
+
+    async def post(self, request, pk):
+        post = await aget_object_or_404(
+            Post.objects.annotate(is_liked=viewer_liked(request.user)), pk=pk
+        )
+        if not await membership.ais_member(request, post.community_id):
+            return not_member_response()
+        return like_response(*await sync_to_async(apply_like)(request.method, request.user, post))
+
+    put = delete = post
+
+
+class AsyncLikeStateView(AsyncPendingLikesMixin, AsyncAPIView):
+    """GET /api/posts/like-state/?ids=1,2,3 - PostViewSet.like_state."""
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    query_budgets = {'get': 1}
+
+    async def get(self, request):
+        post_ids = requested_post_ids(request, PostViewSet.like_state_max_ids)
+        rows = [row async for row in like_state_rows(post_ids, request.user)]
+        return Response(like_state_payload(post_ids, rows))
+
+
+class AsyncFeedEventsView(AsyncAPIView):
+    """
+    Base class for the Server-Sent Events streams of posts.events. The
+    connection stays open on the event loop until the client leaves, its
+    token expires or is revoked, or the user leaves one of the communities.
+    """
+    authentication = AsyncEventSourceAuthentication()
+    permission_classes = [IsAuthenticated]
+    # The membership query; the checks repeated while streaming are not counted
+    query_budgets = {'get': 1}
+    # Seconds a client turned away at the connection cap should wait
+    retry_after = 30
+
+    async def authorize(self, community_ids):
+        """Whether the stream's user may still follow `community_ids`."""
+        if await revocation.ais_revoked(self.request.auth):
+            return False
+        membership.forget(self.request)
+        return set(community_ids) <= await membership.acommunity_ids(self.request)
+
+    def stream(self, community_ids):
+        try:
+            subscription = get_broker().subscribe(
+                [events.channel(community_id) for community_id in community_ids],
+                expires_at=session_expiry(self.request.auth),
+                authorize=partial(self.authorize, community_ids),
+            )
+        except BrokerFull:
+            return Response(
+                {'error': 'Too many open event streams, try again later'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(self.retry_after)},
+            )
+        response = StreamingHttpResponse(subscription, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop proxies (nginx) from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class AsyncCommunityEventsView(AsyncFeedEventsView):
+    """GET /api/posts/community/{community_id}/events/ - new posts and like counts."""
+
+    async def get(self, request, community_id):
+        if not await membership.ais_member(request, community_id):
+            return Response(
+                {'error': 'You must be a member of the community to follow its posts'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return self.stream([community_id])
+
+
+class AsyncHomeFeedEventsView(AsyncFeedEventsView):
+    """
+    GET /api/posts/feed/events/ - the same events for every community the
+    user belongs to when connecting; clients reconnect after joining one.
+    """
+
+    async def get(self, request):
+        return self.stream(await membership.acommunity_ids(request))
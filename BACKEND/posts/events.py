@@ -0,0 +1,39 @@
+"""
+Real-time feed events (see social_feed_prj.events).
+
+Each community has one channel carrying ``post`` events (the new post,
+serialized as in the feeds with ``is_liked`` false) and ``like`` events
+(``{"id", "like_count"}``, coalesced per post). Events are published after
+the write commits, and only when someone in this process is listening.
+"""
+from django.db import transaction
+from social_feed_prj import events
+from .serializers import PostSerializer
+
+
+def channel(community_id):
+    return f'community:{community_id}'
+
+
+def publish_post(post):
+    """Announce a newly created post."""
+    broker = events.get_broker()
+    name = channel(post.community_id)
+
+    def send():
+        if broker.listening(name):
+            broker.publish(name, 'post', PostSerializer(post).data)
+
+    transaction.on_commit(send)
+
+
+def publish_like_count(post_id, community_id, like_count):
+    """Announce a post's new like count; only the latest per interval is sent."""
+    broker = events.get_broker()
+    name = channel(community_id)
+
+    def send():
+        if broker.listening(name):
+            broker.publish(name, 'like', {'id': post_id, 'like_count': like_count}, key=f'like:{post_id}')
+
+    transaction.on_commit(send)
@@ -0,0 +1,432 @@
+"""
+Bulk ingestion of posts, memberships and likes from NDJSON or CSV streams.
+
+Rows are read lazily and handled a batch at a time. Each batch is validated
+with a fixed number of set-based queries (no per-row membership lookups),
+written with bulk_create inside its own transaction, and then updates the
+denormalized counters (and Post.hot_score) with one UPDATE per table. Invalid
+rows are skipped and reported with their line number; the rest of the batch
+still goes in.
+
+bulk_create bypasses model signals, so the importers apply the side effects
+the signals would have, batched: counters, cache invalidation, and (once at
+the end) timeline rebuilds. The in-process search index, when that backend
+is in use, only sees imported posts after ``manage.py rebuild_search_index``.
+"""
+import codecs
+import csv
+import json
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from communities.models import Community, CommunityMember
+from communities.signals import invalidate_community
+from social_feed_prj import cache as feed_cache
+from . import ranking, timelines
+from .models import Post, Like
+
+FORMATS = ('ndjson', 'csv')
+MAX_REPORTED_ERRORS = 100
+# Targets per counter UPDATE, keeping the CASE within SQLite's variable limit
+COUNTER_CHUNK = 500
+
+
+def get_batch_size():
+    return getattr(settings, 'INGEST_BATCH_SIZE', 1000)
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message is reported to the caller."""
+
+
+# Reading
+
+def read_rows(lines, fmt):
+    """
+    Yield ``(line_number, record)`` from an iterable of text lines; records
+    that fail to parse are yielded as RowError instances.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, RowError(f'Invalid JSON: {exc}')
+            continue
+        if not isinstance(record, dict):
+            yield number, RowError('Each line must be a JSON object')
+            continue
+        yield number, record
+
+
+def decode_lines(byte_lines, encoding='utf-8'):
+    """Text lines from an iterable of byte lines, such as a request stream."""
+    return codecs.iterdecode(byte_lines, encoding)
+
+
+def format_for(path, content_type=''):
+    """Guess the stream format from a file name or content type."""
+    if path.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return 'ndjson'
+
+
+# Field parsing
+
+def to_id(record, field):
+    value = record.get(field)
+    if isinstance(value, bool) or value in (None, ''):
+        raise RowError(f'{field} is required')
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{field} must be an integer')
+    if value <= 0:
+        raise RowError(f'{field} must be positive')
+    return value
+
+
+def to_datetime(record, field):
+    """Optional timestamp; naive values are taken to be in the current time zone."""
+    value = record.get(field)
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None:
+        raise RowError(f'{field} must be an ISO 8601 datetime')
+    if settings.USE_TZ and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def bump_counters(model, field, increments, **extra):
+    """
+    Add ``increments[pk]`` to `field` of each row, plus any `extra`
+    ``{field: {pk: expression}}`` updates, with one CASE UPDATE per chunk.
+    """
+    pks = list(increments)
+    output_field = model._meta.get_field(field)
+    for start in range(0, len(pks), COUNTER_CHUNK):
+        chunk = pks[start:start + COUNTER_CHUNK]
+        updates = {
+            field: Case(
+                *[
+                    When(pk=pk, then=F(field) + Value(increments[pk], output_field=output_field))
+                    for pk in chunk
+                ],
+                default=F(field),
+            )
+        }
+        for name, values in extra.items():
+            updates[name] = Case(
+                *[When(pk=pk, then=values[pk]) for pk in chunk if pk in values],
+                default=F(name),
+            )
+        model.objects.filter(pk__in=chunk).update(**updates)
+
+
+# Importers
+
+class Importer:
+    """
+    Base for one kind of row. Subclasses parse a record with `clean`, check a
+    whole batch with `validate`, and write it with `write`.
+    """
+    model = None
+    timestamp_field = None
+
+    def __init__(self):
+        self.community_ids = set()
+        self.user_ids = set()
+
+    def clean(self, record):
+        raise NotImplementedError
+
+    def validate(self, rows):
+        """Return ``(accepted, rejected)``; rows are ``(line, cleaned)`` pairs."""
+        raise NotImplementedError
+
+    def write(self, rows):
+        """Insert accepted rows and apply their side effects; return the count."""
+        raise NotImplementedError
+
+    def create(self, objects, moments):
+        """
+        bulk_create `objects`, keeping the explicit timestamps in `moments`
+        (auto_now_add would otherwise overwrite them with the current time).
+        """
+        self.model.objects.bulk_create(objects)
+        explicit = []
+        for obj, moment in zip(objects, moments):
+            if moment is not None and obj.pk is not None:
+                setattr(obj, self.timestamp_field, moment)
+                explicit.append(obj)
+        if explicit:
+            self.model.objects.bulk_update(explicit, [self.timestamp_field])
+
+    def finish(self):
+        """Side effects deferred to the end of the import."""
+        timelines.refresh_timelines(self.community_ids, self.user_ids)
+
+
+class PostImporter(Importer):
+    model = Post
+    timestamp_field = 'created_at'
+
+    def clean(self, record):
+        content = record.get('content')
+        if not isinstance(content, str) or not content.strip():
+            raise RowError('content is required')
+        return {
+            'author_id': to_id(record, 'author_id'),
+            'community_id': to_id(record, 'community_id'),
+            'content': content,
+            'created_at': to_datetime(record, 'created_at'),
+        }
+
+    def validate(self, rows):
+        members = set(
+            CommunityMember.objects.filter(
+                user_id__in={row['author_id'] for _, row in rows},
+                community_id__in={row['community_id'] for _, row in rows},
+            ).values_list('user_id', 'community_id')
+        )
+        accepted, rejected = [], []
+        for line, row in rows:
+            if (row['author_id'], row['community_id']) in members:
+                accepted.append((line, row))
+            else:
+                rejected.append((line, 'author is not a member of the community'))
+        return accepted, rejected
+
+    def write(self, rows):
+        now = timezone.now()
+        posts = [
+            Post(
+                author_id=row['author_id'],
+                community_id=row['community_id'],
+                content=row['content'],
+                hot_score=ranking.initial_score(row['created_at'] or now),
+            )
+            for _, row in rows
+        ]
+        self.create(posts, [row['created_at'] for _, row in rows])
+        per_community = Counter(post.community_id for post in posts)
+        bump_counters(Community, 'post_count', per_community)
+        for community_id in per_community:
+            invalidate_community(community_id)
+            feed_cache.invalidate_feed(community_id)
+        self.community_ids.update(per_community)
+        return len(posts)
+
+
+class MembershipImporter(Importer):
+    model = CommunityMember
+    timestamp_field = 'joined_at'
+
+    def clean(self, record):
+        return {
+            'user_id': to_id(record, 'user_id'),
+            'community_id': to_id(record, 'community_id'),
+            'joined_at': to_datetime(record, 'joined_at'),
+        }
+
+    def validate(self, rows):
+        user_ids = {row['user_id'] for _, row in rows}
+        community_ids = {row['community_id'] for _, row in rows}
+        users = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        communities = set(Community.objects.filter(pk__in=community_ids).values_list('pk', flat=True))
+        existing = set(
+            CommunityMember.objects.filter(
+                user_id__in=user_ids, community_id__in=community_ids
+            ).values_list('user_id', 'community_id')
+        )
+        accepted, rejected = [], []
+        for line, row in rows:
+            pair = (row['user_id'], row['community_id'])
+            if row['user_id'] not in users:
+                rejected.append((line, 'user does not exist'))
+            elif row['community_id'] not in communities:
+                rejected.append((line, 'community does not exist'))
+            elif pair in existing:
+                rejected.append((line, 'already a member'))
+            else:
+                existing.add(pair)
+                accepted.append((line, row))
+        return accepted, rejected
+
+    def write(self, rows):
+        members = [
+            CommunityMember(user_id=row['user_id'], community_id=row['community_id'])
+            for _, row in rows
+        ]
+        self.create(members, [row['joined_at'] for _, row in rows])
+        per_community = Counter(member.community_id for member in members)
+        bump_counters(Community, 'member_count', per_community)
+        for community_id in per_community:
+            invalidate_community(community_id)
+        self.user_ids.update(member.user_id for member in members)
+        return len(members)
+
+
+class LikeImporter(Importer):
+    model = Like
+    timestamp_field = 'created_at'
+
+    def clean(self, record):
+        return {
+            'user_id': to_id(record, 'user_id'),
+            'post_id': to_id(record, 'post_id'),
+            'created_at': to_datetime(record, 'created_at'),
+        }
+
+    def validate(self, rows):
+        user_ids = {row['user_id'] for _, row in rows}
+        post_ids = {row['post_id'] for _, row in rows}
+        posts = dict(Post.objects.filter(pk__in=post_ids).values_list('pk', 'community_id'))
+        members = set(
+            CommunityMember.objects.filter(
+                user_id__in=user_ids, community_id__in=set(posts.values())
+            ).values_list('user_id', 'community_id')
+        )
+        existing = set(
+            Like.objects.filter(user_id__in=user_ids, post_id__in=post_ids).values_list('user_id', 'post_id')
+        )
+        accepted, rejected = [], []
+        for line, row in rows:
+            pair = (row['user_id'], row['post_id'])
+            community_id = posts.get(row['post_id'])
+            if community_id is None:
+                rejected.append((line, 'post does not exist'))
+            elif (row['user_id'], community_id) not in members:
+                rejected.append((line, 'user is not a member of the community'))
+            elif pair in existing:
+                rejected.append((line, 'already liked'))
+            else:
+                existing.add(pair)
+                row['community_id'] = community_id
+                accepted.append((line, row))
+        return accepted, rejected
+
+    def write(self, rows):
+        now = timezone.now()
+        likes = [Like(user_id=row['user_id'], post_id=row['post_id']) for _, row in rows]
+        self.create(likes, [row['created_at'] for _, row in rows])
+        votes = defaultdict(list)
+        for _, row in rows:
+            votes[row['post_id']].append(ranking.time_value(row['created_at'] or now))
+        bump_counters(
+            Post, 'like_count',
+            {post_id: len(values) for post_id, values in votes.items()},
+            hot_score={
+                post_id: ranking.add_vote(log_sum_exp(values)) for post_id, values in votes.items()
+            },
+        )
+        for community_id in {row['community_id'] for _, row in rows}:
+            feed_cache.invalidate_feed(community_id)
+        return len(likes)
+
+
+def log_sum_exp(values):
+    """ln(sum(exp(v))): several votes combined into one for ranking.add_vote."""
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+IMPORTERS = {
+    'posts': PostImporter,
+    'memberships': MembershipImporter,
+    'likes': LikeImporter,
+}
+KINDS = tuple(IMPORTERS)
+
+
+class IngestResult:
+    """Running totals of an import, reported after every batch."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.received = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        seconds = self.seconds
+        return self.received / seconds if seconds else 0.0
+
+    def reject(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': str(message)})
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'received': self.received,
+            'created': self.created,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def ingest(kind, rows, batch_size=None, progress=None):
+    """
+    Import ``(line_number, record)`` rows of `kind` (see `read_rows`) and
+    return an IngestResult. `progress(result)` is called after each batch.
+    """
+    importer = IMPORTERS[kind]()
+    result = IngestResult(kind)
+    batch_size = batch_size or get_batch_size()
+
+    def flush(batch):
+        accepted, rejected = importer.validate(batch)
+        for line, message in rejected:
+            result.reject(line, message)
+        if accepted:
+            with transaction.atomic():
+                result.created += importer.write(accepted)
+        if progress is not None:
+            progress(result)
+
+    batch = []
+    for line, record in rows:
+        result.received += 1
+        try:
+            if isinstance(record, RowError):
+                raise record
+            batch.append((line, importer.clean(record)))
+        except RowError as exc:
+            result.reject(line, exc)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    importer.finish()
+    return result
@@ -0,0 +1,322 @@
+"""
+Write-behind buffer for like writes (LIKE_BUFFER_ENABLED).
+
+On a viral post every like is an INSERT into the same range of the
+(user, post) index and an UPDATE of the same post row, so concurrent likes
+queue on its lock (on SQLite, on the database lock). With the buffer on,
+PostViewSet.like and its async twin record the intent in process memory and
+answer at once. Intents are coalesced per (user, post): a burst of toggles
+leaves at most one write, and a like undone before the flush leaves none.
+
+Every LIKE_BUFFER_INTERVAL seconds, or as soon as LIKE_BUFFER_BATCH_SIZE
+intents are waiting, one transaction writes them: a
+``bulk_create(ignore_conflicts=True)`` of the likes, a batched DELETE of the
+unlikes, and like_count and hot_score updates per chunk of posts
+(posts.ingest.bump_counters). Then the usual side effects follow: cache
+invalidation and like count events. A failed flush is retried by the next.
+
+Until their flush is done, intents are overlaid on the read paths
+(PendingLikesMixin): like_count for every viewer, is_liked for the viewer
+who sent them. The buffer is per process: with several workers, a like
+shows in other workers' responses once flushed, and a crash loses at most
+the intents of one interval. Toggles are resolved against the is_liked read
+with the post; PUT and DELETE are idempotent either way.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from functools import cache
+from itertools import count
+
+from rest_framework import status
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from . import ranking
+from .ingest import COUNTER_CHUNK, bump_counters, log_sum_exp
+from .likes import like_count_changed
+from .models import Post, Like
+
+logger = logging.getLogger(__name__)
+
+
+def is_enabled():
+    return getattr(settings, 'LIKE_BUFFER_ENABLED', False)
+
+
+def get_interval():
+    return getattr(settings, 'LIKE_BUFFER_INTERVAL', 1.0)
+
+
+def get_batch_size():
+    return getattr(settings, 'LIKE_BUFFER_BATCH_SIZE', 5000)
+
+
+def chunks(values, size=COUNTER_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class Batch:
+    """Intents waiting for, or being written by, one flush."""
+
+    def __init__(self):
+        # {post_id: {user_id: liked}}, only where it differs from the database
+        self.intents = defaultdict(dict)
+        # {post_id: like_count change once written}
+        self.deltas = defaultdict(int)
+        self.size = 0
+
+    def get(self, post_id, user_id):
+        intents = self.intents.get(post_id)
+        return intents.get(user_id) if intents else None
+
+    def set(self, post_id, user_id, liked, baseline):
+        """Record `liked`, or drop the intent when it matches `baseline`."""
+        intents = self.intents[post_id]
+        previous = intents.pop(user_id, None)
+        if previous is not None:
+            self.deltas[post_id] -= 1 if previous else -1
+            self.size -= 1
+        if liked != baseline:
+            intents[user_id] = liked
+            self.deltas[post_id] += 1 if liked else -1
+            self.size += 1
+
+
+def existing_likes(post_id, user_ids):
+    """``{user_id: (like_id, created_at)}`` of `user_ids` who like the post."""
+    found = {}
+    for chunk in chunks(user_ids):
+        found.update(
+            (user_id, (like_id, created_at)) for user_id, like_id, created_at in Like.objects.filter(
+                post_id=post_id, user_id__in=chunk
+            ).values_list('user_id', 'id', 'created_at')
+        )
+    return found
+
+
+def write(batch):
+    """
+    Apply `batch` in one transaction. Returns ``{post_id: (community_id,
+    like_count)}`` for the posts whose count changed.
+    """
+    post_ids = [post_id for post_id, intents in batch.intents.items() if intents]
+    user_ids = {user_id for post_id in post_ids for user_id in batch.intents[post_id]}
+    added, removed, floors = {}, {}, {}
+    with transaction.atomic():
+        # Posts and users deleted since their intent was recorded are skipped
+        posts = dict(Post.objects.filter(pk__in=post_ids).values_list('pk', 'created_at'))
+        users = set()
+        for chunk in chunks(user_ids):
+            users.update(User.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+        new, gone = [], []
+        for post_id, created_at in posts.items():
+            intents = {
+                user_id: liked for user_id, liked in batch.intents[post_id].items() if user_id in users
+            }
+            existing = existing_likes(post_id, intents)
+            likes = [
+                Like(user_id=user_id, post_id=post_id)
+                for user_id, liked in intents.items() if liked and user_id not in existing
+            ]
+            unlikes = [existing[user_id] for user_id, liked in intents.items() if not liked and user_id in existing]
+            new += likes
+            gone += unlikes
+            if unlikes:
+                removed[post_id] = [ranking.time_value(liked_at) for _, liked_at in unlikes]
+                floors[post_id] = ranking.initial_score(created_at)
+
+        # Existence was checked above; ignore_conflicts covers writes around the buffer
+        Like.objects.bulk_create(new, batch_size=COUNTER_CHUNK, ignore_conflicts=True)
+        for like in new:
+            # created_at was set by auto_now_add
+            added.setdefault(like.post_id, []).append(ranking.time_value(like.created_at))
+        # Raw, like posts.likes: a queryset delete would send post_delete per row
+        for chunk in chunks([like_id for like_id, _ in gone]):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Like._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(chunk))})",
+                    chunk
+                )
+
+        if added:
+            bump_counters(
+                Post, 'like_count', {post_id: len(votes) for post_id, votes in added.items()},
+                hot_score={
+                    post_id: ranking.add_vote(log_sum_exp(votes)) for post_id, votes in added.items()
+                },
+            )
+        if removed:
+            bump_counters(
+                Post, 'like_count', {post_id: -len(votes) for post_id, votes in removed.items()},
+                hot_score={
+                    post_id: ranking.remove_vote(log_sum_exp(votes), floors[post_id])
+                    for post_id, votes in removed.items()
+                },
+            )
+        changed = set(added) | set(removed)
+        return {
+            post_id: (community_id, like_count)
+            for post_id, community_id, like_count in Post.objects.filter(
+                pk__in=changed
+            ).values_list('pk', 'community_id', 'like_count')
+        }
+
+
+class LikeBuffer:
+    """This process's pending like intents; see the module docstring."""
+
+    def __init__(self):
+        # Guards the batches; never held while writing
+        self.lock = threading.Lock()
+        # One flush at a time
+        self.flush_lock = threading.Lock()
+        self.open = Batch()
+        self.flushing = None
+        self.timer = None
+        # {user_id: sequence number of their latest unflushed intent}
+        self.viewers = {}
+        self.sequence = count(1)
+
+    def batches(self):
+        """Unflushed batches, oldest first."""
+        return [batch for batch in (self.flushing, self.open) if batch is not None and batch.size]
+
+    def submit(self, method, user, post):
+        """
+        Record a like (PUT), unlike (DELETE) or toggle (POST) of `post`,
+        loaded with its is_liked annotation. Returns ``(is_liked,
+        like_count, status_code)`` like posts.views.apply_like.
+        """
+        with self.lock:
+            flushing = self.flushing.get(post.pk, user.pk) if self.flushing else None
+            # What the database holds once the running flush is done
+            baseline = post.is_liked if flushing is None else flushing
+            current = self.open.get(post.pk, user.pk)
+            current = baseline if current is None else current
+            is_liked = {'PUT': True, 'DELETE': False}.get(method, not current)
+            self.open.set(post.pk, user.pk, is_liked, baseline)
+            self.viewers[user.pk] = next(self.sequence)
+            like_count = max(post.like_count + sum(batch.deltas.get(post.pk, 0) for batch in self.batches()), 0)
+            full = self.open.size >= get_batch_size()
+        if full:
+            # Another flush running means a full batch waits for the timer
+            self.flush(blocking=False)
+        else:
+            self.schedule()
+        if method == 'POST' and is_liked:
+            return is_liked, like_count, status.HTTP_201_CREATED
+        return is_liked, like_count, status.HTTP_200_OK
+
+    def overlay(self, posts, user_id):
+        """Apply unflushed intents to post payloads (dicts with an ``id``)."""
+        with self.lock:
+            batches = self.batches()
+            if not batches:
+                return
+            for post in posts:
+                post_id = post.get('id')
+                if 'like_count' in post:
+                    delta = sum(batch.deltas.get(post_id, 0) for batch in batches)
+                    post['like_count'] = max(post['like_count'] + delta, 0)
+                if 'is_liked' in post:
+                    for batch in batches:
+                        liked = batch.get(post_id, user_id)
+                        if liked is not None:
+                            post['is_liked'] = liked
+
+    def viewer_version(self, user_id):
+        """Changes with every intent of the user until it is flushed."""
+        return self.viewers.get(user_id, 0)
+
+    def schedule(self):
+        """Start the flush timer unless it is already running."""
+        with self.lock:
+            if self.timer is not None:
+                return
+            self.timer = threading.Timer(get_interval(), self.run_timer)
+            self.timer.daemon = True
+        self.timer.start()
+
+    def run_timer(self):
+        with self.lock:
+            self.timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread's connections are not reused
+            connections.close_all()
+        with self.lock:
+            pending = bool(self.batches())
+        if pending:
+            self.schedule()
+
+    def flush(self, blocking=True):
+        """
+        Write the pending intents, or retry a failed flush first. Returns the
+        number of intents written.
+        """
+        if not self.flush_lock.acquire(blocking=blocking):
+            return 0
+        try:
+            with self.lock:
+                if self.flushing is None:
+                    if not self.open.size:
+                        return 0
+                    self.flushing, self.open = self.open, Batch()
+                batch = self.flushing
+                cutoff = next(self.sequence)
+            try:
+                changed = write(batch)
+            except Exception:
+                logger.exception('Like buffer flush of %d intents failed; retrying', batch.size)
+                return 0
+            for post_id, (community_id, like_count) in changed.items():
+                like_count_changed(post_id, community_id, like_count)
+            # Only now, so reads never miss an intent between commit and invalidation
+            with self.lock:
+                self.flushing = None
+                self.viewers = {
+                    user_id: sequence for user_id, sequence in self.viewers.items() if sequence > cutoff
+                }
+            return batch.size
+        finally:
+            self.flush_lock.release()
+
+
+@cache
+def get_buffer():
+    buffer = LikeBuffer()
+    # Daemon timers die with the process; write what is left
+    atexit.register(buffer.flush)
+    return buffer
+
+
+def viewer_version(user):
+    """A value for ETags (social_feed_prj.cache `vary`) of pages the user's intents change."""
+    return get_buffer().viewer_version(user.pk) if is_enabled() else 0
+
+
+def overlay_response(request, response):
+    """Overlay unflushed intents on the posts of a successful GET response."""
+    if not is_enabled() or request.method != 'GET' or response.status_code != status.HTTP_200_OK:
+        return
+    data = getattr(response, 'data', None)
+    if isinstance(data, dict):
+        posts = data.get('results', [data])
+    elif isinstance(data, list):
+        posts = data
+    else:
+        return
+    get_buffer().overlay([post for post in posts if isinstance(post, dict)], request.user.pk)
+
+
+class PendingLikesMixin:
+    """DRF view mixin overlaying unflushed like intents on the posts it returns."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        overlay_response(request, response)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,177 @@
+"""
+Like writes that stay correct under concurrent double-taps.
+
+Every operation is a conditional write against the (user, post) unique index
+followed by a counter update that returns the new like_count, inside one
+transaction. There is no read-then-write window, so two racing requests can
+never both insert (no IntegrityError) or both decrement the counter.
+
+These writes bypass model signals, so they maintain like_count and hot_score
+and call `like_count_changed` themselves. Like rows created or deleted any
+other way (admin, cascades) still go through posts.signals.
+"""
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from social_feed_prj import cache as feed_cache
+from . import events, ranking
+from .models import Post, Like
+
+
+def supports_returning():
+    """INSERT .. ON CONFLICT DO NOTHING and UPDATE .. RETURNING are available."""
+    return (
+        connection.vendor in ('sqlite', 'postgresql')
+        and connection.features.can_return_columns_from_insert
+    )
+
+
+def like_count_changed(post_id, community_id, like_count=None):
+    """Side effects of a post's like count changing."""
+    feed_cache.invalidate_feed(community_id)
+    if like_count is not None:
+        events.publish_like_count(post_id, community_id, like_count)
+
+
+def _insert(user_id, post_id):
+    """Insert the like unless it already exists; return its time if inserted."""
+    now = timezone.now()
+    if supports_returning():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {Like._meta.db_table} (user_id, post_id, created_at) '
+                f'VALUES (%s, %s, %s) ON CONFLICT (user_id, post_id) DO NOTHING RETURNING id',
+                [user_id, post_id, connection.ops.adapt_datetimefield_value(now)]
+            )
+            return now if cursor.fetchone() is not None else None
+    try:
+        with transaction.atomic():
+            like, = Like.objects.bulk_create([Like(user_id=user_id, post_id=post_id)])
+        return like.created_at
+    except IntegrityError:
+        return None
+
+
+def _to_datetime(value):
+    # Raw cursors on SQLite return datetimes as text
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _delete(user_id, post_id):
+    """Delete the like if it exists; return when it was made if deleted."""
+    if supports_returning():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {Like._meta.db_table} WHERE user_id = %s AND post_id = %s '
+                f'RETURNING created_at',
+                [user_id, post_id]
+            )
+            row = cursor.fetchone()
+            return _to_datetime(row[0]) if row else None
+    like = Like.objects.filter(user_id=user_id, post_id=post_id).values_list('pk', 'created_at').first()
+    if like is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {Like._meta.db_table} WHERE id = %s', [like[0]])
+        return like[1] if cursor.rowcount > 0 else None
+
+
+def _bump(post, delta, moment):
+    """
+    Apply `delta` to like_count (never below zero) and add or remove the
+    vote cast at `moment` from hot_score; return the new like_count.
+    """
+    vote = ranking.time_value(moment)
+    if not supports_returning():
+        queryset = Post.objects.filter(pk=post.pk)
+        if delta < 0:
+            hot_score = ranking.remove_vote(vote, ranking.initial_score(post.created_at))
+            queryset.filter(like_count__gte=-delta).update(like_count=F('like_count') + delta)
+        else:
+            hot_score = ranking.add_vote(vote)
+            queryset.update(like_count=F('like_count') + delta)
+        queryset.update(hot_score=hot_score)
+        return _current_count(post.pk)
+
+    greatest, least = ('MAX', 'MIN') if connection.vendor == 'sqlite' else ('GREATEST', 'LEAST')
+    if delta > 0:
+        # ln(exp(hot_score) + exp(vote))
+        hot_sql = (
+            f'{greatest}(hot_score, %s) + LN(1 + EXP({least}(hot_score, %s) - {greatest}(hot_score, %s)))'
+        )
+        hot_params = [vote, vote, vote]
+    else:
+        # ln(exp(hot_score) - exp(vote)), never below the post's initial score
+        floor = ranking.initial_score(post.created_at)
+        hot_sql = (
+            f'{greatest}(%s, CASE WHEN hot_score > %s THEN hot_score + LN(1 - EXP(%s - hot_score)) '
+            f'ELSE %s END)'
+        )
+        hot_params = [floor, vote + ranking.SUBTRACT_EPSILON, vote, floor]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {Post._meta.db_table} SET like_count = CASE '
+            f'WHEN like_count + %s < 0 THEN 0 ELSE like_count + %s END, '
+            f'hot_score = {hot_sql} '
+            f'WHERE id = %s RETURNING like_count',
+            [delta, delta] + hot_params + [post.pk]
+        )
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+
+def _current_count(post_id):
+    return Post.objects.filter(pk=post_id).values_list('like_count', flat=True).first() or 0
+
+
+def add_like(user, post):
+    """Idempotently like `post`. Returns ``(changed, like_count)``."""
+    with transaction.atomic():
+        liked_at = _insert(user.pk, post.pk)
+        if liked_at is None:
+            return False, _current_count(post.pk)
+        like_count = _bump(post, 1, liked_at)
+    like_count_changed(post.pk, post.community_id, like_count)
+    return True, like_count
+
+
+def remove_like(user, post):
+    """Idempotently unlike `post`. Returns ``(changed, like_count)``."""
+    with transaction.atomic():
+        liked_at = _delete(user.pk, post.pk)
+        if liked_at is None:
+            return False, _current_count(post.pk)
+        like_count = _bump(post, -1, liked_at)
+    like_count_changed(post.pk, post.community_id, like_count)
+    return True, like_count
+
+
+def toggle_like(user, post, liked_hint=None):
+    """
+    Flip the user's like on `post`. Returns ``(is_liked, like_count)``.
+
+    `liked_hint` (e.g. the is_liked annotation already loaded with the post)
+    picks which conditional write to try first; if it turns out to be stale
+    the other write is applied, so the result is correct either way.
+    """
+    with transaction.atomic():
+        if liked_hint is not False and (moment := _delete(user.pk, post.pk)):
+            is_liked, delta = False, -1
+        elif moment := _insert(user.pk, post.pk):
+            is_liked, delta = True, 1
+        elif moment := _delete(user.pk, post.pk):
+            # A concurrent request liked it between our hint and the insert
+            is_liked, delta = False, -1
+        else:
+            return False, _current_count(post.pk)
+        like_count = _bump(post, delta, moment)
+    like_count_changed(post.pk, post.community_id, like_count)
+    return is_liked, like_count
@@ -0,0 +1,124 @@
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from social_feed_prj import loadtest
+from social_feed_prj.benchmark import isolated_database
+from social_feed_prj.synthetic import SyntheticData
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the API through the real URLconf: p50/p95/p99 latency, '
+        'queries per request and throughput for each endpoint, against a '
+        'freshly seeded synthetic dataset or the configured database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2_000)
+        parser.add_argument('--communities', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=50_000)
+        parser.add_argument('--likes', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--existing', action='store_true',
+                            help='Measure the configured database instead of seeding a '
+                                 'throwaway one (e.g. after seed_synthetic).')
+        parser.add_argument('--repeat', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--scenario', action='append',
+                            help='Only run scenarios whose name starts with this (repeatable).')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Disable the read-endpoint payload cache.')
+        parser.add_argument('--output', help='Save the results as JSON to this path.')
+        parser.add_argument('--compare', help='JSON results of an earlier run to diff against.')
+
+    def handle(self, *args, **options):
+        previous = loadtest.load_report(options['compare']) if options['compare'] else None
+        with ExitStack() as stack:
+            if options['existing']:
+                setup_test_environment(debug=False)
+                stack.callback(teardown_test_environment)
+                dataset = {'existing': True}
+            else:
+                stack.enter_context(isolated_database())
+                self.stdout.write('Seeding the synthetic dataset...')
+                dataset = SyntheticData(
+                    users=options['users'], communities=options['communities'],
+                    posts=options['posts'], likes=options['likes'], seed=options['seed'],
+                ).generate()
+            if options['no_cache']:
+                stack.enter_context(override_settings(FEED_CACHE_ENABLED=False))
+            dataset['cache'] = not options['no_cache']
+            results = self.run(options)
+        report = loadtest.build_report(results, dataset)
+        if options['output']:
+            loadtest.save_report(report, options['output'])
+            self.stdout.write(f"Saved results to {options['output']}")
+        if previous is not None:
+            self.print_comparison(loadtest.compare(previous, report))
+
+    def run(self, options):
+        client = APIClient()
+        scenarios = self.scenarios(client)
+        if options['scenario']:
+            scenarios = [
+                scenario for scenario in scenarios
+                if scenario.name.startswith(tuple(options['scenario']))
+            ]
+        self.stdout.write(
+            f"\n{'scenario':<28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'queries':>8} {'req/s':>8}  statuses"
+        )
+        results = {}
+        for scenario in scenarios:
+            summary = loadtest.run_scenario(client, scenario, options['repeat'], options['warmup'])
+            results[scenario.name] = summary
+            self.stdout.write(
+                f"{scenario.name:<28} {summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} "
+                f"{summary['p99_ms']:>8.2f} {summary['queries_mean']:>8.1f} "
+                f"{summary['requests_per_second']:>8.0f}  {summary['statuses']}"
+            )
+        return results
+
+    def scenarios(self, client):
+        """Pick a busy viewer and targets from the data, then list the endpoints."""
+        targets = loadtest.benchmark_targets()
+        if targets is None:
+            raise CommandError('The database has no memberships to benchmark with.')
+        viewer, community, post, other = (
+            targets['viewer'], targets['community'], targets['post'], targets['other']
+        )
+        if post is None:
+            raise CommandError('The busiest community has no posts to benchmark with.')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(viewer)}')
+
+        scenarios = [
+            loadtest.Scenario('posts.list', 'get', '/api/posts/'),
+            loadtest.Scenario('posts.list.community', 'get', f'/api/posts/?community={community.pk}'),
+            loadtest.Scenario('posts.list.hot', 'get', '/api/posts/?sort=hot'),
+            loadtest.Scenario('posts.detail', 'get', f'/api/posts/{post.pk}/'),
+            loadtest.Scenario('posts.likes', 'get', f'/api/posts/{post.pk}/likes/'),
+            loadtest.Scenario('posts.like', 'post', f'/api/posts/{post.pk}/like/'),
+            loadtest.Scenario('feed.community', 'get', f'/api/posts/community/{community.pk}/'),
+            loadtest.Scenario('feed.home', 'get', '/api/posts/feed/'),
+            loadtest.Scenario('communities.list', 'get', '/api/communities/'),
+            loadtest.Scenario('communities.detail', 'get', f'/api/communities/{community.pk}/'),
+            loadtest.Scenario('communities.members', 'get', f'/api/communities/{community.pk}/members/'),
+            loadtest.Scenario('communities.recommended', 'get', '/api/communities/recommended/'),
+            loadtest.Scenario('search', 'get', '/api/search/?q=word10'),
+        ]
+        if other is not None:
+            scenarios.append(loadtest.Scenario(
+                'communities.join', 'post', f'/api/communities/{other.pk}/join/',
+                reset=lambda client, iteration: client.post(f'/api/communities/{other.pk}/leave/'),
+            ))
+        return scenarios
+
+    def print_comparison(self, rows):
+        self.stdout.write(f"\n{'scenario':<28} {'metric':<13} {'before':>9} {'after':>9} {'change':>8}")
+        for name, metric, before, after, change in rows:
+            delta = f'{change:+.1%}' if change is not None else 'n/a'
+            self.stdout.write(f'{name:<28} {metric:<13} {before:>9.2f} {after:>9.2f} {delta:>8}')
@@ -0,0 +1,114 @@
+from contextlib import ExitStack
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+
+from posts.models import Post
+from social_feed_prj import loadtest
+from social_feed_prj.async_api import FeedASGIHandler
+from social_feed_prj.benchmark import isolated_database
+from social_feed_prj.synthetic import SyntheticData
+
+SERVERS = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the WSGI application (DRF views, one thread per in-flight '
+        'request) with the ASGI application (async views) on the feed, like '
+        'and like-state endpoints at increasing concurrency: throughput, '
+        'latency and the peak number of threads in the process. Concurrent '
+        'likes on the default in-memory SQLite database fail with table locks; '
+        'use --existing with a file or server database to measure writes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2_000)
+        parser.add_argument('--communities', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=50_000)
+        parser.add_argument('--likes', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--existing', action='store_true',
+                            help='Measure the configured database instead of seeding a '
+                                 'throwaway one (e.g. after seed_synthetic).')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per scenario, server and concurrency level.')
+        parser.add_argument('--concurrency', type=int, action='append',
+                            help='In-flight requests (repeatable); defaults to 1, 8 and 32.')
+        parser.add_argument('--scenario', action='append',
+                            help='Only run scenarios whose name starts with this (repeatable).')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Disable the read-endpoint payload cache.')
+        parser.add_argument('--output', help='Save the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            if options['existing']:
+                setup_test_environment(debug=False)
+                stack.callback(teardown_test_environment)
+                dataset = {'existing': True}
+            else:
+                stack.enter_context(isolated_database())
+                self.stdout.write('Seeding the synthetic dataset...')
+                dataset = SyntheticData(
+                    users=options['users'], communities=options['communities'],
+                    posts=options['posts'], likes=options['likes'], seed=options['seed'],
+                ).generate()
+            if options['no_cache']:
+                stack.enter_context(override_settings(FEED_CACHE_ENABLED=False))
+            dataset['cache'] = not options['no_cache']
+            results = self.run(options)
+        if options['output']:
+            loadtest.save_report(loadtest.build_report(results, dataset), options['output'])
+            self.stdout.write(f"Saved results to {options['output']}")
+
+    def run(self, options):
+        headers, scenarios = self.scenarios()
+        if options['scenario']:
+            scenarios = [
+                scenario for scenario in scenarios
+                if scenario.name.startswith(tuple(options['scenario']))
+            ]
+        applications = {
+            'wsgi': (WSGIHandler(), loadtest.run_wsgi),
+            'asgi': (FeedASGIHandler(), loadtest.run_asgi),
+        }
+        self.stdout.write(
+            f"\n{'scenario':<18} {'server':<6} {'conc':>5} {'req/s':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'threads':>8}  statuses"
+        )
+        results = {}
+        # WSGI first: the ASGI handler's threads outlive its runs
+        for server in SERVERS:
+            application, run = applications[server]
+            for scenario in scenarios:
+                for concurrency in options['concurrency'] or [1, 8, 32]:
+                    # Warm up connections, caches and lazily built state
+                    run(application, scenario, headers, concurrency, concurrency)
+                    summary = run(application, scenario, headers, options['requests'], concurrency)
+                    results[f'{scenario.name}.{server}.c{concurrency}'] = summary
+                    self.stdout.write(
+                        f"{scenario.name:<18} {server:<6} {concurrency:>5} "
+                        f"{summary['requests_per_second']:>8.0f} {summary['p50_ms']:>8.2f} "
+                        f"{summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+                        f"{summary['peak_threads']:>8}  {summary['statuses']}"
+                    )
+        return results
+
+    def scenarios(self):
+        targets = loadtest.benchmark_targets()
+        if targets is None or targets['post'] is None:
+            raise CommandError('The database has no memberships or posts to benchmark with.')
+        community, post = targets['community'], targets['post']
+        headers = {'Authorization': f"Bearer {AccessToken.for_user(targets['viewer'])}"}
+        page_ids = ','.join(map(str, Post.objects.filter(
+            community=community
+        ).order_by('-created_at').values_list('id', flat=True)[:20]))
+        return headers, [
+            loadtest.Scenario('posts.list', 'get', '/api/posts/'),
+            loadtest.Scenario('feed.community', 'get', f'/api/posts/community/{community.pk}/'),
+            loadtest.Scenario('posts.like_state', 'get', f'/api/posts/like-state/?ids={page_ids}'),
+            loadtest.Scenario('posts.like', 'post', f'/api/posts/{post.pk}/like/'),
+        ]
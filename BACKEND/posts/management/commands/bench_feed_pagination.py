@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from communities.models import Community
+from posts.models import Post
+from posts.views import CommunityPostListView
+from social_feed_prj.benchmark import explicit_timestamps, isolated_database, measure, summarize
+from social_feed_prj.pagination import FeedCursorPagination
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare OFFSET (page number) and keyset (cursor) pagination latency '
+        'on the community feed at increasing scroll depths.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument(
+            '--depths', type=int, nargs='+', default=[1, 100, 1_000, 10_000, 49_999],
+            help='Page numbers to measure (clamped to the last page).',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            user, community = self.seed(options['posts'], options['batch_size'])
+            self.run(user, community, options)
+
+    def seed(self, total, batch_size):
+        user = User.objects.create_user(username='bench', password='bench-password')
+        community = Community.objects.create(name='Bench', description='', created_by=user)
+        start = timezone.now() - timedelta(seconds=total)
+        self.stdout.write(f'Seeding {total} posts...')
+        with explicit_timestamps(Post._meta.get_field('created_at')):
+            for offset in range(0, total, batch_size):
+                Post.objects.bulk_create([
+                    Post(
+                        content=f'Post {i}', author=user, community=community,
+                        created_at=start + timedelta(seconds=i)
+                    )
+                    for i in range(offset, min(offset + batch_size, total))
+                ])
+        return user, community
+
+    def run(self, user, community, options):
+        page_size = options['page_size']
+        last_page = max(1, options['posts'] // page_size)
+        factory = APIRequestFactory()
+        offset_pagination = type('OffsetPagination', (PageNumberPagination,), {
+            'page_size': page_size, 'page_size_query_param': 'page_size', 'max_page_size': page_size,
+        })
+        offset_view = CommunityPostListView.as_view(pagination_class=offset_pagination)
+        keyset_view = CommunityPostListView.as_view(pagination_class=FeedCursorPagination)
+        feed = Post.objects.filter(community=community).order_by('-created_at', '-id')
+        paginator = FeedCursorPagination()
+        paginator.base_url = f'/api/posts/community/{community.id}/'
+
+        def call(view, query):
+            request = factory.get(f'/api/posts/community/{community.id}/', query)
+            force_authenticate(request, user=user)
+            response = view(request, community_id=community.id)
+            assert response.status_code == 200, response.data
+            assert len(response.data['results']) == page_size
+
+        self.stdout.write(f"{'page':>8} {'offset p50':>12} {'offset p95':>12} {'keyset p50':>12} {'keyset p95':>12}")
+        for depth in options['depths']:
+            page = min(depth, last_page)
+            query = {'page': page, 'page_size': page_size}
+            if page > 1:
+                boundary = feed[(page - 1) * page_size - 1]
+                cursor = paginator.encode_cursor(boundary, reverse=False).split('cursor=')[1]
+                keyset_query = {'cursor': cursor, 'page_size': page_size}
+            else:
+                keyset_query = {'page_size': page_size}
+            offset = summarize(measure(lambda: call(offset_view, query), options['repeat']))
+            keyset = summarize(measure(lambda: call(keyset_view, keyset_query), options['repeat']))
+            self.stdout.write(
+                f"{page:>8} {offset['p50_ms']:>12.2f} {offset['p95_ms']:>12.2f} "
+                f"{keyset['p50_ms']:>12.2f} {keyset['p95_ms']:>12.2f}"
+            )
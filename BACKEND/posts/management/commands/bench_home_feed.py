@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from communities.models import Community, CommunityMember
+from posts import timelines
+from posts.models import Post, Timeline
+from social_feed_prj.benchmark import explicit_timestamps, isolated_database, measure, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the home feed: on-read k-way merge versus precomputed '
+        'timelines, for reads and for the fan-out cost of creating a post.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--communities', type=int, default=20)
+        parser.add_argument('--posts-per-community', type=int, default=5_000)
+        parser.add_argument('--followers', type=int, default=1_000,
+                            help='Members with timelines in the community that is posted to.')
+        parser.add_argument('--repeat', type=int, default=30)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            reader, communities = self.seed(options)
+            self.bench_reads(reader, options['repeat'])
+            self.bench_writes(reader, communities[0], options)
+
+    def seed(self, options):
+        reader = User.objects.create_user(username='reader')
+        communities = [
+            Community.objects.create(name=f'Community {i}', description='', created_by=reader)
+            for i in range(options['communities'])
+        ]
+        per_community = options['posts_per_community']
+        start = timezone.now() - timedelta(seconds=per_community * len(communities))
+        self.stdout.write(f'Seeding {per_community * len(communities)} posts...')
+        with explicit_timestamps(Post._meta.get_field('created_at')):
+            for index, community in enumerate(communities):
+                Post.objects.bulk_create([
+                    Post(
+                        content='Post', author=reader, community=community,
+                        created_at=start + timedelta(seconds=i * len(communities) + index)
+                    )
+                    for i in range(per_community)
+                ], batch_size=5_000)
+        return reader, communities
+
+    def bench_reads(self, reader, repeat):
+        client = APIClient()
+        client.force_authenticate(reader)
+        deep_cursor = None
+
+        def first_page():
+            return client.get('/api/posts/feed/')
+
+        def deep_page():
+            return client.get('/api/posts/feed/', {'cursor': deep_cursor})
+
+        Timeline.objects.filter(user=reader).delete()
+        response = first_page()
+        for _ in range(10):
+            response = client.get(response.data['next'])
+        deep_cursor = response.data['next'].split('cursor=')[1]
+
+        self.stdout.write(f"{'read path':<24} {'p50 ms':>9} {'p95 ms':>9}")
+        for label, func in (('merge / first page', first_page), ('merge / page 12', deep_page)):
+            self.report(label, summarize(measure(func, repeat)))
+        timelines.rebuild_timeline(reader.id)
+        for label, func in (('timeline / first page', first_page), ('timeline / page 12', deep_page)):
+            self.report(label, summarize(measure(func, repeat)))
+
+    def bench_writes(self, reader, community, options):
+        followers = User.objects.bulk_create(
+            [User(username=f'follower{i}') for i in range(options['followers'])]
+        )
+        CommunityMember.objects.bulk_create(
+            [CommunityMember(user=user, community=community) for user in followers]
+        )
+        entries = Timeline.objects.get(user=reader).entries
+
+        def create_post():
+            Post.objects.create(content='New', author=reader, community=community)
+
+        self.stdout.write(f"\n{'write path':<24} {'p50 ms':>9} {'p95 ms':>9}")
+        self.report('create / no fan-out', summarize(measure(create_post, options['repeat'])))
+        Timeline.objects.bulk_create([Timeline(user=user, entries=entries) for user in followers])
+        self.report(
+            f'create / fan-out x{len(followers) + 1}',
+            summarize(measure(create_post, options['repeat']))
+        )
+
+    def report(self, label, summary):
+        self.stdout.write(f"{label:<24} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f}")
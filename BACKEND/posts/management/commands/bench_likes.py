@@ -0,0 +1,108 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+
+from communities.models import Community, CommunityMember
+from posts import like_buffer
+from posts.models import Like, Post
+from social_feed_prj import loadtest
+from social_feed_prj.benchmark import isolated_database
+
+MODES = ('sync', 'buffered')
+
+
+class Command(BaseCommand):
+    help = (
+        'Throughput of likes on one viral post, many users liking and '
+        'unliking it, with the synchronous writes and with the write-behind '
+        'buffer (posts.like_buffer), at increasing concurrency. Concurrent '
+        'synchronous likes on the default in-memory SQLite database fail with '
+        'table locks; use --existing with a file or server database for them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fans', type=int, default=500,
+                            help='Users liking the post; each likes and unlikes it once.')
+        parser.add_argument('--existing', action='store_true',
+                            help='Use the configured database instead of a throwaway one. '
+                                 'Adds users, a community and a post to it.')
+        parser.add_argument('--concurrency', type=int, action='append',
+                            help='In-flight requests (repeatable); defaults to 1 and 16.')
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            if options['existing']:
+                setup_test_environment(debug=False)
+                stack.callback(teardown_test_environment)
+            else:
+                stack.enter_context(isolated_database())
+            self.run(options)
+
+    def run(self, options):
+        post, tokens = self.seed(options['fans'])
+        application = WSGIHandler()
+        url = f'/api/posts/{post.pk}/like/'
+        self.stdout.write(
+            f"\n{'mode':<9} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'flush ms':>9} {'likes':>6}  statuses"
+        )
+        for mode in MODES:
+            for concurrency in options['concurrency'] or [1, 16]:
+                buffer = like_buffer.LikeBuffer()
+                with override_settings(LIKE_BUFFER_ENABLED=mode == 'buffered'), \
+                        mock.patch.object(like_buffer, 'get_buffer', return_value=buffer):
+                    summary = self.hammer(application, url, tokens, concurrency)
+                    # The writes the buffer deferred, timed on their own
+                    start = time.perf_counter()
+                    buffer.flush()
+                    flush_ms = (time.perf_counter() - start) * 1000
+                # Every fan liked and then unliked the post
+                likes = Like.objects.filter(post=post).count()
+                self.stdout.write(
+                    f"{mode:<9} {concurrency:>5} {summary['requests_per_second']:>8.0f} "
+                    f"{summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} {flush_ms:>9.1f} "
+                    f"{likes:>6}  {summary['statuses']}"
+                )
+
+    def seed(self, fans):
+        suffix = time.time_ns()
+        users = User.objects.bulk_create(
+            [User(username=f'bench-fan-{suffix}-{i}') for i in range(fans)]
+        )
+        community = Community.objects.create(
+            name=f'bench-likes-{suffix}', description='Viral', created_by=users[0]
+        )
+        CommunityMember.objects.bulk_create(
+            [CommunityMember(user=user, community=community) for user in users[1:]]
+        )
+        post = Post.objects.create(content='Viral', author=users[0], community=community)
+        return post, [f'Bearer {AccessToken.for_user(user)}' for user in users]
+
+    def hammer(self, application, url, tokens, concurrency):
+        """Each fan likes (PUT) the post, then each unlikes (DELETE) it."""
+        requests = [('put', token) for token in tokens] + [('delete', token) for token in tokens]
+
+        def call(request):
+            method, token = request
+            start = time.perf_counter()
+            try:
+                status = loadtest.wsgi_request(
+                    application, loadtest.wsgi_environ(method, url, {'Authorization': token})
+                )
+            finally:
+                connection.close()
+            return (time.perf_counter() - start) * 1000, status
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(call, requests))
+        wall_s = time.perf_counter() - start
+        return loadtest.summarize_concurrent(results, wall_s, concurrency, concurrency)
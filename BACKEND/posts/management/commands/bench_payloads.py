@@ -0,0 +1,86 @@
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from social_feed_prj import compression, loadtest
+from social_feed_prj.benchmark import isolated_database, measure, summarize
+from social_feed_prj.synthetic import SyntheticData
+
+POST_FIELDS = 'fields=id,like_count,is_liked'
+COMMUNITY_FIELDS = 'fields=id,member_count,post_count'
+
+
+class Command(BaseCommand):
+    help = (
+        'Bytes on the wire and latency of typical feed pages for each '
+        'Content-Encoding (identity, gzip, and br when brotli is installed), '
+        'with full objects and with a sparse fieldset, on a synthetic dataset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2_000)
+        parser.add_argument('--communities', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20_000)
+        parser.add_argument('--likes', type=int, default=40_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Disable the read-endpoint payload cache.')
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            stack.enter_context(isolated_database())
+            self.stdout.write('Seeding the synthetic dataset...')
+            SyntheticData(
+                users=options['users'], communities=options['communities'],
+                posts=options['posts'], likes=options['likes'], seed=options['seed'],
+            ).generate()
+            if options['no_cache']:
+                stack.enter_context(override_settings(FEED_CACHE_ENABLED=False))
+            self.run(options)
+
+    def run(self, options):
+        targets = loadtest.benchmark_targets()
+        if targets is None:
+            raise CommandError('The database has no memberships to benchmark with.')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(targets['viewer'])}")
+        community = targets['community'].pk
+        pages = {
+            'posts.list': ('/api/posts/', POST_FIELDS),
+            'feed.community': (f'/api/posts/community/{community}/', POST_FIELDS),
+            'feed.home': ('/api/posts/feed/', POST_FIELDS),
+            'communities.list': ('/api/communities/', COMMUNITY_FIELDS),
+        }
+        encodings = ['identity', 'gzip']
+        if compression.brotli is not None:
+            encodings.append('br')
+        else:
+            self.stdout.write(self.style.WARNING('brotli is not installed; skipping br.'))
+
+        self.stdout.write(
+            f"\n{'page':<18} {'fields':<7} {'encoding':<9} {'bytes':>9} {'ratio':>6} "
+            f"{'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for name, (path, fields) in pages.items():
+            # Sizes relative to the full, uncompressed page
+            baseline = None
+            for label, url in (('all', path), ('sparse', f'{path}?{fields}')):
+                for encoding in encodings:
+                    def fetch():
+                        return client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+
+                    response = fetch()
+                    if response.status_code != 200:
+                        raise CommandError(f'{url}: HTTP {response.status_code}')
+                    size = len(response.content)
+                    baseline = baseline or size
+                    timings = summarize(measure(fetch, options['repeat']))
+                    self.stdout.write(
+                        f"{name:<18} {label:<7} {response.get('Content-Encoding', encoding):<9} "
+                        f"{size:>9,} {size / baseline:>6.0%} "
+                        f"{timings['p50_ms']:>8.2f} {timings['p95_ms']:>8.2f}"
+                    )
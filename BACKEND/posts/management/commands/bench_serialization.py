@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from communities.models import Community
+from communities.serializers import COMMUNITY_PLAN, CommunitySerializer
+from posts.models import Post
+from posts.serializers import POST_PLAN, PostSerializer
+from posts.views import viewer_liked
+from social_feed_prj.benchmark import isolated_database, measure, summarize
+from social_feed_prj.renderers import FastJSONRenderer, orjson
+from social_feed_prj.synthetic import SyntheticData
+
+
+class Command(BaseCommand):
+    help = (
+        'Rows per second of the serializer and lean (social_feed_prj.lean) '
+        'read paths for posts and communities, with JSONRenderer and '
+        'FastJSONRenderer, on a synthetic dataset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20_000)
+        parser.add_argument('--communities', type=int, default=2_000)
+        parser.add_argument('--rows', type=int, default=1_000,
+                            help='Rows serialized per run, like one very large page.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.stdout.write('Seeding the synthetic dataset...')
+            SyntheticData(
+                users=1_000, communities=options['communities'], posts=options['posts'],
+                likes=options['posts'], seed=options['seed'],
+            ).generate()
+            self.run(options)
+
+    def run(self, options):
+        limit = options['rows']
+        viewer = User.objects.order_by('pk').first()
+        posts = Post.objects.select_related('author', 'community').annotate(
+            is_liked=viewer_liked(viewer)
+        ).order_by('-created_at', '-id')[:limit]
+        communities = Community.objects.select_related('created_by').order_by('-created_at')[:limit]
+        paths = {
+            'posts': (
+                lambda: PostSerializer(list(posts), many=True).data,
+                lambda: POST_PLAN.dump(POST_PLAN.rows(posts)),
+            ),
+            'communities': (
+                lambda: CommunitySerializer(list(communities), many=True).data,
+                lambda: COMMUNITY_PLAN.dump(COMMUNITY_PLAN.rows(communities)),
+            ),
+        }
+        renderers = {'json': JSONRenderer(), 'orjson' if orjson else 'json (no orjson)': FastJSONRenderer()}
+        if not orjson:
+            self.stdout.write(self.style.WARNING('orjson is not installed; FastJSONRenderer falls back to json.'))
+
+        self.stdout.write(f"{'rows':<12} {'path':<12} {'renderer':<18} {'fetch+build rows/s':>19} {'+render rows/s':>15}")
+        for name, (serializer_path, lean_path) in paths.items():
+            rows = len(lean_path())
+            if not rows:
+                continue
+            for path, build in (('serializer', serializer_path), ('lean', lean_path)):
+                built = summarize(measure(build, options['repeat']))
+                for label, renderer in renderers.items():
+                    rendered = summarize(measure(lambda: renderer.render(build()), options['repeat']))
+                    self.stdout.write(
+                        f"{name:<12} {path:<12} {label:<18} "
+                        f"{rows / built['p50_ms'] * 1000:>19,.0f} {rows / rendered['p50_ms'] * 1000:>15,.0f}"
+                    )
@@ -0,0 +1,49 @@
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from posts import ingest
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-load posts, memberships or likes from an NDJSON or CSV file '
+        '("-" reads stdin), validating and writing a batch at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=ingest.KINDS)
+        parser.add_argument('path', help='File to read, or - for stdin.')
+        parser.add_argument('--format', choices=ingest.FORMATS,
+                            help='Defaults to csv for *.csv files, else ndjson.')
+        parser.add_argument('--batch-size', type=int,
+                            help='Rows per transaction (INGEST_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ingest.format_for(path)
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        try:
+            stream = nullcontext(sys.stdin) if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with stream as lines:
+            result = ingest.ingest(
+                options['kind'], ingest.read_rows(lines, fmt),
+                batch_size=options['batch_size'], progress=self.progress,
+            )
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if result.skipped > len(result.errors):
+            self.stderr.write(f'... and {result.skipped - len(result.errors)} more skipped rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} of {result.received} {result.kind} '
+            f'in {result.seconds:.2f}s ({result.rows_per_second:,.0f} rows/s).'
+        ))
+
+    def progress(self, result):
+        self.stdout.write(
+            f'{result.kind}: {result.received} read, {result.created} created, '
+            f'{result.skipped} skipped, {result.rows_per_second:,.0f} rows/s'
+        )
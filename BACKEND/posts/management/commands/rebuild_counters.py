@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from communities.models import Community, CommunityMember
+from posts.models import Post, Like
+
+
+def count_subquery(model, field):
+    """Correlated COUNT(*) of `model` rows pointing at the outer row via `field`."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the denormalized like_count, member_count and post_count '
+        'columns from the underlying rows, repairing any drift.'
+    )
+
+    COUNTERS = (
+        (Post, 'like_count', Like, 'post'),
+        (Community, 'member_count', CommunityMember, 'community'),
+        (Community, 'post_count', Post, 'community'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted rows without writing the corrected values.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, column, related_model, field in self.COUNTERS:
+                actual = count_subquery(related_model, field)
+                drifted = model.objects.annotate(actual=actual).exclude(**{column: F('actual')})
+                if options['dry_run']:
+                    repaired = drifted.count()
+                else:
+                    repaired = drifted.update(**{column: actual})
+                self.stdout.write(
+                    f'{model.__name__}.{column}: {repaired} row(s) '
+                    f'{"drifted" if options["dry_run"] else "repaired"}'
+                )
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Counters are up to date.'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from communities.models import CommunityMember
+from posts import timelines
+from posts.models import Timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild precomputed home timelines for users at or above '
+        'FEED_FANOUT_MIN_COMMUNITIES and drop the rest. Run after changing '
+        'the fan-out threshold or timeline length.'
+    )
+
+    def handle(self, *args, **options):
+        threshold = timelines.fanout_min_communities()
+        user_ids = list(
+            CommunityMember.objects.values('user_id')
+            .annotate(total=Count('pk'))
+            .filter(total__gte=threshold)
+            .values_list('user_id', flat=True)
+        )
+        dropped, _ = Timeline.objects.exclude(user_id__in=user_ids).delete()
+        for user_id in user_ids:
+            timelines.rebuild_timeline(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(user_ids)} timeline(s), dropped {dropped} '
+            f'(threshold: {threshold} communities).'
+        ))
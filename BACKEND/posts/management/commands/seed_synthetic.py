@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from social_feed_prj.synthetic import SyntheticData
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with synthetic users, communities, memberships, '
+        'posts and likes whose popularity follows power laws.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--communities', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=200_000)
+        parser.add_argument('--likes', type=int, default=1_000_000)
+        parser.add_argument('--memberships-per-user', type=float, default=3,
+                            help='Mean of the power-law number of communities per user.')
+        parser.add_argument('--days', type=int, default=30,
+                            help='Posts and likes are spread over this many past days.')
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Zipf exponent for community and post popularity.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='synthetic',
+                            help='Prefix of generated usernames and community names.')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        self.last_report = 0.0
+        data = SyntheticData(
+            users=options['users'], communities=options['communities'],
+            posts=options['posts'], likes=options['likes'],
+            memberships_per_user=options['memberships_per_user'], days=options['days'],
+            exponent=options['exponent'], seed=options['seed'], prefix=options['prefix'],
+            batch_size=options['batch_size'], progress=self.progress,
+        )
+        if data.exists():
+            raise CommandError(
+                f"Users named {options['prefix']}-* already exist; pass another --prefix."
+            )
+        start = time.perf_counter()
+        created = data.generate()
+        summary = ', '.join(f'{count} {kind}' for kind, count in created.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {summary} in {time.perf_counter() - start:.1f}s.'
+        ))
+
+    def progress(self, result):
+        # At most one line every two seconds
+        if time.perf_counter() - self.last_report < 2:
+            return
+        self.last_report = time.perf_counter()
+        self.stdout.write(
+            f'{result.kind}: {result.created} created, {result.rows_per_second:,.0f} rows/s'
+        )
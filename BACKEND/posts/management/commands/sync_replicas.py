@@ -0,0 +1,37 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def copy_sqlite_database(source, target):
+    """Copy the SQLite database at `source` over `target`, consistently."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        # The backup API copies a snapshot even while the source takes writes
+        src.backup(dst)
+        dst.execute('PRAGMA journal_mode=WAL')
+    src.close()
+    dst.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into the local replica files '
+        '(SQLITE_REPLICAS), standing in for replication during development.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError('No replicas configured; set SQLITE_REPLICAS.')
+        for alias in replicas:
+            replica = connections[alias].settings_dict
+            if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+                raise CommandError(f'{alias}: only SQLite replicas can be synced this way.')
+            # Drop the open connection so it sees the new file
+            connections[alias].close()
+            copy_sqlite_database(str(primary['NAME']), str(replica['NAME']))
+            self.stdout.write(f"{alias}: copied {primary['NAME']} to {replica['NAME']}")
+        self.stdout.write(self.style.SUCCESS('Replicas are up to date.'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Community = apps.get_model('communities', 'Community')
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    likes = Like.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('pk')).values('total')
+    Post.objects.update(like_count=Coalesce(Subquery(likes), 0))
+    posts = Post.objects.filter(
+        community=OuterRef('pk')
+    ).order_by().values('community').annotate(total=Count('pk')).values('total')
+    Community.objects.update(post_count=Coalesce(Subquery(posts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0003_community_member_count_community_post_count'),
+        ('posts', '0002_like_posts_like_post_id_476f02_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
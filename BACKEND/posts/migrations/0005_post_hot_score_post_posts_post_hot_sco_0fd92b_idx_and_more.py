@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_hot_scores(apps, schema_editor):
+    from posts.ranking import recompute_scores
+    recompute_scores(apps.get_model('posts', 'Post'), apps.get_model('posts', 'Like'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communities', '0004_communitymember_communities_communi_aff0b5_idx'),
+        ('posts', '0004_timeline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.RunPython(backfill_hot_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-hot_score'], name='posts_post_hot_sco_0fd92b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', '-hot_score'], name='posts_post_communi_7c7dba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-like_count'], name='posts_post_like_co_fdd79b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', '-like_count'], name='posts_post_communi_b2f6e3_idx'),
+        ),
+    ]
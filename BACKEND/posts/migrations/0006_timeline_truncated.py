@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_hot_score_post_posts_post_hot_sco_0fd92b_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeline',
+            name='truncated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from communities.models import Community, CommunityMember
+from communities.models import Community, CommunityMember, saved_fields
+from . import ranking
 
 
 class Post(models.Model):
@@ -20,20 +21,31 @@ class Post(models.Model):
         on_delete=models.CASCADE,
         related_name='posts'
     )
+    # Written only by F() / SQL updates, never by save() (see save)
+    COUNTER_FIELDS = ('like_count', 'hot_score')
+
+    # Denormalized counter maintained by posts.signals
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    # Time-decayed like velocity in log space, see posts.ranking
+    hot_score = models.FloatField(default=0.0, editable=False)
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['community', '-created_at']),
+            models.Index(fields=['-hot_score']),
+            models.Index(fields=['community', '-hot_score']),
+            models.Index(fields=['-like_count']),
+            models.Index(fields=['community', '-like_count']),
         ]
 
     def __str__(self):
         return f"{self.author.username} - {self.community.name} ({self.created_at.strftime('%Y-%m-%d')})"
 
     def get_like_count(self):
-        """Return the number of likes on this post."""
-        return self.likes.count()
+        """Return the number of likes on this post (stored counter)."""
+        return self.like_count
 
     def is_liked_by(self, user):
         """Check if a specific user has liked this post."""
@@ -55,11 +67,19 @@ class Post(models.Model):
                     f"User {self.author.username} must be a member of {self.community.name} to create a post."
                 )
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, validate=True, **kwargs):
         """
         Override save to call clean() for validation.
+        Callers that have already checked membership pass validate=False.
+        Updates leave the counters alone: this instance's copy may predate
+        likes committed since it was loaded.
         """
-        self.full_clean()
+        if validate:
+            self.full_clean()
+        if self._state.adding and not self.hot_score:
+            self.hot_score = ranking.initial_score(self.created_at)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = saved_fields(self, self.COUNTER_FIELDS)
         super().save(*args, **kwargs)
 
 
@@ -89,3 +109,26 @@ class Like(models.Model):
 
     def __str__(self):
         return f"{self.user.username} likes {self.post.id}"
+
+
+class Timeline(models.Model):
+    """
+    Precomputed home feed for a user in many communities.
+
+    `entries` packs a bounded, newest-first list of fixed-width
+    ``(created_at, post id, community id)`` records into one string so a new
+    post can be fanned out with a single prepend-and-truncate UPDATE
+    (see posts.timelines). `truncated` is set once entries have been cut off
+    the end, after which older posts are only reachable by merging on read.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='timeline'
+    )
+    entries = models.TextField(default='', blank=True)
+    truncated = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.user.username}'s timeline"
@@ -0,0 +1,129 @@
+"""
+Hot and top ranking for post feeds.
+
+A post's hot score is ``ln(sum(exp(rate * t)))`` over its creation time and
+the time of each of its likes, with ``t`` in hours since EPOCH and
+``rate = ln 2 / FEED_HOT_HALF_LIFE_HOURS``. That is the log of a like count
+where every like loses half its weight per half-life, scaled by a factor that
+is the same for every post at any given moment, so ordering by the stored
+score is ordering by decayed like velocity without ever re-decaying old rows.
+
+Likes update the score incrementally (a log-add in the same UPDATE as the
+like_count change, see posts.likes and posts.signals); unlikes subtract
+their contribution. ``manage.py refresh_post_scores`` recomputes scores
+exactly from Like rows to absorb floating-point drift and writes made around
+the ORM.
+
+"Top" ranking is like_count over posts created within a window.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+# Below this gap a subtraction would take the log of ~0; keep the base score
+SUBTRACT_EPSILON = 1e-9
+
+TOP_WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    'all': None,
+}
+
+
+def half_life_hours():
+    return getattr(settings, 'FEED_HOT_HALF_LIFE_HOURS', 12)
+
+
+def time_value(moment):
+    """Log-weight of one vote cast at `moment`."""
+    hours = (moment - EPOCH).total_seconds() / 3600
+    return hours * math.log(2) / half_life_hours()
+
+
+def initial_score(created_at=None):
+    """Score of a post with no likes: its creation counts as one vote."""
+    return time_value(created_at or timezone.now())
+
+
+def compute_score(created_at, liked_at):
+    """Exact score from the creation time and every like time."""
+    values = [time_value(created_at)] + [time_value(moment) for moment in liked_at]
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def window_start(window):
+    """Earliest created_at for ``?sort=top&window=``; None means all time."""
+    span = TOP_WINDOWS[window]
+    return timezone.now() - span if span is not None else None
+
+
+# Incremental updates as ORM expressions (see posts.likes for the raw SQL)
+
+def add_vote(value):
+    """hot_score + vote, i.e. ln(exp(hot_score) + exp(value))."""
+    high = Greatest(F('hot_score'), Value(value))
+    low = Least(F('hot_score'), Value(value))
+    return high + Ln(Value(1.0) + Exp(low - high))
+
+
+def remove_vote(value, floor):
+    """hot_score - vote, never below `floor` (the post's initial score)."""
+    return Greatest(
+        Case(
+            When(
+                hot_score__gt=value + SUBTRACT_EPSILON,
+                then=F('hot_score') + Ln(Value(1.0) - Exp(Value(value) - F('hot_score'))),
+            ),
+            default=Value(floor),
+        ),
+        Value(floor),
+    )
+
+
+# Periodic refresh
+
+def recompute_scores(post_model, like_model, batch_size=2000, dry_run=False):
+    """
+    Recompute every post's hot_score exactly from its like times.
+
+    Posts and likes are both streamed in post id order and merged, so memory
+    stays bounded by `batch_size`. Returns the number of posts whose stored
+    score differed.
+    """
+    likes = like_model.objects.order_by('post_id', 'created_at').values_list(
+        'post_id', 'created_at'
+    ).iterator(chunk_size=batch_size)
+    like_groups = groupby(likes, key=itemgetter(0))
+    group = next(like_groups, None)
+
+    posts = post_model.objects.order_by('id').values_list('id', 'created_at', 'hot_score')
+    changed, pending = 0, []
+    for post_id, created_at, stored in posts.iterator(chunk_size=batch_size):
+        while group is not None and group[0] < post_id:
+            group = next(like_groups, None)
+        liked_at = []
+        if group is not None and group[0] == post_id:
+            liked_at = [moment for _, moment in group[1]]
+            group = next(like_groups, None)
+        score = compute_score(created_at, liked_at)
+        if math.isclose(score, stored, rel_tol=0, abs_tol=1e-6):
+            continue
+        changed += 1
+        pending.append(post_model(pk=post_id, hot_score=score))
+        if len(pending) >= batch_size:
+            if not dry_run:
+                post_model.objects.bulk_update(pending, ['hot_score'])
+            pending = []
+    if pending and not dry_run:
+        post_model.objects.bulk_update(pending, ['hot_score'])
+    return changed
@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Post, Like
+from communities import membership
 from communities.models import Community
+from social_feed_prj import lean
+from social_feed_prj.fieldsets import SparseFieldsMixin
 
 
 class PostAuthorSerializer(serializers.ModelSerializer):
@@ -11,8 +14,8 @@ class PostAuthorSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'first_name', 'last_name')
 
 
-class PostSerializer(serializers.ModelSerializer):
-    """Serializer for Post - list and detail views."""
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer for Post - list and detail views; ?fields= / ?omit= prune it."""
     author = PostAuthorSerializer(read_only=True)
     community_name = serializers.CharField(source='community.name', read_only=True)
     like_count = serializers.IntegerField(read_only=True)
@@ -25,16 +28,39 @@ class PostSerializer(serializers.ModelSerializer):
             'author', 'community', 'community_name',
             'like_count', 'is_liked'
         )
-        read_only_fields = ('id', 'created_at', 'author')
+        # Posts are created with PostCreateSerializer and never change community
+        read_only_fields = ('id', 'created_at', 'author', 'community')
     
     def get_is_liked(self, obj):
         """Check if current user has liked this post."""
+        # Querysets from the post views annotate this for the whole page
+        annotated = getattr(obj, 'is_liked', None)
+        if annotated is not None:
+            return annotated
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.is_liked_by(request.user)
         return False
 
 
+# PostSerializer's output for rows annotated with is_liked (social_feed_prj.lean)
+POST_PLAN = lean.Plan({
+    'id': 'id',
+    'content': 'content',
+    'created_at': ('created_at', lean.datetime_format),
+    'author': {
+        'id': 'author_id',
+        'username': 'author__username',
+        'first_name': 'author__first_name',
+        'last_name': 'author__last_name',
+    },
+    'community': 'community_id',
+    'community_name': 'community__name',
+    'like_count': 'like_count',
+    'is_liked': 'is_liked',
+})
+
+
 class PostCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating a new post."""
     class Meta:
@@ -46,16 +72,20 @@ class PostCreateSerializer(serializers.ModelSerializer):
         """Validate that user is a member of the community."""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            from communities.models import CommunityMember
-            is_member = CommunityMember.objects.filter(
-                user=request.user,
-                community=value
-            ).exists()
-            if not is_member:
+            if not membership.is_member(request, value.pk):
                 raise serializers.ValidationError(
                     "You must be a member of the community to post."
                 )
         return value
+    
+    def create(self, validated_data):
+        """
+        Membership was checked in validate_community, so skip the model's
+        full_clean() which would repeat it along with FK existence queries.
+        """
+        post = Post(**validated_data)
+        post.save(validate=False)
+        return post
 
 
 class LikeSerializer(serializers.ModelSerializer):
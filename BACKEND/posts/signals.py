@@ -0,0 +1,70 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from communities.models import Community, CommunityMember
+from communities.signals import invalidate_community
+from social_feed_prj import cache as feed_cache
+from . import events, ranking, timelines
+from .likes import like_count_changed
+from .models import Post, Like
+
+
+@receiver(post_save, sender=Post)
+def increment_post_count(sender, instance, created, **kwargs):
+    """Keep Community.post_count in sync when a post is created."""
+    if created:
+        Community.objects.filter(pk=instance.community_id).update(
+            post_count=F('post_count') + 1
+        )
+        timelines.push_post(instance)
+        invalidate_community(instance.community_id)
+        events.publish_post(instance)
+    feed_cache.invalidate_feed(instance.community_id)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_post_count(sender, instance, **kwargs):
+    """Keep Community.post_count in sync when a post is deleted."""
+    Community.objects.filter(pk=instance.community_id, post_count__gt=0).update(
+        post_count=F('post_count') - 1
+    )
+    timelines.remove_post(instance)
+    invalidate_community(instance.community_id)
+    feed_cache.invalidate_feed(instance.community_id)
+
+
+@receiver(post_save, sender=CommunityMember)
+def update_timeline_on_join(sender, instance, created, **kwargs):
+    """Pull the joined community's posts into the member's timeline."""
+    if created:
+        timelines.member_joined(instance)
+
+
+@receiver(post_delete, sender=CommunityMember)
+def update_timeline_on_leave(sender, instance, **kwargs):
+    """Drop the left community's posts from the member's timeline."""
+    timelines.member_left(instance)
+
+
+@receiver(post_save, sender=Like)
+def increment_like_count(sender, instance, created, **kwargs):
+    """Keep Post.like_count and hot_score in sync when a like is created."""
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            like_count=F('like_count') + 1,
+            hot_score=ranking.add_vote(ranking.time_value(instance.created_at)),
+        )
+        like_count_changed(instance.post_id, instance.post.community_id)
+
+
+@receiver(post_delete, sender=Like)
+def decrement_like_count(sender, instance, **kwargs):
+    """Keep Post.like_count and hot_score in sync when a like is removed."""
+    Post.objects.filter(pk=instance.post_id, like_count__gt=0).update(
+        like_count=F('like_count') - 1,
+        hot_score=ranking.remove_vote(
+            ranking.time_value(instance.created_at),
+            ranking.initial_score(instance.post.created_at),
+        ),
+    )
+    like_count_changed(instance.post_id, instance.post.community_id)
@@ -1,3 +1,1622 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from threading import Barrier, Thread
+from unittest import SkipTest, mock
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from communities.models import Community, CommunityMember
+from social_feed_prj import compression, events as feed_events, instrumentation, loadtest, routers
+from social_feed_prj.async_api import FeedASGIHandler
+from social_feed_prj.renderers import FastJSONRenderer
+from social_feed_prj.testing import FileDatabaseMixin, QueryBudgetMixin, clear_caches
+from users.authentication import StreamTicket
+from users.views import UserRegistrationView
+from . import ingest, like_buffer, likes, ranking, timelines
+from .models import Post, Like, Timeline
 
-# Create your tests here.
+
+class PostFeedTestCase(TestCase):
+    """Shared fixtures: one community with a creator and a second member."""
+
+    def setUp(self):
+        clear_caches()
+        self.creator = User.objects.create_user(username='creator', password='pass12345')
+        self.member = User.objects.create_user(username='member', password='pass12345')
+        self.community = Community.objects.create(
+            name='Testers', description='A community for tests', created_by=self.creator
+        )
+        CommunityMember.objects.create(user=self.member, community=self.community)
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def create_posts(self, count, author=None):
+        return [
+            Post.objects.create(
+                content=f'Post {i}', author=author or self.creator, community=self.community
+            )
+            for i in range(count)
+        ]
+
+
+class IsLikedQueryCountTests(PostFeedTestCase):
+    """The viewer's like state is resolved once per page, not once per post."""
+
+    def assert_constant_queries(self, url, expected):
+        posts = self.create_posts(3)
+        Like.objects.create(user=self.member, post=posts[0])
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 3)
+
+        self.create_posts(15)
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 18)
+        liked = {post['id']: post['is_liked'] for post in response.data['results']}
+        self.assertTrue(liked.pop(posts[0].id))
+        self.assertFalse(any(liked.values()))
+
+    def test_post_list_query_count(self):
+        self.assert_constant_queries('/api/posts/', 1)
+
+    def test_community_feed_query_count(self):
+        self.assert_constant_queries(f'/api/posts/community/{self.community.id}/', 2)
+
+    def test_anonymous_list_is_not_liked(self):
+        self.create_posts(2)
+        response = APIClient().get('/api/posts/')
+        self.assertEqual([post['is_liked'] for post in response.data['results']], [False, False])
+
+
+class FeedCursorPaginationTests(PostFeedTestCase):
+    """Feeds page with opaque (created_at, id) cursors and no total count."""
+
+    def collect(self, url, link='next'):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(post['id'] for post in response.data['results'])
+            url, pages = response.data[link], pages + 1
+        return ids, pages
+
+    def test_walks_every_post_once_in_order(self):
+        posts = self.create_posts(7)
+        # Identical timestamps must still page deterministically via the id tie-break
+        Post.objects.filter(pk__in=[p.pk for p in posts[2:5]]).update(created_at=posts[2].created_at)
+        expected = list(
+            Post.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        ids, pages = self.collect(f'/api/posts/community/{self.community.id}/?page_size=3')
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_previous_link_returns_to_earlier_page(self):
+        self.create_posts(5)
+        first = self.client.get('/api/posts/?page_size=2')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/posts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class FeedSortTests(PostFeedTestCase):
+    """?sort=hot ranks by decayed like velocity, ?sort=top by likes in a window."""
+
+    def feed(self, **params):
+        response = self.client.get(f'/api/posts/community/{self.community.id}/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [post['id'] for post in response.data['results']]
+
+    def age(self, post, hours):
+        """Backdate `post` and its likes, then refresh its score."""
+        moment = timezone.now() - timedelta(hours=hours)
+        Post.objects.filter(pk=post.pk).update(created_at=moment)
+        Like.objects.filter(post=post).update(created_at=moment)
+        call_command('refresh_post_scores', stdout=StringIO())
+
+    def like(self, post, count):
+        users = [User.objects.create_user(username=f'fan-{post.id}-{i}') for i in range(count)]
+        for user in users:
+            CommunityMember.objects.create(user=user, community=self.community)
+            Like.objects.create(user=user, post=post)
+
+    def test_hot_favours_recent_likes(self):
+        old, quiet, fresh = self.create_posts(3)
+        self.like(old, 10)
+        self.age(old, 72)
+        self.like(fresh, 2)
+        self.assertEqual(self.feed(sort='hot'), [fresh.id, quiet.id, old.id])
+        self.assertEqual(self.feed(sort='top', window='all'), [old.id, fresh.id, quiet.id])
+
+    def test_score_follows_likes_incrementally(self):
+        post = self.create_posts(1)[0]
+        initial = ranking.initial_score(post.created_at)
+        self.assertAlmostEqual(post.hot_score, initial)
+        url = f'/api/posts/{post.id}/like/'
+        self.client.put(url)
+        self.like(post, 2)
+
+        post.refresh_from_db()
+        liked_at = Like.objects.filter(post=post).values_list('created_at', flat=True)
+        self.assertAlmostEqual(post.hot_score, ranking.compute_score(post.created_at, liked_at), places=6)
+        self.client.delete(url)
+        Like.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertAlmostEqual(post.hot_score, initial, places=6)
+
+    def test_top_window(self):
+        older, newer = self.create_posts(2)
+        self.like(older, 3)
+        self.age(older, 48)
+        self.like(newer, 1)
+        self.assertEqual(self.feed(sort='top'), [newer.id])
+        self.assertEqual(self.feed(sort='top', window='7d'), [older.id, newer.id])
+        response = self.client.get('/api/posts/', {'sort': 'top', 'window': 'all', 'page_size': 1})
+        self.assertEqual([post['id'] for post in response.data['results']], [older.id])
+        second = self.client.get(response.data['next'])
+        self.assertEqual([post['id'] for post in second.data['results']], [newer.id])
+
+    def test_refresh_repairs_drift(self):
+        post = self.create_posts(1)[0]
+        self.like(post, 2)
+        expected = Post.objects.get(pk=post.pk).hot_score
+        Post.objects.filter(pk=post.pk).update(hot_score=0)
+        out = StringIO()
+        call_command('refresh_post_scores', dry_run=True, stdout=out)
+        self.assertIn('1 row(s) drifted', out.getvalue())
+        call_command('refresh_post_scores', stdout=StringIO())
+        self.assertAlmostEqual(Post.objects.get(pk=post.pk).hot_score, expected, places=6)
+
+    def test_invalid_sort_or_window(self):
+        self.assertEqual(self.client.get('/api/posts/', {'sort': 'best'}).status_code, 400)
+        response = self.client.get('/api/posts/', {'sort': 'top', 'window': '1y'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('window', response.data['error'])
+
+
+class HomeFeedTests(PostFeedTestCase):
+    """The home feed merges all joined communities via either path."""
+
+    def setUp(self):
+        super().setUp()
+        self.other = Community.objects.create(
+            name='Others', description='Second community', created_by=self.creator
+        )
+        self.outside = Community.objects.create(
+            name='Outside', description='Not joined', created_by=self.creator
+        )
+
+    def populate(self):
+        for i in range(4):
+            self.create_posts(1)
+            Post.objects.create(content=f'Other {i}', author=self.creator, community=self.other)
+            Post.objects.create(content=f'Outside {i}', author=self.creator, community=self.outside)
+        return list(
+            Post.objects.exclude(community=self.outside)
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def read_feed(self):
+        ids, url = [], '/api/posts/feed/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            ids.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    @override_settings(FEED_FANOUT_MIN_COMMUNITIES=2)
+    def test_fanout_timeline(self):
+        CommunityMember.objects.create(user=self.member, community=self.other)
+        self.assertTrue(Timeline.objects.filter(user=self.member).exists())
+        expected = self.populate()
+        self.assertEqual(self.read_feed(), expected)
+
+        CommunityMember.objects.get(user=self.member, community=self.other).delete()
+        self.assertFalse(Timeline.objects.filter(user=self.member).exists())
+
+    @override_settings(FEED_FANOUT_MIN_COMMUNITIES=10)
+    def test_merge_on_read(self):
+        CommunityMember.objects.create(user=self.member, community=self.other)
+        self.assertFalse(Timeline.objects.filter(user=self.member).exists())
+        expected = self.populate()
+        self.assertEqual(self.read_feed(), expected)
+
+    @override_settings(FEED_FANOUT_MIN_COMMUNITIES=2, FEED_TIMELINE_LENGTH=3)
+    def test_trimmed_timeline_falls_back_to_merge(self):
+        CommunityMember.objects.create(user=self.member, community=self.other)
+        expected = self.populate()
+        self.assertEqual(len(Timeline.objects.get(user=self.member).entries), 3 * 36)
+        self.assertEqual(self.read_feed(), expected)
+
+    @override_settings(FEED_FANOUT_MIN_COMMUNITIES=2, FEED_TIMELINE_LENGTH=5)
+    def test_shortened_timeline_falls_back_to_merge(self):
+        CommunityMember.objects.create(user=self.member, community=self.other)
+        expected = self.populate()
+        self.assertTrue(Timeline.objects.get(user=self.member).truncated)
+        Post.objects.get(pk=expected.pop(0)).delete()
+        self.assertEqual(len(Timeline.objects.get(user=self.member).entries), 4 * 36)
+        self.assertEqual(self.read_feed(), expected)
+
+        # A rebuild from fewer posts than the limit holds them all
+        Post.objects.filter(pk__in=expected[4:]).delete()
+        timelines.rebuild_timeline(self.member.pk)
+        self.assertFalse(Timeline.objects.get(user=self.member).truncated)
+        self.assertEqual(self.read_feed(), expected[:4])
+
+    @override_settings(FEED_FANOUT_MIN_COMMUNITIES=2)
+    def test_deleted_post_leaves_timeline(self):
+        CommunityMember.objects.create(user=self.member, community=self.other)
+        post = self.create_posts(1)[0]
+        post.delete()
+        self.assertEqual(Timeline.objects.get(user=self.member).entries, "")
+
+
+class FeedCacheTests(PostFeedTestCase):
+    """First feed pages are shared across viewers with is_liked overlaid."""
+
+    def test_hit_overlays_viewer_likes(self):
+        posts = self.create_posts(3)
+        url = f'/api/posts/community/{self.community.id}/'
+        creator_client = APIClient()
+        creator_client.force_authenticate(self.creator)
+        creator_client.get(url)
+        # Cached state must survive an out-of-band like by another viewer
+        Like.objects.bulk_create([Like(user=self.member, post=posts[1])])
+
+        # Membership check, then the overlay lookup; the feed itself is cached
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        liked = [post['is_liked'] for post in response.data['results']]
+        self.assertEqual(liked, [False, True, False])
+
+    def test_like_invalidates_page(self):
+        post = self.create_posts(1)[0]
+        url = f'/api/posts/community/{self.community.id}/'
+        self.client.get(url)
+        self.client.post(f'/api/posts/{post.id}/like/')
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['like_count'], 1)
+
+
+class ConditionalFeedTests(PostFeedTestCase):
+    """Feeds answer If-None-Match from the feed generations."""
+
+    def assert_revalidates(self, url, expected_queries):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        tag = response['ETag']
+        self.assertTrue(tag.startswith('W/"'))
+
+        with self.assertNumQueries(expected_queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], tag)
+        self.assertEqual(response.content, b'')
+        return tag
+
+    def test_post_list(self):
+        post = self.create_posts(2)[0]
+        tag = self.assert_revalidates('/api/posts/', 0)
+        self.client.post(f'/api/posts/{post.id}/like/')
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], tag)
+
+    def test_community_feed(self):
+        self.create_posts(2)
+        url = f'/api/posts/community/{self.community.id}/'
+        # Only the membership check runs
+        tag = self.assert_revalidates(url, 1)
+        Post.objects.create(content='New', author=self.creator, community=self.community)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=tag).status_code, 200)
+
+    def test_tag_is_per_viewer(self):
+        self.create_posts(1)
+        url = f'/api/posts/?community={self.community.id}'
+        tag = self.client.get(url)['ETag']
+        creator_client = APIClient()
+        creator_client.force_authenticate(self.creator)
+        self.assertEqual(creator_client.get(url, HTTP_IF_NONE_MATCH=tag).status_code, 200)
+
+    def test_other_communities_keep_their_tag(self):
+        other = Community.objects.create(name='Others', description='', created_by=self.member)
+        url = f'/api/posts/community/{other.id}/'
+        tag = self.client.get(url)['ETag']
+        self.create_posts(1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=tag).status_code, 304)
+
+
+class WritePathQueryCountTests(PostFeedTestCase):
+    """Membership is resolved once per request on the write paths."""
+
+    def test_create_post_query_count(self):
+        # community lookup, membership set, insert, post_count, timeline fan-out
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                '/api/posts/', {'content': 'Hello', 'community': self.community.id}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.data['is_liked'])
+
+    def test_create_post_requires_membership(self):
+        outsider = User.objects.create_user(username='outsider')
+        self.client.force_authenticate(outsider)
+        response = self.client.post(
+            '/api/posts/', {'content': 'Hello', 'community': self.community.id}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+    def test_like_query_count(self):
+        post = self.create_posts(1)[0]
+        # post, membership set, then insert-if-absent and counter update
+        # (the savepoint pair only appears because tests run in a transaction)
+        with self.assertNumQueries(6):
+            response = self.client.post(f'/api/posts/{post.id}/like/')
+        self.assertEqual(response.data['like_count'], 1)
+
+    def test_like_requires_membership(self):
+        post = self.create_posts(1)[0]
+        outsider = User.objects.create_user(username='outsider')
+        self.client.force_authenticate(outsider)
+        response = self.client.post(f'/api/posts/{post.id}/like/')
+        self.assertEqual(response.status_code, 403)
+
+
+class LikeEndpointTests(PostFeedTestCase):
+    """PUT and DELETE are idempotent; POST toggles."""
+
+    def test_put_and_delete_are_idempotent(self):
+        post = self.create_posts(1)[0]
+        url = f'/api/posts/{post.id}/like/'
+        for _ in range(2):
+            response = self.client.put(url)
+            self.assertEqual((response.data['is_liked'], response.data['like_count']), (True, 1))
+        for _ in range(2):
+            response = self.client.delete(url)
+            self.assertEqual((response.data['is_liked'], response.data['like_count']), (False, 0))
+        self.assertFalse(Like.objects.exists())
+
+    def test_toggle_with_stale_state(self):
+        post = self.create_posts(1)[0]
+        url = f'/api/posts/{post.id}/like/'
+        Like.objects.create(user=self.member, post=post)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['is_liked'], response.data['like_count']), (False, 0))
+
+
+class LikeStateTests(PostFeedTestCase):
+    """GET /api/posts/like-state/ answers for many posts in one query."""
+
+    def test_bulk_state_in_one_query(self):
+        posts = self.create_posts(50)
+        for post in posts[::2]:
+            Like.objects.create(user=self.member, post=post)
+        ids = [post.id for post in posts] + [999999]
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/posts/like-state/', {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([row['id'] for row in results], ids[:-1])
+        self.assertEqual([row['is_liked'] for row in results], [i % 2 == 0 for i in range(50)])
+        self.assertEqual([row['like_count'] for row in results], [1 - i % 2 for i in range(50)])
+
+    def test_anonymous_and_invalid_ids(self):
+        post = self.create_posts(1)[0]
+        anonymous = APIClient()
+        response = anonymous.get('/api/posts/like-state/', {'ids': str(post.id)})
+        self.assertEqual(response.data['results'][0]['is_liked'], False)
+        self.assertEqual(anonymous.get('/api/posts/like-state/', {'ids': '1,x'}).status_code, 400)
+        too_many = ','.join(map(str, range(1, 502)))
+        self.assertEqual(anonymous.get('/api/posts/like-state/', {'ids': too_many}).status_code, 400)
+
+
+class LikeListTests(PostFeedTestCase):
+    """A post's likers are cursor paginated or streamed as NDJSON."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = self.create_posts(1)[0]
+        users = User.objects.bulk_create([User(username=f'fan{i}') for i in range(25)])
+        Like.objects.bulk_create([Like(user=user, post=self.post) for user in users])
+        self.url = f'/api/posts/{self.post.id}/likes/'
+
+    def test_cursor_pages(self):
+        first = self.client.get(self.url, {'page_size': 10})
+        self.assertEqual(len(first.data['results']), 10)
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+        ids = [like['id'] for page in (first, second, third) for like in page.data['results']]
+        self.assertEqual(len(set(ids)), 25)
+        self.assertIsNone(third.data['next'])
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url, {'export': 'ndjson'})
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(json.loads(lines[0])['post_id'], self.post.id)
+
+
+class QueryBudgetTests(QueryBudgetMixin, PostFeedTestCase):
+    """Hot endpoints stay within the query budgets their views declare."""
+
+    def setUp(self):
+        super().setUp()
+        # Real token authentication so the budget covers the user lookup
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.member)}')
+        self.posts = self.create_posts(30)
+
+    def test_read_endpoints(self):
+        post = self.posts[0]
+        self.assertWithinQueryBudget('get', '/api/posts/')
+        self.assertWithinQueryBudget('get', f'/api/posts/{post.id}/')
+        self.assertWithinQueryBudget('get', f'/api/posts/{post.id}/likes/')
+        self.assertWithinQueryBudget('get', f'/api/posts/community/{self.community.id}/')
+        self.assertWithinQueryBudget('get', '/api/posts/feed/')
+        ids = ','.join(str(post.id) for post in self.posts)
+        self.assertWithinQueryBudget('get', f'/api/posts/like-state/?ids={ids}')
+
+    def test_write_endpoints(self):
+        self.assertWithinQueryBudget(
+            'post', '/api/posts/', data={'content': 'New', 'community': self.community.id}
+        )
+        self.assertWithinQueryBudget('post', f'/api/posts/{self.posts[0].id}/like/')
+
+    def test_over_budget_fails_with_queries(self):
+        with self.assertRaisesRegex(AssertionError, r'PostViewSet.list ran 1 queries, over its budget of 0'):
+            self.assertWithinQueryBudget('get', '/api/posts/', budget=0)
+
+
+@override_settings(ROOT_URLCONF='social_feed_prj.urls_asgi')
+class AsyncViewTests(PostFeedTestCase):
+    """The async post views answer exactly like the DRF views they mirror."""
+
+    def setUp(self):
+        super().setUp()
+        token = f'Bearer {AccessToken.for_user(self.member)}'
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=token)
+        self.async_client = AsyncClient()
+        self.headers = {'authorization': token}
+        self.posts = self.create_posts(30)
+        Like.objects.create(user=self.member, post=self.posts[0])
+        instrumentation.reset_stats()
+
+    async def test_reads_match_sync_views(self):
+        ids = ','.join(str(post.id) for post in self.posts[:5])
+        paths = {
+            '/api/posts/': 'AsyncPostListView.get',
+            '/api/posts/?sort=hot': 'AsyncPostListView.get',
+            f'/api/posts/?community={self.community.id}': 'AsyncPostListView.get',
+            f'/api/posts/community/{self.community.id}/?sort=top&window=all': 'AsyncCommunityPostListView.get',
+            f'/api/posts/like-state/?ids={ids}': 'AsyncLikeStateView.get',
+        }
+        for path, endpoint in paths.items():
+            # The second request of a community feed is a cache hit
+            for _ in range(2):
+                response = await self.async_client.get(path, headers=self.headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.instrumentation.endpoint, endpoint)
+                self.assertLessEqual(response.instrumentation.queries, response.instrumentation.budget)
+                with override_settings(ROOT_URLCONF='social_feed_prj.urls'):
+                    expected = await sync_to_async(self.client.get)(path)
+                self.assertEqual(response.json(), json.loads(expected.content))
+
+    async def test_sparse_fieldsets_match_sync_views(self):
+        for path in ('/api/posts/?fields=like_count,is_liked',
+                     f'/api/posts/community/{self.community.id}/?omit=author'):
+            for lean_enabled in (True, False):
+                with override_settings(LEAN_SERIALIZATION=lean_enabled):
+                    response = await self.async_client.get(path, headers=self.headers)
+                    with override_settings(ROOT_URLCONF='social_feed_prj.urls'):
+                        expected = await sync_to_async(self.client.get)(path)
+                self.assertEqual(response.json(), json.loads(expected.content))
+
+    async def test_buffered_likes(self):
+        buffer = like_buffer.LikeBuffer()
+        with override_settings(LIKE_BUFFER_ENABLED=True), \
+                mock.patch.object(like_buffer, 'get_buffer', return_value=buffer), \
+                mock.patch.object(like_buffer.LikeBuffer, 'schedule'):
+            post = self.posts[-1]
+            response = await self.async_client.put(f'/api/posts/{post.id}/like/', headers=self.headers)
+            self.assertEqual(response.json()['like_count'], 1)
+            response = await self.async_client.get(f'/api/posts/like-state/?ids={post.id}', headers=self.headers)
+            self.assertEqual(response.json()['results'], [{'id': post.id, 'like_count': 1, 'is_liked': True}])
+            response = await self.async_client.get('/api/posts/', headers=self.headers)
+            self.assertEqual(response.json()['results'][0]['is_liked'], True)
+        self.assertEqual(await Like.objects.filter(post=post).acount(), 0)
+
+    async def test_conditional_reads(self):
+        path = f'/api/posts/community/{self.community.id}/'
+        response = await self.async_client.get(path, headers=self.headers)
+        tag = response.headers['ETag']
+        with override_settings(ROOT_URLCONF='social_feed_prj.urls'):
+            expected = await sync_to_async(self.client.get)(path)
+        self.assertEqual(expected['ETag'], tag)
+
+        response = await self.async_client.get(path, headers={**self.headers, 'if-none-match': tag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.instrumentation.queries, 1)
+
+    async def test_reads_route_to_replicas(self):
+        path = f'/api/posts/community/{self.community.id}/'
+        with override_settings(DATABASE_REPLICAS=['replica1']), \
+                mock.patch.object(routers, 'choose_replica', return_value='default') as choose_replica:
+            response = await self.async_client.get(path, headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            choose_replica.assert_called_once_with(['replica1'])
+            await self.async_client.post(f'/api/posts/{self.posts[1].id}/like/', headers=self.headers)
+            await self.async_client.get(f'{path}?sort=top', headers=self.headers)
+            choose_replica.assert_called_once()
+
+    async def test_pages_follow_cursors(self):
+        response = await self.async_client.get('/api/posts/', {'page_size': 20}, headers=self.headers)
+        second = await self.async_client.get(response.json()['next'], headers=self.headers)
+        ids = [post['id'] for page in (response, second) for post in page.json()['results']]
+        self.assertEqual(ids, [post.id for post in reversed(self.posts)])
+        self.assertIsNone(second.json()['next'])
+
+    async def test_like_writes(self):
+        url = f'/api/posts/{self.posts[1].id}/like/'
+        response = await self.async_client.post(url, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['like_count'], 1)
+        self.assertLessEqual(response.instrumentation.queries, 5)
+        response = await self.async_client.post(url, headers=self.headers)
+        self.assertEqual((response.status_code, response.json()['is_liked']), (200, False))
+        for method, liked in (('put', True), ('put', True), ('delete', False), ('delete', False)):
+            response = await getattr(self.async_client, method)(url, headers=self.headers)
+            self.assertEqual((response.json()['is_liked'], response.json()['like_count']), (liked, int(liked)))
+
+    async def test_errors(self):
+        outsider = await User.objects.acreate(username='outsider')
+        url = f'/api/posts/{self.posts[0].id}/like/'
+        forbidden = await self.async_client.post(
+            url, headers={'authorization': f'Bearer {AccessToken.for_user(outsider)}'}
+        )
+        self.assertEqual(forbidden.status_code, 403)
+        anonymous = await AsyncClient().post(url)
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertIn('Bearer', anonymous['WWW-Authenticate'])
+        invalid = await self.async_client.get('/api/posts/', headers={'authorization': 'Bearer nope'})
+        self.assertEqual(invalid.status_code, 401)
+        self.assertEqual((await self.async_client.post('/api/posts/999999/like/', headers=self.headers)).status_code, 404)
+        response = await self.async_client.get('/api/posts/?sort=best', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sort must be one of', response.json()['error'])
+        self.assertEqual((await self.async_client.get('/api/posts/like-state/?ids=x', headers=self.headers)).status_code, 400)
+        self.assertEqual((await self.async_client.patch('/api/posts/like-state/', headers=self.headers)).status_code, 405)
+
+    async def test_other_methods_fall_back_to_drf(self):
+        response = await self.async_client.post(
+            '/api/posts/', {'content': 'Async', 'community': self.community.id},
+            content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['content'], 'Async')
+
+    def test_asgi_application_serves_async_views(self):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/posts/like-state/',
+            'raw_path': b'/api/posts/like-state/', 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver')], 'server': ('testserver', 80),
+        }
+        communicator = ApplicationCommunicator(FeedASGIHandler(), scope)
+
+        async def request():
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            start = await communicator.receive_output()
+            body = await communicator.receive_output()
+            return start['status'], body['body']
+
+        self.assertEqual(async_to_sync(request)(), (200, b'{"results":[]}'))
+        self.assertIn('AsyncLikeStateView.get', instrumentation.get_stats())
+
+    @override_settings(ASGI_SYNC_THREADS=2)
+    def test_asgi_requests_share_sync_threads(self):
+        baseline = threading.active_count()
+        scenario = loadtest.Scenario('like-state', 'get', '/api/posts/like-state/')
+        summary = loadtest.run_asgi(FeedASGIHandler(), scenario, {}, requests=24, concurrency=12)
+        self.assertEqual(summary['statuses'], {'200': 24})
+        self.assertLessEqual(summary['peak_threads'] - baseline, 2)
+
+    def test_only_async_handlers_share_sync_threads(self):
+        is_async = FeedASGIHandler.is_async_request
+        self.assertTrue(is_async(loadtest.asgi_scope('get', '/api/posts/', {})))
+        # The DRF fallback, and the regular URLconf, keep a thread per request
+        self.assertFalse(is_async(loadtest.asgi_scope('post', '/api/posts/', {})))
+        self.assertFalse(is_async(loadtest.asgi_scope('get', '/api/communities/', {})))
+        self.assertFalse(is_async(loadtest.asgi_scope('get', '/nowhere/', {})))
+
+    @override_settings(ASGI_SYNC_THREADS=1)
+    def test_slow_sync_requests_do_not_hold_up_async_views(self):
+        def slow_register(view, request, *args, **kwargs):
+            time.sleep(0.5)
+            return Response(status=201)
+
+        handler = FeedASGIHandler()
+
+        async def run():
+            slow = asyncio.create_task(
+                loadtest.asgi_request(handler, loadtest.asgi_scope('post', '/api/auth/register/', {}))
+            )
+            # Let the slow request reach its thread
+            await asyncio.sleep(0.1)
+            start = time.perf_counter()
+            status = await loadtest.asgi_request(handler, loadtest.asgi_scope('get', '/api/posts/like-state/', {}))
+            elapsed = time.perf_counter() - start
+            return status, elapsed, await slow
+
+        # Not async_to_sync: sync work would run on this thread, not the handler's
+        with mock.patch.object(UserRegistrationView, 'post', slow_register):
+            status, elapsed, slow_status = asyncio.run(run())
+        self.assertEqual((status, slow_status), (200, 201))
+        self.assertLess(elapsed, 0.3)
+
+
+@override_settings(FEED_EVENTS_INTERVAL=0)
+class FeedEventBrokerTests(TestCase):
+    """Delivery, coalescing and limits of the in-process broker."""
+
+    async def read(self, stream):
+        return await asyncio.wait_for(anext(stream), 1)
+
+    async def test_publish_reaches_channel_listeners_only(self):
+        broker = feed_events.LocalBroker()
+        subscription = broker.subscribe(['community:1'])
+        stream = aiter(subscription)
+        self.assertTrue((await self.read(stream)).startswith(b'retry: '))
+        self.assertTrue(broker.listening('community:1'))
+        self.assertFalse(broker.listening('community:2'))
+        broker.publish('community:2', 'post', {'id': 1})
+        broker.publish('community:1', 'post', {'id': 2})
+        self.assertEqual(await self.read(stream), b'event: post\ndata: {"id":2}\n\n')
+        await stream.aclose()
+        self.assertEqual((broker.connections, broker.buffers), (0, {}))
+
+    async def test_keyed_events_are_coalesced(self):
+        broker = feed_events.LocalBroker()
+        stream = aiter(broker.subscribe(['community:1']))
+        await self.read(stream)
+        broker.publish('community:1', 'post', {'id': 7})
+        for like_count in (1, 2, 3):
+            broker.publish('community:1', 'like', {'id': 7, 'like_count': like_count}, key='like:7')
+        self.assertEqual(
+            await self.read(stream),
+            b'event: post\ndata: {"id":7}\n\n'
+            b'event: like\ndata: {"id":7,"like_count":3}\n\n'
+        )
+        await stream.aclose()
+
+    @override_settings(FEED_EVENTS_QUEUE_SIZE=2)
+    async def test_slow_listener_is_reset(self):
+        broker = feed_events.LocalBroker()
+        stream = aiter(broker.subscribe(['community:1']))
+        await self.read(stream)
+        for post_id in range(3):
+            broker.publish('community:1', 'post', {'id': post_id})
+        self.assertEqual(await self.read(stream), b'event: reset\ndata: {}\n\n')
+        await stream.aclose()
+
+    @override_settings(FEED_EVENTS_HEARTBEAT=0.01)
+    async def test_idle_streams_send_keepalives(self):
+        stream = aiter(feed_events.LocalBroker().subscribe(['community:1']))
+        await self.read(stream)
+        self.assertEqual(await self.read(stream), b': keepalive\n\n')
+        await stream.aclose()
+
+    async def test_streams_end_at_expiry(self):
+        broker = feed_events.LocalBroker()
+        stream = aiter(broker.subscribe(['community:1'], expires_at=time.time() + 0.05))
+        await self.read(stream)
+        self.assertEqual(await self.read(stream), b'event: close\ndata: {}\n\n')
+        with self.assertRaises(StopAsyncIteration):
+            await self.read(stream)
+        self.assertEqual(broker.connections, 0)
+
+    @override_settings(FEED_EVENTS_HEARTBEAT=0.01)
+    async def test_streams_end_once_unauthorized(self):
+        allowed = True
+
+        async def authorize():
+            return allowed
+
+        stream = aiter(feed_events.LocalBroker().subscribe(['community:1'], authorize=authorize))
+        await self.read(stream)
+        self.assertEqual(await self.read(stream), b': keepalive\n\n')
+        allowed = False
+        while (frame := await self.read(stream)) == b': keepalive\n\n':
+            pass
+        self.assertEqual(frame, b'event: close\ndata: {}\n\n')
+        with self.assertRaises(StopAsyncIteration):
+            await self.read(stream)
+
+    @override_settings(FEED_EVENTS_MAX_CONNECTIONS=1)
+    async def test_connections_are_capped(self):
+        broker = feed_events.LocalBroker()
+        subscription = broker.subscribe(['community:1'])
+        with self.assertRaises(feed_events.BrokerFull):
+            broker.subscribe(['community:2'])
+        subscription.close()
+        broker.subscribe(['community:2']).close()
+        self.assertEqual(broker.connections, 0)
+
+
+@override_settings(ROOT_URLCONF='social_feed_prj.urls_asgi', FEED_EVENTS_INTERVAL=0)
+class FeedEventStreamTests(QueryBudgetMixin, PostFeedTestCase):
+    """The SSE endpoints stream new posts and like counts to members."""
+
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        self.token = str(AccessToken.for_user(self.member))
+        self.headers = {'authorization': f'Bearer {self.token}'}
+
+    def ticket(self, token=None):
+        return str(StreamTicket.for_access_token(AccessToken(token or self.token)))
+
+    async def read_events(self, response, count):
+        """Parse SSE frames until `count` events arrived."""
+        received = []
+        while len(received) < count:
+            chunk = await asyncio.wait_for(anext(response.streaming_content), 1)
+            for frame in chunk.decode().split('\n\n'):
+                lines = dict(line.split(': ', 1) for line in frame.splitlines() if ': ' in line)
+                if 'event' in lines:
+                    received.append((lines['event'], json.loads(lines['data'])))
+        return received
+
+    def post_and_like(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(content='Live', author=self.creator, community=self.community)
+        with self.captureOnCommitCallbacks(execute=True):
+            likes.add_like(self.member, post)
+        return post
+
+    async def test_community_stream(self):
+        response = await self.async_client.get(
+            f'/api/posts/community/{self.community.id}/events/', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        post = await sync_to_async(self.post_and_like)()
+        (kind, data), like = await self.read_events(response, 2)
+        self.assertEqual((kind, data['id'], data['content'], data['is_liked']), ('post', post.id, 'Live', False))
+        self.assertEqual(like, ('like', {'id': post.id, 'like_count': 1}))
+        await sync_to_async(response.close)()
+        self.assertEqual(feed_events.get_broker().connections, 0)
+
+    async def test_home_feed_stream_covers_every_community(self):
+        other = await Community.objects.acreate(name='Others', description='', created_by=self.member)
+        response = await self.async_client.get(f'/api/posts/feed/events/?ticket={self.ticket()}')
+        self.assertEqual(response.status_code, 200)
+
+        def post_in_both():
+            with self.captureOnCommitCallbacks(execute=True):
+                for community in (self.community, other):
+                    Post.objects.create(content=community.name, author=self.member, community=community)
+
+        await sync_to_async(post_in_both)()
+        received = await self.read_events(response, 2)
+        self.assertEqual([data['content'] for _, data in received], ['Testers', 'Others'])
+        await sync_to_async(response.close)()
+
+    async def test_errors(self):
+        outsider = await User.objects.acreate(username='outsider')
+        url = f'/api/posts/community/{self.community.id}/events/'
+        forbidden = await self.async_client.get(url, {'ticket': self.ticket(str(AccessToken.for_user(outsider)))})
+        self.assertEqual(forbidden.status_code, 403)
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+        self.assertEqual((await self.async_client.get(url, {'ticket': 'nope'})).status_code, 401)
+        # Access tokens do not go in URLs
+        self.assertEqual((await self.async_client.get(url, {'ticket': self.token})).status_code, 401)
+        self.assertEqual((await self.async_client.get(url, {'token': self.token})).status_code, 401)
+        with override_settings(FEED_EVENTS_MAX_CONNECTIONS=0):
+            full = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(full.status_code, 503)
+        self.assertEqual(full['Retry-After'], '30')
+
+    def test_streams_within_query_budget(self):
+        for path in (f'/api/posts/community/{self.community.id}/events/', '/api/posts/feed/events/'):
+            response = self.assertWithinQueryBudget('get', path, client=self.async_client, data={'ticket': self.ticket()})
+            self.assertEqual(response.status_code, 200)
+            async_to_sync(sync_to_async(response.close))()
+
+    def test_stream_tickets(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = client.post('/api/auth/stream-ticket/')
+        self.assertEqual((response.status_code, response.data['expires_in']), (201, 30))
+        ticket = StreamTicket(response.data['ticket'])
+        self.assertEqual(ticket['session_exp'], AccessToken(self.token)['exp'])
+        url = f'/api/posts/community/{self.community.id}/events/'
+        # Tickets open streams only
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['ticket']}")
+        self.assertEqual(client.get('/api/posts/').status_code, 401)
+        # Logging out revokes the tickets of the access token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/auth/logout/')
+        clear_caches()
+        response = self.assertWithinQueryBudget(
+            'get', url, client=self.async_client, data={'ticket': response.data['ticket']}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(FEED_EVENTS_HEARTBEAT=0.1)
+    async def test_streams_end_when_the_token_expires(self):
+        token = AccessToken.for_user(self.member)
+        token.set_exp(lifetime=timedelta(seconds=1))
+        response = await self.async_client.get(
+            f'/api/posts/community/{self.community.id}/events/', {'ticket': self.ticket(str(token))}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await self.read_events(response, 1), [('close', {})])
+        await sync_to_async(response.close)()
+
+    @override_settings(FEED_EVENTS_HEARTBEAT=0.01)
+    async def test_streams_end_when_the_member_leaves(self):
+        response = await self.async_client.get(
+            f'/api/posts/community/{self.community.id}/events/', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        await CommunityMember.objects.filter(user=self.member, community=self.community).adelete()
+        self.assertEqual(await self.read_events(response, 1), [('close', {})])
+        await sync_to_async(response.close)()
+
+    def test_writes_without_listeners_publish_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            post = Post.objects.create(content='Quiet', author=self.creator, community=self.community)
+        # The post is not serialized when nobody listens
+        self.assertFalse(any('"auth_user"."username"' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(post.content, 'Quiet')
+
+
+class FeedEventDisconnectTests(TransactionTestCase):
+    """A client leaving an event stream frees its connection slot."""
+
+    def test_disconnect_releases_connection(self):
+        # Committed rows: the ASGI handler queries from its own threads
+        user = User.objects.create_user(username='listener')
+        community = Community.objects.create(name='Live', description='', created_by=user)
+        path = f'/api/posts/community/{community.id}/events/'
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': f'ticket={StreamTicket.for_access_token(AccessToken.for_user(user))}'.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'testserver')], 'server': ('testserver', 80),
+        }
+        communicator = ApplicationCommunicator(FeedASGIHandler(), scope)
+        broker = feed_events.get_broker()
+
+        async def connect_and_leave():
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            start = await communicator.receive_output(1)
+            retry = await communicator.receive_output(1)
+            connections = broker.connections
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(1)
+            return start['status'], retry['body'][:7], connections
+
+        self.assertEqual(async_to_sync(connect_and_leave)(), (200, b'retry: ', 1))
+        self.assertEqual(broker.connections, 0)
+
+
+@override_settings(LIKE_BUFFER_ENABLED=True)
+class LikeBufferTests(PostFeedTestCase):
+    """Buffered likes are coalesced, overlaid on reads and written in batches."""
+
+    def setUp(self):
+        super().setUp()
+        self.post = self.create_posts(1)[0]
+        self.buffer = like_buffer.LikeBuffer()
+        for patcher in (
+            mock.patch.object(like_buffer, 'get_buffer', return_value=self.buffer),
+            # Flushes run in the test's transaction instead of on the timer
+            mock.patch.object(like_buffer.LikeBuffer, 'schedule'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.users = User.objects.bulk_create([User(username=f'fan{i}') for i in range(3)])
+        CommunityMember.objects.bulk_create(
+            [CommunityMember(user=user, community=self.community) for user in self.users]
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def assert_consistent(self, like_count):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, like_count)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), like_count)
+        liked_at = Like.objects.filter(post=self.post).values_list('created_at', flat=True)
+        self.assertAlmostEqual(
+            self.post.hot_score, ranking.compute_score(self.post.created_at, liked_at), places=6
+        )
+
+    def test_likes_are_written_on_flush(self):
+        url = f'/api/posts/{self.post.id}/like/'
+        counts = [self.client_for(user).put(url).data['like_count'] for user in self.users]
+        self.assertEqual(counts, [1, 2, 3])
+        self.assertFalse(Like.objects.exists())
+
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assert_consistent(3)
+
+        for user in self.users[:2]:
+            self.client_for(user).delete(url)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assert_consistent(1)
+
+    def test_intents_are_coalesced(self):
+        client = self.client_for(self.users[0])
+        url = f'/api/posts/{self.post.id}/like/'
+        self.assertEqual([client.post(url).data['is_liked'] for _ in range(3)], [True, False, True])
+        self.assertEqual(self.buffer.open.size, 1)
+        client.post(url)
+        # Liked and unliked before the flush: nothing to write
+        self.assertEqual(self.buffer.open.size, 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buffer.flush(), 0)
+
+    def test_reads_overlay_pending_intents(self):
+        self.client.put(f'/api/posts/{self.post.id}/like/')
+        other = self.client_for(self.users[0])
+        paths = [
+            '/api/posts/', f'/api/posts/{self.post.id}/', f'/api/posts/community/{self.community.id}/',
+            '/api/posts/feed/', f'/api/posts/like-state/?ids={self.post.id}',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                post = response.data['results'][0] if 'results' in response.data else response.data
+                self.assertEqual((post['like_count'], post['is_liked']), (1, True))
+                response = other.get(path)
+                post = response.data['results'][0] if 'results' in response.data else response.data
+                self.assertEqual((post['like_count'], post['is_liked']), (1, False))
+
+        # Flushed: the same answers from the database, without the overlay
+        self.buffer.flush()
+        post = self.client.get(f'/api/posts/community/{self.community.id}/').data['results'][0]
+        self.assertEqual((post['like_count'], post['is_liked']), (1, True))
+
+    def test_pending_like_changes_the_etag(self):
+        url = f'/api/posts/community/{self.community.id}/'
+        tag = self.client.get(url)['ETag']
+        self.client.put(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=tag).status_code, 200)
+
+    @override_settings(LIKE_BUFFER_BATCH_SIZE=2)
+    def test_full_batch_flushes_inline(self):
+        url = f'/api/posts/{self.post.id}/like/'
+        self.client_for(self.users[0]).put(url)
+        self.assertFalse(Like.objects.exists())
+        # The request that fills the batch pays for the write
+        with self.assertLogs('social_feed_prj.instrumentation', 'WARNING'):
+            self.client_for(self.users[1]).put(url)
+        self.assert_consistent(2)
+
+    def test_deleted_posts_are_skipped(self):
+        other = self.create_posts(1)[0]
+        self.client.put(f'/api/posts/{self.post.id}/like/')
+        self.client.put(f'/api/posts/{other.id}/like/')
+        other.delete()
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assert_consistent(1)
+
+    def test_failed_flush_is_retried(self):
+        self.client.put(f'/api/posts/{self.post.id}/like/')
+        with mock.patch.object(like_buffer, 'write', side_effect=RuntimeError), \
+                self.assertLogs('posts.like_buffer', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        # Still overlaid while it waits for the retry
+        self.assertTrue(self.client.get(f'/api/posts/{self.post.id}/').data['is_liked'])
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assert_consistent(1)
+
+
+class LikeBufferTimerTests(TransactionTestCase):
+    """The flush timer writes buffered likes from its own thread."""
+
+    @override_settings(LIKE_BUFFER_ENABLED=True, LIKE_BUFFER_INTERVAL=0.05)
+    def test_timer_flushes(self):
+        clear_caches()
+        user = User.objects.create_user(username='fan')
+        community = Community.objects.create(name='Timer', description='', created_by=user)
+        post = Post.objects.create(content='Viral', author=user, community=community)
+        buffer = like_buffer.LikeBuffer()
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch.object(like_buffer, 'get_buffer', return_value=buffer):
+            self.assertEqual(client.put(f'/api/posts/{post.id}/like/').status_code, 200)
+            for _ in range(200):
+                with buffer.lock:
+                    if not buffer.batches() and buffer.timer is None:
+                        break
+                time.sleep(0.025)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertTrue(Like.objects.filter(user=user, post=post).exists())
+
+
+class ConcurrentLikeTests(FileDatabaseMixin, TransactionTestCase):
+    """Many threads hammering the same post never raise or drift the counter."""
+
+    THREADS = 16
+
+    def setUp(self):
+        clear_caches()
+        creator = User.objects.create_user(username='creator')
+        self.community = Community.objects.create(
+            name='Stress', description='Concurrency', created_by=creator
+        )
+        self.post = Post.objects.create(content='Viral', author=creator, community=self.community)
+        self.users = User.objects.bulk_create(
+            [User(username=f'user{i}') for i in range(self.THREADS)]
+        )
+        CommunityMember.objects.bulk_create(
+            [CommunityMember(user=user, community=self.community) for user in self.users]
+        )
+
+    def hammer(self, requests_for):
+        barrier, errors = Barrier(self.THREADS), []
+
+        def worker(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                for method in requests_for(user):
+                    response = getattr(client, method)(f'/api/posts/{self.post.id}/like/')
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=worker, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def assert_consistent(self):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, Like.objects.filter(post=self.post).count())
+        liked_at = Like.objects.filter(post=self.post).values_list('created_at', flat=True)
+        self.assertAlmostEqual(
+            self.post.hot_score, ranking.compute_score(self.post.created_at, liked_at), places=6
+        )
+
+    def test_concurrent_double_taps(self):
+        # Each user fires the same idempotent like several times at once
+        self.hammer(lambda user: ['put'] * 5)
+        self.assert_consistent()
+        self.assertEqual(self.post.like_count, self.THREADS)
+
+    def test_concurrent_toggles(self):
+        # An odd number of toggles per user must leave every user liking it
+        self.hammer(lambda user: ['post'] * 5)
+        self.assert_consistent()
+        self.assertEqual(self.post.like_count, self.THREADS)
+
+
+@override_settings(FEED_FANOUT_MIN_COMMUNITIES=1)
+class ConcurrentTimelineTests(FileDatabaseMixin, TransactionTestCase):
+    """A post pushed while a timeline is being rewritten is not lost."""
+
+    def setUp(self):
+        clear_caches()
+        self.reader = User.objects.create_user(username='reader')
+        self.community = Community.objects.create(name='Busy', description='', created_by=self.reader)
+        self.other = Community.objects.create(name='Quiet', description='', created_by=self.reader)
+        self.post = Post.objects.create(content='Doomed', author=self.reader, community=self.community)
+
+    def timeline_ids(self):
+        entries = Timeline.objects.get(user=self.reader).entries
+        return {post_id for _, post_id, _ in timelines.decode_entries(entries)}
+
+    def rewrite_during_push(self, rewrite):
+        """
+        Run `rewrite` while another thread creates a post between its read
+        of the timelines and its write; returns that post.
+        """
+        pushed, threads = [], []
+        remove_entries = timelines.remove_entries
+
+        def push():
+            try:
+                pushed.append(Post.objects.create(content='Fresh', author=self.reader, community=self.community))
+            finally:
+                connection.close()
+
+        def push_then_remove(rows, keep):
+            threads.append(Thread(target=push))
+            threads[0].start()
+            # The push waits for the write lock this transaction holds
+            threads[0].join(0.5)
+            self.assertTrue(threads[0].is_alive())
+            remove_entries(rows, keep)
+
+        with mock.patch.object(timelines, 'remove_entries', side_effect=push_then_remove):
+            rewrite()
+        threads[0].join()
+        return pushed[0]
+
+    def test_push_during_remove_post(self):
+        pushed = self.rewrite_during_push(lambda: timelines.remove_post(self.post))
+        self.assertEqual(self.timeline_ids(), {pushed.pk})
+
+    def test_push_during_member_left(self):
+        Post.objects.create(content='Elsewhere', author=self.reader, community=self.other)
+        membership = CommunityMember.objects.get(user=self.reader, community=self.other)
+        pushed = self.rewrite_during_push(lambda: timelines.member_left(membership))
+        self.assertEqual(self.timeline_ids(), {self.post.pk, pushed.pk})
+
+
+class IngestTests(PostFeedTestCase):
+    """Bulk import validates per batch and keeps counters and scores in sync."""
+
+    def ndjson(self, *records):
+        return [json.dumps(record) if isinstance(record, dict) else record for record in records]
+
+    def run_import(self, kind, lines, fmt='ndjson', **kwargs):
+        return ingest.ingest(kind, ingest.read_rows(lines, fmt), **kwargs)
+
+    def test_posts(self):
+        outsider = User.objects.create_user(username='outsider')
+        posted_at = timezone.now() - timedelta(days=3)
+        result = self.run_import('posts', self.ndjson(
+            {'author_id': self.member.id, 'community_id': self.community.id,
+             'content': 'Imported', 'created_at': posted_at.isoformat()},
+            {'author_id': self.creator.id, 'community_id': self.community.id, 'content': 'Now'},
+            {'author_id': outsider.id, 'community_id': self.community.id, 'content': 'Nope'},
+            {'author_id': self.member.id, 'community_id': self.community.id, 'content': ' '},
+            '{not json',
+        ))
+        self.assertEqual((result.received, result.created, result.skipped), (5, 2, 3))
+        self.assertEqual(sorted(error['line'] for error in result.errors), [3, 4, 5])
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.post_count, 2)
+        post = Post.objects.get(content='Imported')
+        self.assertEqual(post.created_at, posted_at)
+        self.assertAlmostEqual(post.hot_score, ranking.initial_score(posted_at), places=6)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def count(rows):
+            lines = self.ndjson(*[
+                {'author_id': self.member.id, 'community_id': self.community.id, 'content': f'Row {i}'}
+                for i in range(rows)
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                self.run_import('posts', lines)
+            return len(queries)
+
+        self.assertEqual(count(5), count(50))
+
+    def test_likes_from_csv(self):
+        post = self.create_posts(1)[0]
+        outsider = User.objects.create_user(username='outsider')
+        liked_at = timezone.now() - timedelta(hours=5)
+        result = self.run_import('likes', [
+            'user_id,post_id,created_at\n',
+            f'{self.member.id},{post.id},{liked_at.isoformat()}\n',
+            f'{self.member.id},{post.id},\n',
+            f'{self.creator.id},{post.id},\n',
+            f'{outsider.id},{post.id},\n',
+            f'{self.member.id},999999,\n',
+        ], fmt='csv')
+        self.assertEqual((result.created, result.skipped), (2, 3))
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 2)
+        self.assertEqual(Like.objects.get(user=self.member).created_at, liked_at)
+        liked = Like.objects.filter(post=post).values_list('created_at', flat=True)
+        self.assertAlmostEqual(post.hot_score, ranking.compute_score(post.created_at, liked), places=6)
+
+    @override_settings(FEED_FANOUT_MIN_COMMUNITIES=2)
+    def test_memberships_and_timelines(self):
+        other = Community.objects.create(name='Other', description='', created_by=self.creator)
+        reader = User.objects.create_user(username='reader')
+        result = self.run_import('memberships', self.ndjson(
+            {'user_id': reader.id, 'community_id': self.community.id},
+            {'user_id': reader.id, 'community_id': other.id},
+            {'user_id': reader.id, 'community_id': other.id},
+            {'user_id': 999999, 'community_id': other.id},
+        ), batch_size=2)
+        self.assertEqual((result.created, result.skipped), (2, 2))
+        other.refresh_from_db()
+        self.assertEqual(other.member_count, 2)
+        self.assertTrue(Timeline.objects.filter(user=reader).exists())
+
+    def test_endpoint(self):
+        body = '\n'.join(self.ndjson(
+            {'author_id': self.member.id, 'community_id': self.community.id, 'content': 'Over HTTP'}
+        ))
+        url = '/api/posts/import/?kind=posts'
+        response = self.client.post(url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 403)
+
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.post(url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['created'], 1)
+        response = self.client.post('/api/posts/import/?kind=users', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('author_id,community_id,content\n')
+            source.write(f'{self.member.id},{self.community.id},"Hello, CSV"\n')
+        out = StringIO()
+        call_command('import_feed', 'posts', source.name, batch_size=10, stdout=out)
+        self.assertIn('Imported 1 of 1 posts', out.getvalue())
+        self.assertTrue(Post.objects.filter(content='Hello, CSV').exists())
+
+
+class SyntheticDataTests(TestCase):
+    """seed_synthetic produces skewed data with consistent derived columns."""
+
+    def test_generate(self):
+        out = StringIO()
+        call_command(
+            'seed_synthetic', users=80, communities=8, posts=300, likes=600, stdout=out
+        )
+        self.assertIn('Created 80 users, 8 communities', out.getvalue())
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertGreater(Like.objects.count(), 300)
+
+        sizes = list(Community.objects.order_by('-member_count').values_list('member_count', flat=True))
+        self.assertGreater(sizes[0], 2 * sizes[len(sizes) // 2])
+        for command in ('rebuild_counters', 'refresh_post_scores'):
+            out = StringIO()
+            call_command(command, dry_run=True, stdout=out)
+            self.assertNotRegex(out.getvalue(), r'[1-9]\d* row\(s\) drifted')
+
+        with self.assertRaisesMessage(CommandError, 'already exist'):
+            call_command('seed_synthetic', users=1, communities=1, posts=0, likes=0, stdout=StringIO())
+
+
+class LeanSerializationTests(PostFeedTestCase):
+    """The lean list path answers byte for byte like the serializers."""
+
+    def setUp(self):
+        super().setUp()
+        self.member.first_name, self.member.last_name = 'Zoë', 'O\u2028Brien'
+        self.member.save()
+        self.posts = self.create_posts(3) + self.create_posts(3, author=self.member)
+        self.posts[0].content = 'Ünïcödé "quotes" \\ \x01 \u2029 🎉'
+        self.posts[0].save()
+        Like.objects.create(user=self.member, post=self.posts[1])
+        Like.objects.create(user=self.creator, post=self.posts[4])
+
+    def fetch(self, path, lean_enabled):
+        clear_caches()
+        with override_settings(LEAN_SERIALIZATION=lean_enabled):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_lists_match_the_serializers(self):
+        paths = [
+            '/api/posts/', '/api/posts/?page_size=2', '/api/posts/?sort=hot&page_size=4',
+            '/api/posts/?sort=top&window=all', f'/api/posts/?community={self.community.id}',
+            f'/api/posts/community/{self.community.id}/?page_size=3',
+            '/api/communities/',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual(self.fetch(path, True), self.fetch(path, False))
+        # Deeper pages, through the cursors of the lean path
+        response = self.client.get('/api/posts/?page_size=2')
+        path = response.data['next']
+        self.assertEqual(self.fetch(path, True), self.fetch(path, False))
+
+    def test_lists_read_values_not_models(self):
+        with mock.patch('posts.serializers.PostSerializer.to_representation') as to_representation:
+            self.assertEqual(len(self.client.get('/api/posts/').data['results']), 6)
+        to_representation.assert_not_called()
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            'text': 'Ünïcödé "q" \\ \x00\x1f\x7f \n\t \u2028\u2029 🎉',
+            'when': timezone.now(),
+            'nested': [{'id': 1, 'ok': True, 'none': None, 'big': 2 ** 62}],
+            'uuid': uuid.UUID(int=7),
+            'decimal': Decimal('1.50'),
+            1: 'int key',
+        }
+        for value in (data, [data], 'plain', None):
+            self.assertEqual(FastJSONRenderer().render(value), JSONRenderer().render(value))
+        # Indented output is JSONRenderer's
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+
+class SparseFieldsetTests(PostFeedTestCase):
+    """?fields= / ?omit= prune the output and the SQL behind it."""
+
+    def setUp(self):
+        super().setUp()
+        self.posts = self.create_posts(3)
+        Like.objects.create(user=self.member, post=self.posts[0])
+
+    def fetch(self, path, lean_enabled=True):
+        clear_caches()
+        with override_settings(LEAN_SERIALIZATION=lean_enabled), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response, ' '.join(query['sql'] for query in queries)
+
+    def test_fields_and_omit(self):
+        cases = {
+            '/api/posts/?fields=like_count,is_liked': ['id', 'like_count', 'is_liked'],
+            '/api/posts/?omit=author,content,community_name': [
+                'id', 'created_at', 'community', 'like_count', 'is_liked'
+            ],
+            '/api/posts/?fields=content,author&omit=content': ['id', 'author'],
+        }
+        for path, keys in cases.items():
+            for lean_enabled in (True, False):
+                with self.subTest(path=path, lean=lean_enabled):
+                    response, _ = self.fetch(path, lean_enabled)
+                    self.assertEqual(list(response.data['results'][0]), keys)
+
+    def test_serializer_and_lean_paths_match(self):
+        for path in ('/api/posts/?fields=like_count,is_liked&sort=hot',
+                     f'/api/posts/community/{self.community.id}/?omit=author'):
+            with self.subTest(path=path):
+                self.assertEqual(self.fetch(path, True)[0].content, self.fetch(path, False)[0].content)
+
+    def test_pruned_fields_are_not_selected(self):
+        for lean_enabled in (True, False):
+            with self.subTest(lean=lean_enabled):
+                _, sql = self.fetch('/api/posts/?fields=like_count', lean_enabled)
+                self.assertNotIn('"content"', sql)
+                self.assertNotIn('auth_user', sql)
+                self.assertNotIn('communities_community', sql)
+        # The lean path does not select the like annotation either
+        self.assertNotIn('EXISTS', self.fetch('/api/posts/?fields=like_count')[1])
+        # Cursor pages still read their key from the rows
+        _, sql = self.fetch('/api/posts/feed/?fields=like_count')
+        self.assertNotIn('"content"', sql)
+        self.assertIn('"created_at"', sql)
+
+    def test_cached_page_without_is_liked_skips_the_overlay(self):
+        url = f'/api/posts/community/{self.community.id}/?fields=like_count'
+        self.client.get(url)
+        # Only the membership check
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'like_count'])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/posts/?fields=like_count,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Unknown fields: secret')
+
+    def test_writes_ignore_fields(self):
+        response = self.client.post(
+            '/api/posts/?fields=id', {'content': 'Hello', 'community': self.community.id}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('content', response.data)
+
+
+class CompressionTests(TestCase):
+    """Large responses are compressed; small ones and event streams are not."""
+
+    def process(self, response, accept_encoding='gzip, deflate, br'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return compression.CompressionMiddleware(lambda request: response)(request)
+
+    def test_threshold(self):
+        body = b'{"results": []}' * 100
+        with override_settings(COMPRESSION_MIN_SIZE=len(body)):
+            self.assertTrue(self.process(HttpResponse(body)).has_header('Content-Encoding'))
+        with override_settings(COMPRESSION_MIN_SIZE=len(body) + 1):
+            self.assertFalse(self.process(HttpResponse(body)).has_header('Content-Encoding'))
+
+    def test_gzip_without_brotli(self):
+        with mock.patch.object(compression, 'brotli', None):
+            response = self.process(HttpResponse(b'a' * 4096))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_identity_when_not_accepted(self):
+        response = self.process(HttpResponse(b'a' * 4096), accept_encoding='')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(response.content), 4096)
+
+    def test_event_streams_are_not_compressed(self):
+        response = self.process(
+            StreamingHttpResponse(iter([b'data: 1\n\n']), content_type='text/event-stream')
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_brotli(self):
+        if compression.brotli is None:
+            raise SkipTest('brotli is not installed')
+        response = self.process(HttpResponse(b'a' * 4096, headers={'ETag': '"v1"'}))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertEqual(compression.brotli.decompress(response.content), b'a' * 4096)
+
+    def test_api_responses(self):
+        user = User.objects.create_user(username='reader')
+        community = Community.objects.create(name='Big', description='x' * 2000, created_by=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f'/api/communities/{community.id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class LoadTestTests(PostFeedTestCase):
+    """The bench_api harness measures scenarios and compares runs."""
+
+    def test_run_and_compare(self):
+        post = self.create_posts(1)[0]
+        scenario = loadtest.Scenario(
+            'posts.like', 'put', f'/api/posts/{post.id}/like/',
+            reset=lambda client, iteration: client.delete(f'/api/posts/{post.id}/like/'),
+        )
+        summary = loadtest.run_scenario(self.client, scenario, repeat=4, warmup=1)
+        self.assertEqual((summary['runs'], summary['statuses']), (4, {'200': 4}))
+        self.assertGreater(summary['queries_mean'], 0)
+        self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+
+        report = loadtest.build_report({'posts.like': summary}, {'users': 2})
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            loadtest.save_report(report, output.name)
+            previous = loadtest.load_report(output.name)
+        previous['scenarios']['posts.like']['queries_mean'] = summary['queries_mean'] / 2
+        rows = {(name, metric): change for name, metric, _, _, change in loadtest.compare(previous, report)}
+        self.assertAlmostEqual(rows['posts.like', 'queries_mean'], 1.0)
+
+
+class CounterTests(PostFeedTestCase):
+    """Stored counters follow likes and posts without aggregate queries."""
+
+    def test_like_toggle_updates_counter(self):
+        post = self.create_posts(1)[0]
+        response = self.client.post(f'/api/posts/{post.id}/like/')
+        self.assertEqual(response.data['like_count'], 1)
+        response = self.client.post(f'/api/posts/{post.id}/like/')
+        self.assertEqual(response.data['like_count'], 0)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+
+    def test_post_create_and_delete_update_community_counter(self):
+        post = self.create_posts(2)[0]
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.post_count, 2)
+        post.delete()
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.post_count, 1)
+
+    def test_saving_a_stale_copy_keeps_counters(self):
+        post = self.create_posts(1)[0]
+        community = Community.objects.get(pk=self.community.pk)
+        self.client.post(f'/api/posts/{post.id}/like/')
+        CommunityMember.objects.create(user=User.objects.create_user(username='late'), community=self.community)
+        post.content = 'Edited'
+        post.save()
+        community.description = 'Edited'
+        community.save()
+        post.refresh_from_db()
+        community.refresh_from_db()
+        self.assertEqual((post.content, post.like_count), ('Edited', 1))
+        self.assertGreater(post.hot_score, ranking.initial_score(post.created_at))
+        self.assertEqual((community.description, community.member_count, community.post_count), ('Edited', 3, 1))
+
+    def test_posts_do_not_change_community(self):
+        post = self.create_posts(1, author=self.member)[0]
+        other = Community.objects.create(name='Other', description='', created_by=self.member)
+        response = self.client.patch(f'/api/posts/{post.id}/', {'community': other.pk, 'content': 'Moved?'})
+        self.assertEqual((response.status_code, response.data['community']), (200, self.community.pk))
+        post.refresh_from_db()
+        self.assertEqual((post.community_id, post.content), (self.community.pk, 'Moved?'))
+
+    def test_rebuild_counters_repairs_drift(self):
+        post = self.create_posts(1)[0]
+        Like.objects.create(user=self.member, post=post)
+        Post.objects.filter(pk=post.pk).update(like_count=7)
+        Community.objects.filter(pk=self.community.pk).update(member_count=0, post_count=9)
+
+        call_command('rebuild_counters', stdout=StringIO())
+
+        post.refresh_from_db()
+        self.community.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(self.community.member_count, 2)
+        self.assertEqual(self.community.post_count, 1)
+
+
+class AdminChangeListTests(PostFeedTestCase):
+    """Post and like change lists stay a fixed number of queries."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username='admin')
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    def test_change_lists_do_not_grow_with_rows(self):
+        for path in ('/admin/posts/post/', '/admin/posts/like/',
+                     f'/admin/posts/post/?community__id__exact={self.community.id}'):
+            posts = self.create_posts(2)
+            for post in posts:
+                Like.objects.create(user=self.member, post=post)
+            baseline = self.count_queries(path)
+            for index in range(5):
+                Community.objects.create(name=f'Other {path} {index}', description='', created_by=self.creator)
+            posts = self.create_posts(10)
+            for post in posts:
+                Like.objects.create(user=self.member, post=post)
+            self.assertEqual(self.count_queries(path), baseline, path)
+
+    def test_community_filter_is_an_autocomplete(self):
+        response = self.client.get(f'/admin/posts/post/?community__id__exact={self.community.id}')
+        self.assertContains(response, 'data-ajax--url="/admin/autocomplete/"')
+        self.assertContains(response, f'<option value="{self.community.id}" selected>Testers</option>', html=True)
+        autocomplete = self.client.get('/admin/autocomplete/', {
+            'app_label': 'posts', 'model_name': 'post', 'field_name': 'community', 'term': 'Test',
+        })
+        self.assertEqual([item['text'] for item in autocomplete.json()['results']], ['Testers'])
+
+    def test_large_tables_use_an_estimated_count(self):
+        self.create_posts(3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/admin/posts/post/')
+            self.assertEqual(response.context['cl'].result_count, 3)
+            self.assertFalse([query for query in queries.captured_queries
+                              if query['sql'].startswith('SELECT COUNT(*)')])
+            # Filtered lists are counted exactly
+            response = self.client.get('/admin/posts/post/?q=Post+1')
+            self.assertEqual(response.context['cl'].result_count, 1)
@@ -0,0 +1,235 @@
+"""
+Home feed assembly.
+
+Users in at least ``FEED_FANOUT_MIN_COMMUNITIES`` communities own a Timeline
+row that is updated whenever a post is created in one of their communities
+(fan-out on write). Everyone else is served by a k-way merge of their
+communities' feeds at read time (fan-out on read), which stays cheap while the
+number of communities is small and costs nothing on the write path.
+
+Timeline entries are fixed-width hex records, newest first, so pushing a post
+to every follower is one ``entries = substr(new || entries, 1, max)`` UPDATE.
+A timeline that has had entries cut off its end is marked ``truncated``;
+paging past its oldest entry then continues by merging on read, even after
+deletions or a left community have shortened it.
+
+Removing entries (a deleted post, a left community) reads, filters and
+rewrites each timeline, so a push committed in between would be lost. The
+rewrite therefore runs in a transaction that holds the write lock from its
+first read: select_for_update() on databases with row locks, and on SQLite,
+which ignores it, the BEGIN IMMEDIATE of ``transaction_mode`` in settings.
+Pushes wait for the rewrite to commit and then apply on top of it.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from calendar import timegm
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.lookups import GreaterThanOrEqual
+from communities.models import CommunityMember
+from .models import Post, Timeline
+
+# created_at in microseconds, post id, community id
+ENTRY_FORMAT = '{:014x}{:012x}{:010x}'
+ENTRY_WIDTH = 36
+
+
+def fanout_min_communities():
+    """Membership count from which a user gets a precomputed timeline."""
+    return getattr(settings, 'FEED_FANOUT_MIN_COMMUNITIES', 5)
+
+
+def timeline_length():
+    """Maximum number of entries kept per timeline."""
+    return getattr(settings, 'FEED_TIMELINE_LENGTH', 500)
+
+
+def to_micros(value):
+    return timegm(value.utctimetuple()) * 1_000_000 + value.microsecond
+
+
+def encode_entry(created_at, post_id, community_id):
+    return ENTRY_FORMAT.format(to_micros(created_at), post_id, community_id)
+
+
+def decode_entries(packed):
+    """Unpack a timeline into ``(micros, post_id, community_id)`` tuples, newest first."""
+    entries = [
+        (int(packed[i:i + 14], 16), int(packed[i + 14:i + 26], 16), int(packed[i + 26:i + 36], 16))
+        for i in range(0, len(packed) - ENTRY_WIDTH + 1, ENTRY_WIDTH)
+    ]
+    # Concurrent pushes may commit slightly out of order
+    entries.sort(reverse=True)
+    return entries
+
+
+def encode_entries(entries):
+    return ''.join(ENTRY_FORMAT.format(*entry) for entry in entries)
+
+
+def entry_key(entry):
+    """Sort key putting the newest (created_at, id) first."""
+    return -entry[0], -entry[1]
+
+
+# Write path
+
+def rebuild_timeline(user_id):
+    """(Re)create a user's timeline from their communities' recent posts."""
+    rows = Post.objects.filter(
+        community__members__user_id=user_id
+    ).order_by('-created_at', '-id').values_list('created_at', 'id', 'community_id')
+    # One row past the limit tells whether older posts were left out
+    rows = list(rows[:timeline_length() + 1])
+    packed = ''.join(encode_entry(*row) for row in rows[:timeline_length()])
+    Timeline.objects.update_or_create(
+        user_id=user_id, defaults={'entries': packed, 'truncated': len(rows) > timeline_length()}
+    )
+
+
+def push_post(post):
+    """Fan a new post out to the timelines of its community's members."""
+    entry = encode_entry(post.created_at, post.pk, post.community_id)
+    width = timeline_length() * ENTRY_WIDTH
+    Timeline.objects.filter(
+        user__community_memberships__community_id=post.community_id
+    ).update(
+        entries=Substr(Concat(Value(entry), F('entries')), 1, width),
+        # Right-hand sides see the old row: a full timeline loses its oldest entry
+        truncated=Case(When(GreaterThanOrEqual(Length('entries'), width), then=Value(True)), default=F('truncated')),
+    )
+
+
+def remove_entries(timelines, keep):
+    """Rewrite `timelines` keeping only entries for which `keep(entry)` is true."""
+    for timeline in timelines:
+        timeline.entries = encode_entries(
+            entry for entry in decode_entries(timeline.entries) if keep(entry)
+        )
+    Timeline.objects.bulk_update(timelines, ['entries'])
+
+
+def remove_post(post):
+    """Drop a deleted post from the timelines of its community's members."""
+    # Write-locked before the read (see the module docstring)
+    with transaction.atomic():
+        timelines = list(
+            Timeline.objects.select_for_update().filter(
+                user__community_memberships__community_id=post.community_id
+            )
+        )
+        remove_entries(timelines, lambda entry: entry[1] != post.pk)
+
+
+def member_joined(membership):
+    """Give the user a timeline once they cross the threshold, or refresh it."""
+    count = CommunityMember.objects.filter(user_id=membership.user_id).count()
+    if count >= fanout_min_communities():
+        rebuild_timeline(membership.user_id)
+
+
+def refresh_timelines(community_ids=(), user_ids=()):
+    """
+    Rebuild, once each, the timelines affected by rows written in bulk: those
+    of members of `community_ids` who own one, and those of `user_ids` who
+    now belong to enough communities to get one. Returns how many were rebuilt.
+    """
+    owners = set(
+        Timeline.objects.filter(
+            user__community_memberships__community_id__in=community_ids
+        ).values_list('user_id', flat=True)
+    ) if community_ids else set()
+    if user_ids:
+        owners.update(
+            CommunityMember.objects.filter(user_id__in=user_ids)
+            .values('user_id')
+            .annotate(total=Count('id'))
+            .filter(total__gte=fanout_min_communities())
+            .values_list('user_id', flat=True)
+        )
+    for user_id in owners:
+        rebuild_timeline(user_id)
+    return len(owners)
+
+
+def member_left(membership):
+    """Remove the community's posts, or the whole timeline below the threshold."""
+    count = CommunityMember.objects.filter(user_id=membership.user_id).count()
+    if count < fanout_min_communities():
+        Timeline.objects.filter(user_id=membership.user_id).delete()
+        return
+    # Write-locked before the read (see the module docstring)
+    with transaction.atomic():
+        timelines = list(
+            Timeline.objects.select_for_update().filter(user_id=membership.user_id)
+        )
+        remove_entries(timelines, lambda entry: entry[2] != membership.community_id)
+
+
+# Read path
+
+def read_timeline(packed, position, reverse, limit, truncated=False):
+    """
+    Slice up to `limit` post ids after `position` from a timeline.
+
+    Returns None when the page runs past the end of a truncated (or full)
+    timeline, so the caller can fall back to merging on read for older posts.
+    """
+    entries = decode_entries(packed)
+    truncated = truncated or len(entries) >= timeline_length()
+    if position is None:
+        page = entries[:limit]
+    else:
+        key = (-to_micros(position[0]), -position[1])
+        if reverse and truncated and (not entries or key > entry_key(entries[-1])):
+            # Paging back from a position older than the timeline reaches
+            # posts it no longer holds
+            return None
+        if reverse:
+            end = bisect_left(entries, key, key=entry_key)
+            page = entries[max(0, end - limit):end][::-1]
+        else:
+            start = bisect_right(entries, key, key=entry_key)
+            page = entries[start:start + limit]
+    if not reverse and len(page) < limit and truncated:
+        return None
+    return [entry[1] for entry in page]
+
+
+def merge_communities(community_ids, paginator, position, reverse, limit):
+    """
+    k-way merge of each community's feed, one index range read per community.
+    """
+    streams = []
+    for community_id in community_ids:
+        rows = Post.objects.filter(community_id=community_id)
+        if position is not None:
+            rows = rows.filter(paginator.position_filter(Post, position, reverse))
+        streams.append(
+            rows.order_by(*paginator.get_ordering(reverse)).values_list('created_at', 'id')[:limit]
+        )
+    merged = heapq.merge(*streams, reverse=not reverse)
+    return [pk for _, pk in islice(merged, limit)]
+
+
+def home_feed_ids(user, paginator, raw_position, reverse, limit):
+    """
+    Return up to `limit` post ids from the user's home feed strictly after the
+    cursor position, in read order.
+    """
+    position = None
+    if raw_position is not None:
+        position = paginator.decode_position(Post, raw_position)
+
+    timeline = Timeline.objects.filter(user=user).first()
+    if timeline is not None:
+        post_ids = read_timeline(timeline.entries, position, reverse, limit, timeline.truncated)
+        if post_ids is not None:
+            return post_ids
+
+    community_ids = CommunityMember.objects.filter(user=user).values_list('community_id', flat=True)
+    return merge_communities(list(community_ids), paginator, raw_position, reverse, limit)
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommunityPostListView
+from .views import PostViewSet, CommunityPostListView, HomeFeedView, IngestView
 
 router = DefaultRouter()
 router.register(r'', PostViewSet, basename='post')
 
 urlpatterns = [
+    path('feed/', HomeFeedView.as_view(), name='home-feed'),
+    path('import/', IngestView.as_view(), name='post-import'),
     path('', include(router.urls)),
     path('community/<int:community_id>/', CommunityPostListView.as_view(), name='community-posts'),
 ]
@@ -1,14 +1,178 @@
+import csv
+from functools import partial
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from django.db.models import Count, Exists, OuterRef
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.views import APIView
+from django.db.models import BooleanField, Exists, F, OuterRef, Value
 from django.shortcuts import get_object_or_404
+from communities import membership
+from social_feed_prj import cache as feed_cache
+from social_feed_prj import export
+from social_feed_prj.fieldsets import SparseQuerysetMixin
+from social_feed_prj.lean import LeanListMixin
+from social_feed_prj.pagination import (
+    FeedCursorPagination, HotCursorPagination, LikeCursorPagination, TopCursorPagination
+)
+from social_feed_prj.renderers import FastJSONRenderer
+from . import ingest, like_buffer, ranking, timelines
+from .like_buffer import PendingLikesMixin
+from .likes import add_like, remove_like, toggle_like
 from .models import Post, Like
-from .serializers import PostSerializer, PostCreateSerializer, LikeSerializer
+from .serializers import POST_PLAN, PostSerializer, PostCreateSerializer, LikeSerializer
 
 
-class PostViewSet(viewsets.ModelViewSet):
+def viewer_liked(user):
+    """
+    Annotation resolving whether `user` liked each post in a single query,
+    so serializing a page never issues one Like lookup per row.
+    """
+    if not user.is_authenticated:
+        return Value(False, output_field=BooleanField())
+    return Exists(Like.objects.filter(post=OuterRef('pk'), user=user))
+
+
+def overlay_likes(posts, user):
+    """Set the per-viewer is_liked flag on shared (cached) post payloads."""
+    if not posts or 'is_liked' not in posts[0]:
+        # Left out by a sparse fieldset
+        return
+    liked_ids = set()
+    if user.is_authenticated:
+        liked_ids = set(
+            Like.objects.filter(
+                user=user, post_id__in=[post['id'] for post in posts]
+            ).values_list('post_id', flat=True)
+        )
+    for post in posts:
+        post['is_liked'] = post['id'] in liked_ids
+
+
+def cached_first_page(view, request, community_id, build):
+    """
+    Serve the first page of a community feed from the shared cache.
+    Deeper (cursor) pages are always read live.
+    """
+    if request.query_params.get(view.paginator.cursor_query_param):
+        return build()
+    payload, hit = feed_cache.cached_payload(
+        feed_cache.COMMUNITY_FEED,
+        [feed_cache.feed_scope(community_id)],
+        request,
+        lambda: build().data
+    )
+    if hit:
+        overlay_likes(payload['results'], request.user)
+    return Response(payload)
+
+
+def apply_like(method, user, post):
+    """
+    The like write for a POST (toggle), PUT (like) or DELETE (unlike);
+    returns ``(is_liked, like_count, status_code)``. With LIKE_BUFFER_ENABLED
+    the write is left to posts.like_buffer.
+    """
+    if like_buffer.is_enabled():
+        return like_buffer.get_buffer().submit(method, user, post)
+    if method == 'PUT':
+        _, like_count = add_like(user, post)
+        return True, like_count, status.HTTP_200_OK
+    if method == 'DELETE':
+        _, like_count = remove_like(user, post)
+        return False, like_count, status.HTTP_200_OK
+    is_liked, like_count = toggle_like(user, post, liked_hint=post.is_liked)
+    return is_liked, like_count, status.HTTP_201_CREATED if is_liked else status.HTTP_200_OK
+
+
+def like_response(is_liked, like_count, status_code):
+    return Response(
+        {
+            'message': 'Post liked' if is_liked else 'Post unliked',
+            'is_liked': is_liked,
+            'like_count': like_count
+        },
+        status=status_code
+    )
+
+
+def not_member_response():
+    return Response(
+        {'error': 'You must be a member of the community to like posts'},
+        status=status.HTTP_403_FORBIDDEN
+    )
+
+
+def requested_post_ids(request, max_ids):
+    """Post ids from ``?ids=1,2,3``, deduplicated in request order."""
+    try:
+        post_ids = list(dict.fromkeys(
+            int(value) for value in request.query_params.get('ids', '').split(',') if value
+        ))
+    except ValueError:
+        raise ValidationError({'error': 'ids must be a comma-separated list of post ids'})
+    if len(post_ids) > max_ids:
+        raise ValidationError({'error': f'At most {max_ids} ids per request'})
+    return post_ids
+
+
+def like_state_rows(post_ids, user):
+    """``(id, like_count, is_liked)`` for each existing post, in one query."""
+    return Post.objects.filter(pk__in=post_ids).annotate(
+        is_liked=viewer_liked(user)
+    ).order_by().values_list('id', 'like_count', 'is_liked')
+
+
+def like_state_payload(post_ids, rows):
+    state = {
+        post_id: {'id': post_id, 'like_count': like_count, 'is_liked': is_liked}
+        for post_id, like_count, is_liked in rows
+    }
+    return {'results': [state[post_id] for post_id in post_ids if post_id in state]}
+
+
+class FeedSortMixin:
+    """
+    ``?sort=new|hot|top`` on a post list, plus ``?window=24h|7d|30d|all`` for
+    top. Each sort pages on its own indexed key, so the paginator is chosen
+    per request.
+    """
+    sort_paginations = {
+        'new': FeedCursorPagination,
+        'hot': HotCursorPagination,
+        'top': TopCursorPagination,
+    }
+    default_window = '24h'
+
+    def get_sort(self):
+        """Return ``(sort, window)`` from the query string."""
+        params = self.request.query_params
+        sort = params.get('sort', 'new')
+        if sort not in self.sort_paginations:
+            raise ValidationError({'error': f"sort must be one of: {', '.join(self.sort_paginations)}"})
+        window = params.get('window', self.default_window)
+        if window not in ranking.TOP_WINDOWS:
+            raise ValidationError({'error': f"window must be one of: {', '.join(ranking.TOP_WINDOWS)}"})
+        return sort, window
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            self._paginator = self.sort_paginations[self.get_sort()[0]]()
+        return self._paginator
+
+    def sort_queryset(self, queryset):
+        """Restrict top to posts created within the window."""
+        sort, window = self.get_sort()
+        start = ranking.window_start(window) if sort == 'top' else None
+        if start is not None:
+            queryset = queryset.filter(created_at__gte=start)
+        return queryset
+
+
+class PostViewSet(PendingLikesMixin, FeedSortMixin, LeanListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Post CRUD operations.
     
@@ -19,17 +183,32 @@ class PostViewSet(viewsets.ModelViewSet):
     partial_update: PATCH /api/posts/{id}/ - Partial update (author only)
     destroy: DELETE /api/posts/{id}/ - Delete post (author only)
     like: POST /api/posts/{id}/like/ - Toggle like on post
-    likes: GET /api/posts/{id}/likes/ - Get list of users who liked post
+    likes: GET /api/posts/{id}/likes/ - Get users who liked post (cursor paginated)
+    like_state: GET /api/posts/like-state/?ids=1,2,3 - Counts and is_liked in bulk
+
+    The list is paginated with opaque cursors over (created_at, id), or
+    (hot_score, id) / (like_count, id) with ?sort=hot / ?sort=top. Reads
+    accept ?fields= / ?omit= (social_feed_prj.fieldsets).
     """
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = FeedCursorPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    lean_plan = POST_PLAN
+    like_state_max_ids = 500
+    # SQL statements per request, authentication included
+    query_budgets = {
+        'list': 1, 'retrieve': 1, 'create': 6, 'like': 4, 'like_state': 1, 'likes': 2,
+    }
+    # Read from a replica (social_feed_prj.routers)
+    replica_actions = {'list', 'retrieve', 'likes'}
     
     def get_queryset(self):
-        """Get posts with annotations for like count."""
+        """Get posts annotated with the viewer's like state."""
         user = self.request.user
         queryset = Post.objects.select_related(
             'author', 'community'
         ).annotate(
-            like_count=Count('likes', distinct=True)
+            is_liked=viewer_liked(user)
         ).order_by('-created_at')
         
         # Filter by community if provided
@@ -37,6 +216,8 @@ class PostViewSet(viewsets.ModelViewSet):
         if community_id:
             queryset = queryset.filter(community_id=community_id)
         
+        if self.action == 'list':
+            queryset = self.sort_queryset(queryset)
         return queryset
     
     def get_serializer_class(self):
@@ -45,6 +226,24 @@ class PostViewSet(viewsets.ModelViewSet):
             return PostCreateSerializer
         return PostSerializer
     
+    def list(self, request, *args, **kwargs):
+        """
+        The first page of a single community's posts is cached. Both lists
+        answer If-None-Match from the feed generations.
+        """
+        community_id = request.query_params.get('community')
+        build = partial(super().list, request, *args, **kwargs)
+        # The viewer's buffered likes are overlaid on the page
+        pending = like_buffer.viewer_version(request.user)
+        if not community_id:
+            return feed_cache.conditional_response(
+                feed_cache.POST_LIST, [feed_cache.posts_scope()], request, build, vary=(pending,)
+            )
+        return feed_cache.conditional_response(
+            feed_cache.COMMUNITY_FEED, [feed_cache.feed_scope(community_id)], request,
+            partial(cached_first_page, self, request, community_id, build), vary=(pending,)
+        )
+    
     def perform_create(self, serializer):
         """Set the author as the current user."""
         serializer.save(author=self.request.user)
@@ -57,6 +256,7 @@ class PostViewSet(viewsets.ModelViewSet):
         
         # Return full post data with PostSerializer
         post = serializer.instance
+        post.is_liked = False
         output_serializer = PostSerializer(post, context={'request': request})
         headers = self.get_success_headers(output_serializer.data)
         return Response(output_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -81,96 +281,174 @@ class PostViewSet(viewsets.ModelViewSet):
             )
         return super().destroy(request, *args, **kwargs)
     
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post', 'put', 'delete'], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
         """
         POST /api/posts/{id}/like/
         Toggle like on a post (like if not liked, unlike if already liked).
+
+        PUT /api/posts/{id}/like/ - Like (idempotent, safe to retry)
+        DELETE /api/posts/{id}/like/ - Unlike (idempotent, safe to retry)
+
         Only community members can like posts.
         """
         post = self.get_object()
-        user = request.user
         
         # Check if user is a member of the community
-        from communities.models import CommunityMember
-        is_member = CommunityMember.objects.filter(
-            user=user,
-            community=post.community
-        ).exists()
-        
-        if not is_member:
-            return Response(
-                {'error': 'You must be a member of the community to like posts'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Check if already liked
-        like = Like.objects.filter(user=user, post=post).first()
-        
-        if like:
-            # Unlike
-            like.delete()
-            return Response(
-                {
-                    'message': 'Post unliked',
-                    'is_liked': False,
-                    'like_count': post.likes.count()
-                },
-                status=status.HTTP_200_OK
-            )
-        else:
-            # Like
-            Like.objects.create(user=user, post=post)
-            return Response(
-                {
-                    'message': 'Post liked',
-                    'is_liked': True,
-                    'like_count': post.likes.count()
-                },
-                status=status.HTTP_201_CREATED
-            )
+        if not membership.is_member(request, post.community_id):
+            return not_member_response()
+        return like_response(*apply_like(request.method, request.user, post))
+    
+    @action(detail=False, methods=['get'], url_path='like-state')
+    def like_state(self, request):
+        """
+        GET /api/posts/like-state/?ids=1,2,3
+        Like counts and the viewer's is_liked for many posts in one query,
+        read from the stored like_count counters. Unknown ids are omitted.
+        """
+        post_ids = requested_post_ids(request, self.like_state_max_ids)
+        rows = like_state_rows(post_ids, request.user)
+        return Response(like_state_payload(post_ids, rows))
     
     @action(detail=True, methods=['get'])
     def likes(self, request, pk=None):
         """
         GET /api/posts/{id}/likes/
-        Get list of users who liked this post.
+        Get users who liked this post, most recent first, one cursor page
+        at a time. ?export=ndjson streams the full list instead.
         """
         post = self.get_object()
-        likes = post.likes.select_related('user').order_by('-created_at')
-        serializer = LikeSerializer(likes, many=True)
-        return Response(serializer.data)
+        likes = post.likes.all()
+        if export.wants_export(request):
+            return export.stream_ndjson(
+                likes.order_by('-created_at', '-id').values(
+                    'id', 'user_id', 'post_id', 'created_at', username=F('user__username')
+                ),
+                f'post-{post.pk}-likes.ndjson'
+            )
+        
+        paginator = LikeCursorPagination()
+        page = paginator.paginate_queryset(likes.select_related('user'), request, view=self)
+        serializer = LikeSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
-class CommunityPostListView(generics.ListAPIView):
+class CommunityPostListView(PendingLikesMixin, FeedSortMixin, LeanListMixin, SparseQuerysetMixin,
+                            generics.ListAPIView):
     """
     GET /api/communities/{community_id}/posts/
     Get all posts for a specific community (feed view).
     Only accessible to community members.
+    Accepts ?sort=new|hot|top and, for top, ?window=24h|7d|30d|all.
     """
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = FeedCursorPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    lean_plan = POST_PLAN
+    query_budgets = {'get': 2}
+    replica_actions = {'get'}
+    
+    def is_member(self):
+        """Check if the user is a member of the community."""
+        return membership.is_member(self.request, self.kwargs['community_id'])
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Members get the first page from the shared cache; If-None-Match is
+        answered from the feed generation.
+        """
+        community_id = self.kwargs['community_id']
+        member = self.is_member()
+        build = partial(super().list, request, *args, **kwargs)
+        if member:
+            build = partial(cached_first_page, self, request, community_id, build)
+        return feed_cache.conditional_response(
+            feed_cache.COMMUNITY_FEED, [feed_cache.feed_scope(community_id)], request, build,
+            vary=(member, like_buffer.viewer_version(request.user))
+        )
     
     def get_queryset(self):
         """Get posts for specific community if user is a member."""
         community_id = self.kwargs['community_id']
         user = self.request.user
         
-        # Check if user is a member
-        from communities.models import CommunityMember
-        is_member = CommunityMember.objects.filter(
-            user=user,
-            community_id=community_id
-        ).exists()
-        
-        if not is_member:
+        if not self.is_member():
             return Post.objects.none()
         
-        return Post.objects.filter(
+        return self.sort_queryset(Post.objects.filter(
             community_id=community_id
         ).select_related(
             'author', 'community'
         ).annotate(
-            like_count=Count('likes', distinct=True)
-        ).order_by('-created_at')
+            is_liked=viewer_liked(user)
+        ).order_by('-created_at'))
+
 
+class HomeFeedView(PendingLikesMixin, SparseQuerysetMixin, generics.ListAPIView):
+    """
+    GET /api/posts/feed/
+    Posts from every community the user belongs to, newest first.
+    Served from the user's precomputed timeline when they have one,
+    otherwise by merging their communities' feeds on read.
+    """
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = FeedCursorPagination
+    # Worst case merges one query per community below the fan-out threshold
+    query_budgets = {'get': 7}
+    replica_actions = {'get'}
+
+    def get_queryset(self):
+        """Posts are selected by id from the timeline or merge."""
+        return Post.objects.select_related(
+            'author', 'community'
+        ).annotate(
+            is_liked=viewer_liked(self.request.user)
+        )
+
+    def paginate_queryset(self, queryset):
+        def fetch(position, reverse, limit):
+            post_ids = timelines.home_feed_ids(
+                self.request.user, self.paginator, position, reverse, limit
+            )
+            posts = queryset.in_bulk(post_ids)
+            return [posts[pk] for pk in post_ids if pk in posts]
+
+        return self.paginator.paginate_with(fetch, self.request)
+
+
+class IngestView(APIView):
+    """
+    POST /api/posts/import/?kind=posts|memberships|likes
+    Bulk-load rows from an NDJSON (application/x-ndjson) or CSV (text/csv)
+    request body, a batch at a time (admin only). Invalid rows are skipped
+    and reported; see posts.ingest for the columns of each kind.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        kind = request.query_params.get('kind')
+        if kind not in ingest.KINDS:
+            return Response(
+                {'error': f"kind must be one of: {', '.join(ingest.KINDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            batch_size = int(request.query_params.get('batch_size', ingest.get_batch_size()))
+        except ValueError:
+            batch_size = 0
+        if batch_size < 1:
+            return Response(
+                {'error': 'batch_size must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Read the body as a stream so large uploads are never held in memory
+        fmt = ingest.format_for('', request.content_type)
+        lines = ingest.decode_lines(request.stream or [])
+        try:
+            result = ingest.ingest(kind, ingest.read_rows(lines, fmt), batch_size)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            return Response({'error': f'Unreadable body: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
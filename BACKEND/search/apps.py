@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_fts(sender, using, **kwargs):
+    from django.db import connections
+    from . import backends, fts
+    fts.install(connections[using])
+    backends.forget_fts5_state()
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_fts, sender=self)
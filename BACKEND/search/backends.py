@@ -0,0 +1,166 @@
+"""
+Search backends.
+
+On SQLite builds with FTS5 the ``search_post_fts`` and ``search_community_fts``
+external-content tables (see search.fts) index ``Post.content`` and
+``Community.name/description``. Triggers on the source tables keep them in
+sync, including for bulk_create and raw SQL writes. Everywhere else an
+in-process InvertedIndex is used instead.
+
+Both backends take the same parsed query: every term must match, and the
+last term is a prefix while the user is still typing it.
+
+Ranking has to score every match, so a very broad query (a word in a tenth
+of all posts) would cost time proportional to the table. Queries matching
+more than SEARCH_RANK_WINDOW documents are ranked among the newest
+SEARCH_RANK_WINDOW matches only, which keeps latency flat and suits a feed.
+"""
+from django.conf import settings
+from django.db import connection
+from communities.models import Community
+from posts.models import Post
+from . import fts
+from .index import InvertedIndex, tokenize
+
+POST = 'post'
+COMMUNITY = 'community'
+KINDS = (POST, COMMUNITY)
+
+MAX_TERMS = 8
+CHUNK_SIZE = 5000
+
+
+def rank_window():
+    """Maximum number of matches scored for one query."""
+    return getattr(settings, 'SEARCH_RANK_WINDOW', 5000)
+
+
+def parse_query(text):
+    """Return ``[(token, is_prefix)]`` for a raw query string."""
+    tokens = tokenize(text)[:MAX_TERMS]
+    prefix_last = bool(tokens) and not text[-1:].isspace()
+    return [(token, prefix_last and index == len(tokens) - 1) for index, token in enumerate(tokens)]
+
+
+class Fts5Backend:
+    """SQLite FTS5 with bm25() ranking."""
+    name = 'fts5'
+    tables = {POST: 'search_post_fts', COMMUNITY: 'search_community_fts'}
+
+    @staticmethod
+    def match_expression(terms):
+        # Tokens are \w+ so quoting them is enough to neutralise FTS5 syntax
+        return ' '.join(f'"{token}"' + ('*' if prefix else '') for token, prefix in terms)
+
+    def search(self, kind, terms, community_id=None, offset=0, limit=20):
+        """Return ``[(object_id, score)]``, best first; higher scores are better."""
+        table = self.tables[kind]
+        source = f'FROM {table}'
+        where = f'WHERE {table} MATCH %s'
+        params = [self.match_expression(terms)]
+        if kind == POST and community_id is not None:
+            source += f' JOIN {Post._meta.db_table} AS post ON post.id = {table}.rowid'
+            where += ' AND post.community_id = %s'
+            params.append(community_id)
+
+        with connection.cursor() as cursor:
+            # FTS5 walks a doclist in rowid order cheaply, so find where the
+            # newest `window` matches start and rank only from there
+            cursor.execute(
+                f'SELECT {table}.rowid {source} {where} '
+                f'ORDER BY {table}.rowid DESC LIMIT 1 OFFSET %s',
+                params + [rank_window() - 1]
+            )
+            floor = cursor.fetchone()
+            if floor is not None:
+                where += f' AND {table}.rowid >= %s'
+                params.append(floor[0])
+            cursor.execute(
+                f'SELECT {table}.rowid, bm25({table}) AS score {source} {where} '
+                f'ORDER BY score, {table}.rowid DESC LIMIT %s OFFSET %s',
+                params + [limit, offset]
+            )
+            # bm25() is lower-is-better; flip it to match the memory backend
+            return [(object_id, -score) for object_id, score in cursor.fetchall()]
+
+    def rebuild(self, optimize=False):
+        fts.install(connection)
+        with connection.cursor() as cursor:
+            for table in self.tables.values():
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES('rebuild')")
+                if optimize:
+                    cursor.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+
+
+class MemoryBackend:
+    """
+    Per-process inverted indexes, built on first use; only writes made by
+    this process reach them (see search.index).
+    """
+    name = 'memory'
+
+    def __init__(self):
+        self.indexes = {kind: InvertedIndex() for kind in KINDS}
+        self.built = False
+
+    def ensure_built(self):
+        if not self.built:
+            self.rebuild()
+
+    def rebuild(self, optimize=False):
+        posts, communities = self.indexes[POST], self.indexes[COMMUNITY]
+        with posts.lock, communities.lock:
+            posts.clear()
+            rows = Post.objects.order_by().values_list('id', 'content', 'community_id')
+            for post_id, content, community_id in rows.iterator(chunk_size=CHUNK_SIZE):
+                posts.add(post_id, content, community_id)
+            communities.clear()
+            rows = Community.objects.order_by().values_list('id', 'name', 'description')
+            for community_id, name, description in rows.iterator(chunk_size=CHUNK_SIZE):
+                communities.add(community_id, f'{name} {description}')
+            self.built = True
+
+    def search(self, kind, terms, community_id=None, offset=0, limit=20):
+        self.ensure_built()
+        return self.indexes[kind].search(terms, community_id, offset, limit, rank_window())
+
+    # Kept current by search.signals once built
+
+    def index_post(self, post):
+        if self.built:
+            self.indexes[POST].add(post.pk, post.content, post.community_id)
+
+    def index_community(self, community):
+        if self.built:
+            self.indexes[COMMUNITY].add(community.pk, f'{community.name} {community.description}')
+
+    def remove(self, kind, object_id):
+        if self.built:
+            self.indexes[kind].remove(object_id)
+
+
+memory_backend = MemoryBackend()
+_fts5_databases = {}
+
+
+def forget_fts5_state():
+    _fts5_databases.clear()
+
+
+def fts5_ready():
+    """Whether the FTS5 tables exist in the current database (checked once)."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_databases:
+        tables = connection.introspection.table_names()
+        _fts5_databases[name] = all(table in tables for table in Fts5Backend.tables.values())
+    return _fts5_databases[name]
+
+
+def get_backend():
+    """The configured backend; SEARCH_BACKEND is 'auto', 'fts5' or 'memory'."""
+    choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if choice == 'fts5' or (choice == 'auto' and fts5_ready()):
+        return Fts5Backend()
+    return memory_backend
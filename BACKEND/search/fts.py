@@ -0,0 +1,70 @@
+"""
+SQLite FTS5 schema for search.
+
+The FTS tables are external-content tables over ``posts_post`` and
+``communities_community``, kept in sync by triggers. They are installed
+idempotently after every ``migrate`` rather than by a migration, because
+SQLite migrations that remake a source table (e.g. adding a NOT NULL column)
+silently drop its triggers; any missing trigger is recreated and the index
+rebuilt.
+"""
+FTS_TABLES = (
+    # (fts table, source table, indexed columns)
+    ('search_post_fts', 'posts_post', ('content',)),
+    ('search_community_fts', 'communities_community', ('name', 'description')),
+)
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def trigger_sql(fts, source, columns):
+    """Triggers from the SQLite docs for keeping an external-content table in sync."""
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in columns)
+    insert = f'INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values});'
+    delete = (
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    return {
+        f'{fts}_ai': f'AFTER INSERT ON {source} BEGIN {insert} END',
+        f'{fts}_ad': f'AFTER DELETE ON {source} BEGIN {delete} END',
+        # Counter updates touch other columns and must not reindex the row
+        f'{fts}_au': f'AFTER UPDATE OF {column_list} ON {source} WHEN {changed} BEGIN {delete} {insert} END',
+    }
+
+
+def install(connection):
+    """Create missing FTS tables and triggers; return the tables rebuilt."""
+    if not fts5_available(connection):
+        return []
+    rebuilt = []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        for fts, source, columns in FTS_TABLES:
+            if source not in existing:
+                continue
+            stale = fts not in existing
+            if stale:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                    f"{', '.join(columns)}, content='{source}', content_rowid='id')"
+                )
+            for name, body in trigger_sql(fts, source, columns).items():
+                if name not in existing:
+                    cursor.execute(f'CREATE TRIGGER {name} {body}')
+                    stale = True
+            if stale:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES('rebuild')")
+                rebuilt.append(fts)
+    return rebuilt
+
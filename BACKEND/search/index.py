@@ -0,0 +1,138 @@
+"""
+In-process inverted index with BM25 ranking.
+
+Used as the search backend when the database has no FTS5. Each process
+builds its own index on first use and keeps it current through the
+signals in search.signals, so rows written around the ORM (bulk_create,
+raw SQL) only show up after ``manage.py rebuild_search_index`` or a restart.
+
+Signals only reach the process that wrote the row: with several worker
+processes, a post created in one never appears in the others' results
+until they restart. The index is for single-process deployments (and
+development); use a database with FTS5 otherwise.
+"""
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+TOKEN_RE = re.compile(r'\w+')
+
+# BM25 parameters, same defaults as SQLite FTS5
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """
+    Postings of ``token -> {doc_id: term frequency}`` plus per-document
+    lengths and an optional filter value (the post's community).
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.postings = {}
+            self.lengths = {}
+            self.tokens = {}
+            self.groups = {}
+            self.total_length = 0
+            self.vocabulary = None
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, doc_id, text, group=None):
+        with self.lock:
+            self.remove(doc_id)
+            counts = Counter(tokenize(text))
+            for token, frequency in counts.items():
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = {}
+                    self.vocabulary = None
+                postings[doc_id] = frequency
+            self.tokens[doc_id] = tuple(counts)
+            self.lengths[doc_id] = length = sum(counts.values())
+            self.groups[doc_id] = group
+            self.total_length += length
+
+    def remove(self, doc_id):
+        with self.lock:
+            if doc_id not in self.lengths:
+                return
+            for token in self.tokens.pop(doc_id):
+                postings = self.postings[token]
+                del postings[doc_id]
+                if not postings:
+                    del self.postings[token]
+                    self.vocabulary = None
+            self.total_length -= self.lengths.pop(doc_id)
+            del self.groups[doc_id]
+
+    def expand_prefix(self, prefix):
+        """Vocabulary tokens starting with `prefix`."""
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        start = bisect_left(self.vocabulary, prefix)
+        matches = []
+        for token in self.vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def term_postings(self, term, prefix):
+        """Postings for a query term; a prefix term merges every expansion."""
+        if not prefix:
+            return self.postings.get(term, {})
+        merged = {}
+        for token in self.expand_prefix(term):
+            for doc_id, frequency in self.postings[token].items():
+                merged[doc_id] = merged.get(doc_id, 0) + frequency
+        return merged
+
+    def search(self, terms, group=None, offset=0, limit=20, window=None):
+        """
+        Return ``[(doc_id, score)]`` for documents containing every term,
+        best first. `terms` are ``(token, is_prefix)`` pairs. With `window`,
+        only the newest (highest id) `window` matches are scored.
+        """
+        with self.lock:
+            if not terms or not self.lengths:
+                return []
+            postings = sorted(
+                (self.term_postings(term, prefix) for term, prefix in terms), key=len
+            )
+            candidates = set(postings[0])
+            for other in postings[1:]:
+                candidates.intersection_update(other)
+            if group is not None:
+                candidates = {doc_id for doc_id in candidates if self.groups[doc_id] == group}
+            if window is not None and len(candidates) > window:
+                candidates = heapq.nlargest(window, candidates)
+
+            count = len(self.lengths)
+            average_length = self.total_length / count
+            weights = [
+                math.log(1 + (count - len(term) + 0.5) / (len(term) + 0.5)) for term in postings
+            ]
+            scored = []
+            for doc_id in candidates:
+                norm = K1 * (1 - B + B * self.lengths[doc_id] / average_length)
+                score = 0.0
+                for weight, term in zip(weights, postings):
+                    frequency = term[doc_id]
+                    score += weight * frequency * (K1 + 1) / (frequency + norm)
+                scored.append((-score, -doc_id))
+            best = heapq.nsmallest(offset + limit, scored)[offset:]
+            return [(-doc_id, -score) for score, doc_id in best]
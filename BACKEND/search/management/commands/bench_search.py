@@ -0,0 +1,121 @@
+import random
+import string
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from communities.models import Community
+from posts.models import Post
+from search.backends import Fts5Backend, MemoryBackend, parse_query
+from social_feed_prj.benchmark import isolated_database, measure, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark search over synthetic posts whose words follow a Zipf '
+        'distribution: FTS5 and the in-process index versus a LIKE scan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--vocabulary', type=int, default=50_000)
+        parser.add_argument('--words-per-post', type=int, default=12)
+        parser.add_argument('--communities', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--memory', action='store_true',
+                            help='Also build and measure the in-process index.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = self.make_vocabulary(rng, options['vocabulary'])
+        with isolated_database():
+            community_ids = self.seed(rng, vocabulary, options)
+            queries = self.queries(vocabulary, community_ids)
+            self.stdout.write(f"\n{'query':<34} {'backend':<8} {'p50 ms':>9} {'p95 ms':>9}")
+            self.bench(Fts5Backend(), queries, options['repeat'])
+            if options['memory']:
+                backend = MemoryBackend()
+                self.stdout.write('Building the in-process index...')
+                backend.rebuild()
+                self.bench(backend, queries, options['repeat'])
+            self.bench_like(queries[:3], max(3, options['repeat'] // 10))
+            self.bench_api(vocabulary, options['repeat'])
+
+    def make_vocabulary(self, rng, size):
+        words = set()
+        while len(words) < size:
+            words.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))))
+        return sorted(words, key=lambda word: rng.random())
+
+    def seed(self, rng, vocabulary, options):
+        author = User.objects.create_user(username='author')
+        community_ids = [
+            Community.objects.create(name=f'Community {i}', description='', created_by=author).pk
+            for i in range(options['communities'])
+        ]
+        # Zipf: the word at rank r is drawn with weight 1 / r
+        cum_weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+        total, batch = options['posts'], 20_000
+        self.stdout.write(f'Seeding {total} posts (indexed by the FTS5 triggers)...')
+        for start in range(0, total, batch):
+            Post.objects.bulk_create([
+                Post(
+                    content=' '.join(rng.choices(
+                        vocabulary, cum_weights=cum_weights, k=options['words_per_post']
+                    )),
+                    author=author,
+                    community_id=community_ids[i % len(community_ids)],
+                )
+                for i in range(start, min(start + batch, total))
+            ])
+        return community_ids
+
+    def queries(self, vocabulary, community_ids):
+        return [
+            ('rare word (rank 20000)', vocabulary[19_999] + ' ', None),
+            ('mid word (rank 1000)', vocabulary[999] + ' ', None),
+            ('common word (rank 10)', vocabulary[9] + ' ', None),
+            ('two words (ranks 50, 300)', f'{vocabulary[49]} {vocabulary[299]} ', None),
+            ('prefix (3 letters)', vocabulary[999][:3], None),
+            ('mid word in one community', vocabulary[999] + ' ', community_ids[0]),
+        ]
+
+    def bench(self, backend, queries, repeat):
+        for label, text, community_id in queries:
+            terms = parse_query(text)
+
+            def run():
+                return backend.search('post', terms, community_id, 0, 20)
+
+            self.report(label, backend.name, summarize(measure(run, repeat)))
+
+    def bench_like(self, queries, repeat):
+        """The admin's search_fields: LIKE '%word%' over every post."""
+        for label, text, _ in queries:
+            def run():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT id FROM posts_post WHERE content LIKE %s '
+                        'ORDER BY created_at DESC LIMIT 20',
+                        [f'%{text.strip()}%']
+                    )
+                    return cursor.fetchall()
+
+            self.report(label, 'like', summarize(measure(run, repeat, warmup=1)))
+
+    def bench_api(self, vocabulary, repeat):
+        client = APIClient()
+
+        def run():
+            return client.get('/api/search/', {'q': vocabulary[999]})
+
+        self.report('GET /api/search/ (mid word)', 'fts5', summarize(measure(run, repeat)))
+
+    def report(self, label, backend, summary):
+        self.stdout.write(
+            f"{label:<34} {backend:<8} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f}"
+        )
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from search.backends import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the search index from posts and communities: the FTS5 tables '
+        '(recreating any missing sync triggers) or, without FTS5, the '
+        'in-process index of this process.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--optimize', action='store_true',
+                            help='Merge FTS5 index segments after rebuilding.')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        start = time.perf_counter()
+        backend.rebuild(optimize=options['optimize'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the {backend.name} search index in {time.perf_counter() - start:.2f}s.'
+        ))
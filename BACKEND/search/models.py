@@ -0,0 +1 @@
+# Search has no Django models; its SQLite FTS5 tables are managed in search.fts.
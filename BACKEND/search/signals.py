@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from communities.models import Community
+from posts.models import Post
+from .backends import COMMUNITY, POST, memory_backend
+
+# The FTS5 backend is kept in sync by database triggers; these receivers only
+# maintain the in-process fallback index, and only once it has been built.
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    memory_backend.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    memory_backend.remove(POST, instance.pk)
+
+
+@receiver(post_save, sender=Community)
+def index_community(sender, instance, **kwargs):
+    memory_backend.index_community(instance)
+
+
+@receiver(post_delete, sender=Community)
+def unindex_community(sender, instance, **kwargs):
+    memory_backend.remove(COMMUNITY, instance.pk)
@@ -0,0 +1,153 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from communities.models import Community
+from posts.models import Post
+from social_feed_prj.testing import QueryBudgetMixin, clear_caches
+from . import fts
+from .backends import get_backend, memory_backend, parse_query
+
+
+class ParseQueryTests(TestCase):
+
+    def test_last_word_is_prefix_while_typing(self):
+        self.assertEqual(parse_query('Hello wor'), [('hello', False), ('wor', True)])
+        self.assertEqual(parse_query('hello world '), [('hello', False), ('world', False)])
+
+    def test_syntax_is_stripped(self):
+        self.assertEqual(parse_query('"a" OR b* NEAR(c'), [
+            ('a', False), ('or', False), ('b', False), ('near', False), ('c', True)
+        ])
+        self.assertEqual(parse_query(' -- '), [])
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class SearchTests(QueryBudgetMixin, TestCase):
+    """GET /api/search/ against the FTS5 tables."""
+
+    def setUp(self):
+        clear_caches()
+        memory_backend.built = False
+        self.author = User.objects.create_user(username='author')
+        self.garden = Community.objects.create(
+            name='Gardening', description='Tomatoes and compost', created_by=self.author
+        )
+        self.cooking = Community.objects.create(
+            name='Cooking', description='Recipes with tomatoes', created_by=self.author
+        )
+        self.client = APIClient()
+
+    def post(self, content, community=None):
+        return Post.objects.create(
+            content=content, author=self.author, community=community or self.garden
+        )
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids(self, **params):
+        return [result['id'] for result in self.search(**params)['results']]
+
+    def test_ranked_by_relevance(self):
+        once = self.post('A tomato plant with some leaves and a long stem and roots')
+        twice = self.post('Tomato tomato')
+        for i in range(5):
+            self.post(f'Nothing relevant here {i}')
+        self.assertEqual(self.ids(q='tomato '), [twice.id, once.id])
+        results = self.search(q='tomato ')['results']
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertIn('is_liked', results[0])
+
+    def test_all_words_must_match_and_last_is_prefix(self):
+        both = self.post('Compost tea for tomatoes')
+        self.post('Compost only')
+        self.assertEqual(self.ids(q='compost tom'), [both.id])
+
+    def test_community_filter(self):
+        self.post('Tomato soup', self.garden)
+        in_cooking = self.post('Tomato soup', self.cooking)
+        self.assertEqual(self.ids(q='tomato', community=self.cooking.id), [in_cooking.id])
+
+    def test_communities(self):
+        self.assertEqual(self.ids(q='recipes', type='community'), [self.cooking.id])
+        self.assertEqual(set(self.ids(q='tomatoes', type='community')), {self.garden.id, self.cooking.id})
+        self.assertIn('member_count', self.search(q='gardening', type='community')['results'][0])
+
+    def test_index_follows_writes(self):
+        post = self.post('Original words')
+        Post.objects.bulk_create([
+            Post(content='Bulk words', author=self.author, community=self.garden)
+        ])
+        self.assertEqual(len(self.ids(q='words ')), 2)
+
+        post.content = 'Edited text'
+        post.save()
+        self.assertEqual(self.ids(q='original '), [])
+        self.assertEqual(self.ids(q='edited '), [post.id])
+        Post.objects.filter(pk=post.pk).update(like_count=5)
+        self.assertEqual(self.ids(q='edited '), [post.id])
+
+        post.delete()
+        self.assertEqual(self.ids(q='edited '), [])
+
+    def test_pagination(self):
+        for i in range(5):
+            self.post(f'Seedling number {i}')
+        first = self.search(q='seedling ', page_size=2)
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNone(first['previous'])
+        third = self.client.get(self.client.get(first['next']).data['next']).data
+        self.assertEqual(len(third['results']), 1)
+        self.assertIsNone(third['next'])
+
+    @override_settings(SEARCH_RANK_WINDOW=3)
+    def test_broad_queries_rank_newest_matches(self):
+        best = self.post('Weed weed weed weed')
+        newer = [self.post(f'Weed and some other words {i}') for i in range(3)]
+        self.assertEqual(set(self.ids(q='weed ')), {post.id for post in newer})
+        self.assertNotIn(best.id, self.ids(q='weed '))
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/api/search/', {'q': '  '}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'type': 'user'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'page': 0}).status_code, 404)
+
+    def test_query_budget(self):
+        self.post('Tomato')
+        self.assertWithinQueryBudget('get', '/api/search/', data={'q': 'tomato'})
+        self.assertWithinQueryBudget('get', '/api/search/', data={'q': 'tomato', 'type': 'community'})
+
+
+@override_settings(SEARCH_BACKEND='memory')
+class MemorySearchTests(SearchTests):
+    """The same behaviour from the in-process inverted index."""
+
+    def test_index_follows_writes(self):
+        # bulk_create bypasses signals; the in-process index sees it after a rebuild
+        post = self.post('Original words')
+        self.assertEqual(self.ids(q='words '), [post.id])
+        Post.objects.bulk_create([
+            Post(content='Bulk words', author=self.author, community=self.garden)
+        ])
+        get_backend().rebuild()
+        self.assertEqual(len(self.ids(q='words ')), 2)
+
+        post.content = 'Edited text'
+        post.save()
+        self.assertEqual(self.ids(q='original '), [])
+        self.assertEqual(self.ids(q='edited '), [post.id])
+
+        post.delete()
+        self.assertEqual(self.ids(q='edited '), [])
+
+
+class FtsInstallTests(TestCase):
+
+    def test_missing_triggers_are_recreated(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER search_post_fts_ai')
+        self.assertEqual(fts.install(connection), ['search_post_fts'])
+        self.assertEqual(fts.install(connection), [])
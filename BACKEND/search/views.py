@@ -0,0 +1,77 @@
+from rest_framework import generics, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from communities.models import Community
+from communities.serializers import CommunitySerializer
+from posts.models import Post
+from posts.serializers import PostSerializer
+from posts.like_buffer import PendingLikesMixin
+from posts.views import viewer_liked
+from social_feed_prj import fieldsets
+from social_feed_prj.pagination import RankedPagination
+from .backends import COMMUNITY, KINDS, POST, get_backend, parse_query
+
+
+class SearchView(PendingLikesMixin, generics.GenericAPIView):
+    """
+    GET /api/search/?q=...&type=post|community&community={id}
+    Ranked full-text search over post content (the default) or community
+    names and descriptions. Posts can be restricted to one community.
+    Every word must match; the last one also matches as a prefix.
+    """
+    permission_classes = [AllowAny]
+    pagination_class = RankedPagination
+    # SQL statements per request, authentication included
+    query_budgets = {'get': 4}
+    # Read from a replica (social_feed_prj.routers)
+    replica_actions = {'get'}
+
+    def get(self, request):
+        terms = parse_query(request.query_params.get('q', ''))
+        if not terms:
+            return Response(
+                {'error': 'q must contain at least one word'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        kind = request.query_params.get('type', POST)
+        if kind not in KINDS:
+            return Response(
+                {'error': f"type must be one of: {', '.join(KINDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        community_id = request.query_params.get('community')
+        if community_id is not None:
+            try:
+                community_id = int(community_id)
+            except ValueError:
+                return Response(
+                    {'error': 'community must be a community id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        backend = get_backend()
+        hits = self.paginator.paginate_with(
+            lambda offset, limit: backend.search(kind, terms, community_id, offset, limit),
+            request
+        )
+        scores = dict(hits)
+        if kind == COMMUNITY:
+            objects = Community.objects.select_related('created_by')
+            serializer_class = CommunitySerializer
+        else:
+            objects = Post.objects.select_related('author', 'community').annotate(
+                is_liked=viewer_liked(request.user)
+            )
+            serializer_class = PostSerializer
+        context = self.get_serializer_context()
+        if fieldsets.requested(request) is not None:
+            # SparseQuerysetMixin
+            objects = fieldsets.prune_queryset(objects, serializer_class(context=context))
+        objects = objects.in_bulk(list(scores))
+
+        # Rows deleted since the index was read are skipped
+        found = [objects[object_id] for object_id, _ in hits if object_id in objects]
+        data = serializer_class(found, many=True, context=context).data
+        for item in data:
+            item['score'] = round(scores[item['id']], 6)
+        return self.paginator.get_paginated_response(data)
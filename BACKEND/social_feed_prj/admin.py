@@ -0,0 +1,102 @@
+"""
+Admin helpers for the large tables (posts, likes, memberships).
+
+The stock change list counts the whole table for its paginator, counts it
+again for the "N total" link, and fills relation filters with every related
+row. LargeTableAdmin estimates the unfiltered count from table statistics,
+skips the second count, and AutocompleteListFilter replaces the list of
+choices with a search box served by the admin's autocomplete view.
+"""
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def get_estimate_threshold():
+    return getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100_000)
+
+
+def estimated_row_count(model, using):
+    """The row count the database keeps in its statistics, or None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            # -1 until the table was first vacuumed or analyzed
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            # sqlite_stat1 only exists once ANALYZE (or PRAGMA optimize) ran
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # The first number of each entry is the number of rows
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts an unfiltered change list from table statistics when they put it
+    above ADMIN_ESTIMATED_COUNT_THRESHOLD rows; filtered lists, and smaller
+    tables, are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > get_estimate_threshold():
+                return estimate
+        return super().count
+
+
+class AutocompleteListFilter(admin.RelatedFieldListFilter):
+    """
+    Filter by a related object picked in an autocomplete box instead of a
+    list of every related object. The related model's admin must define
+    search_fields.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.widget = AutocompleteSelect(field, model_admin.admin_site)
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def has_output(self):
+        return True
+
+    def field_choices(self, field, request, model_admin):
+        # The widget loads the selected object itself
+        return []
+
+    def rendered_widget(self):
+        self.widget.choices = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all()
+        ).choices
+        value = self.lookup_val[0] if self.lookup_val else None
+        return self.widget.render(self.lookup_kwarg, value, attrs={'id': f'filter_{self.lookup_kwarg}'})
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin for tables too large to count on every page view."""
+    paginator = EstimatedCountPaginator
+    # The "N total" link next to the search box counts the whole table
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, tuple) and issubclass(list_filter[1], AutocompleteListFilter):
+                field = self.model._meta.get_field(list_filter[0])
+                media += AutocompleteSelect(field, self.admin_site).media
+        return media
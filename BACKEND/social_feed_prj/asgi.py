@@ -2,6 +2,8 @@
 ASGI config for social_feed_prj project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are routed through ASGI_URLCONF, which serves the hottest post
+endpoints from async views (see social_feed_prj.async_api).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -9,8 +11,11 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_feed_prj.settings')
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+from social_feed_prj.async_api import FeedASGIHandler  # noqa: E402
+
+application = FeedASGIHandler()
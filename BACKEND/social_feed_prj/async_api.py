@@ -0,0 +1,189 @@
+"""
+Async API views served under ASGI.
+
+DRF views are synchronous, so under ASGI each one runs on a worker thread for
+its whole lifetime. AsyncAPIView is a plain Django class-based view with
+``async def`` handlers that keeps DRF's request wrapper, permission classes,
+serializers and error format: the JWT is checked on the event loop with the
+same stateless authentication as the DRF views; handlers use the async ORM,
+and only calls that need a transaction are sent to a thread with
+``sync_to_async``. Responses are rendered to JSON on the loop rather than by
+the handler's thread.
+
+FeedASGIHandler routes requests through ASGI_URLCONF, which puts the async
+views in front of the regular URLconf at the same paths; WSGI keeps serving
+the DRF views.
+"""
+import time
+from itertools import cycle
+
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext, sync_to_async
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from users.authentication import StatelessJWTAuthentication, StreamTicket
+from . import instrumentation
+
+
+class AsyncEventSourceAuthentication(StatelessJWTAuthentication):
+    """
+    Also accepts a stream ticket (users.authentication.StreamTicket) as
+    ``?ticket=``: browsers cannot set headers on an EventSource connection.
+    """
+    query_param = 'ticket'
+
+    async def aauthenticate(self, request):
+        ticket = request.query_params.get(self.query_param)
+        if not ticket or self.get_header(request) is not None:
+            return await super().aauthenticate(request)
+        try:
+            validated_token = StreamTicket(ticket)
+        except TokenError as e:
+            raise InvalidToken(e.args[0]) from e
+        return await self.aauthenticate_token(validated_token)
+
+
+class AsyncAPIView(View):
+    """
+    Base class for async API views.
+
+    Handlers receive a DRF Request and return a DRF Response. Methods without
+    a handler go to `fallback`, a regular (synchronous) view serving the same
+    path, so one route can mix async reads with DRF writes.
+    """
+    authentication = StatelessJWTAuthentication()
+    permission_classes = ()
+    renderer = JSONRenderer()
+    fallback = None
+    # SQL statements per request, authentication included
+    query_budgets = {}
+    # Actions read from a replica (social_feed_prj.routers)
+    replica_actions = set()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token authentication only, like the DRF views
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        if self.fallback is not None and not hasattr(self, method):
+            return await sync_to_async(self.fallback)(request, *args, **kwargs)
+
+        self.request = Request(request)
+        self.args, self.kwargs = args, kwargs
+        try:
+            await self.initial(self.request)
+            response = await super().dispatch(self.request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        if isinstance(response, Response):
+            response = self.render(response)
+        return response
+
+    async def initial(self, request):
+        try:
+            authenticated = await self.authentication.aauthenticate(request)
+        except exceptions.APIException:
+            request.user = AnonymousUser()
+            raise
+        request.user, request.auth = authenticated or (AnonymousUser(), None)
+        for permission in (permission_class() for permission_class in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def handle_exception(self, exc):
+        """DRF's error responses, including WWW-Authenticate on 401."""
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authentication.authenticate_header(self.request)
+        response = exception_handler(exc, {'view': self, 'request': self.request})
+        if response is None:
+            raise exc
+        auth_header = getattr(exc, 'auth_header', None)
+        if auth_header:
+            response['WWW-Authenticate'] = auth_header
+        return response
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        raise exceptions.MethodNotAllowed(request.method)
+
+    def render(self, response):
+        """Render a DRF Response to JSON here instead of on a thread."""
+        start = time.perf_counter()
+        rendered = HttpResponse(
+            self.renderer.render(response.data),
+            status=response.status_code,
+            content_type='application/json',
+        )
+        for header, value in response.items():
+            if header != 'Content-Type':
+                rendered[header] = value
+        metrics = instrumentation.current()
+        if metrics is not None:
+            metrics.render_ms += instrumentation.elapsed_ms(start)
+        return rendered
+
+
+class FeedASGIHandler(ASGIHandler):
+    """
+    ASGIHandler resolving requests against ASGI_URLCONF.
+
+    Django gives every request its own thread for synchronous work (async ORM
+    queries, middleware, sync views), so threads grow with requests in
+    flight. Here requests handled by AsyncAPIView handlers are instead spread
+    round-robin over ASGI_SYNC_THREADS long-lived threads, each keeping its
+    database connection, and any number of them can wait on the event loop.
+    Their sync calls are short and transactions never span an await in these
+    views, so requests sharing a thread do not interfere. Everything else
+    (sync views, fallbacks, the regular URLconf) keeps Django's own thread
+    per request: a slow sync request must not hold up a lane.
+    ``ASGI_SYNC_THREADS = None`` restores Django's behaviour for all requests.
+    """
+
+    def __init__(self):
+        super().__init__()
+        count = getattr(settings, 'ASGI_SYNC_THREADS', 8)
+        # asgiref keeps one single-thread executor per context object
+        self.lanes = cycle([ThreadSensitiveContext() for _ in range(count)]) if count else None
+
+    async def __call__(self, scope, receive, send):
+        if self.lanes is None or not self.is_async_request(scope):
+            return await super().__call__(scope, receive, send)
+        # Django's own ThreadSensitiveContext nests inside this one as a no-op
+        token = SyncToAsync.thread_sensitive_context.set(next(self.lanes))
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            SyncToAsync.thread_sensitive_context.reset(token)
+
+    @staticmethod
+    def is_async_request(scope):
+        """Whether the request resolves to an AsyncAPIView handler, not a fallback."""
+        if scope['type'] != 'http':
+            return False
+        path = scope['path'].removeprefix(scope.get('root_path', ''))
+        try:
+            match = resolve(path, getattr(settings, 'ASGI_URLCONF', settings.ROOT_URLCONF))
+        except Resolver404:
+            return False
+        view_class = getattr(match.func, 'view_class', None)
+        if view_class is None or not issubclass(view_class, AsyncAPIView):
+            return False
+        fallback = match.func.view_initkwargs.get('fallback', view_class.fallback)
+        return fallback is None or hasattr(view_class, scope['method'].lower())
+
+    async def get_response_async(self, request):
+        request.urlconf = getattr(settings, 'ASGI_URLCONF', settings.ROOT_URLCONF)
+        return await super().get_response_async(request)
@@ -0,0 +1,275 @@
+"""
+Shared-payload cache for the read endpoints.
+
+Serialized responses for the community list, community detail and the first
+page of each community feed are stored through Django's cache framework
+(locmem by default, any backend works). Keys embed a generation number per
+invalidation scope; signals on Post, Like, CommunityMember and Community bump
+the generations they affect, which orphans every stale entry at once without
+having to know its key.
+
+Cached payloads are shared by all viewers. Per-viewer fields (`is_member`,
+`is_liked`) are overlaid by the views on every hit. Author profile edits do
+not invalidate feed pages; FEED_CACHE_TIMEOUT bounds that staleness.
+
+The same generations make ETags for conditional GETs (`conditional_response`),
+so a client revalidating an unchanged feed or community gets a 304 before
+any payload is built or read.
+
+Requests reading from a lagging read replica (social_feed_prj.routers) may
+build a payload older than the generations: they still use cached payloads
+and answer matching If-None-Match, but never store payloads or issue ETags,
+which would hand the stale page to a user whose reads are pinned to the
+primary after their write.
+"""
+import hashlib
+import time
+
+from rest_framework import status
+from rest_framework.response import Response
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from . import routers
+
+KEY_PREFIX = 'feed-cache'
+
+COMMUNITY_LIST = 'community-list'
+COMMUNITY_DETAIL = 'community-detail'
+COMMUNITY_FEED = 'community-feed'
+RECOMMENDATIONS = 'recommendations'
+KINDS = (COMMUNITY_LIST, COMMUNITY_DETAIL, COMMUNITY_FEED, RECOMMENDATIONS)
+# Only validated with ETags, never cached
+POST_LIST = 'post-list'
+
+
+def get_cache():
+    return caches[getattr(settings, 'FEED_CACHE_ALIAS', 'default')]
+
+
+def is_enabled():
+    return getattr(settings, 'FEED_CACHE_ENABLED', True)
+
+
+def get_timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 300)
+
+
+# Invalidation scopes
+
+def communities_scope():
+    return 'communities'
+
+
+def community_scope(community_id):
+    return f'community:{community_id}'
+
+
+def feed_scope(community_id):
+    return f'feed:{community_id}'
+
+
+def posts_scope():
+    """The unfiltered post list, which changes with every community's feed."""
+    return 'posts'
+
+
+def recommendations_scope():
+    return 'recommendations'
+
+
+def generation_key(scope):
+    return f'{KEY_PREFIX}:gen:{scope}'
+
+
+def get_generations(cache, scopes):
+    """Current generation of each scope, seeding any that are missing."""
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    # Seed from the clock so an evicted generation never reuses an old value
+    missing = {key: time.time_ns() for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+async def aget_generations(cache, scopes):
+    """get_generations through the cache's async API."""
+    keys = [generation_key(scope) for scope in scopes]
+    generations = await cache.aget_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in generations}
+    if missing:
+        await cache.aset_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def invalidate(*scopes):
+    """Bump the generation of each scope, orphaning its cached payloads."""
+    cache = get_cache()
+    for scope in scopes:
+        try:
+            cache.incr(generation_key(scope))
+        except ValueError:
+            cache.set(generation_key(scope), time.time_ns(), None)
+
+
+def invalidate_feed(community_id):
+    """Bump the generations of a community's feed and of the post list."""
+    invalidate(feed_scope(community_id), posts_scope())
+
+
+# Hit/miss counters
+
+def stats_key(kind, outcome):
+    return f'{KEY_PREFIX}:stats:{kind}:{outcome}'
+
+
+def record(cache, kind, outcome):
+    key = stats_key(kind, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+async def arecord(cache, kind, outcome):
+    key = stats_key(kind, outcome)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+def get_stats():
+    """Hit/miss counters and hit rate per payload kind."""
+    cache = get_cache()
+    keys = [stats_key(kind, outcome) for kind in KINDS for outcome in ('hits', 'misses')]
+    counts = cache.get_many(keys)
+    stats = {}
+    for kind in KINDS:
+        hits = counts.get(stats_key(kind, 'hits'), 0)
+        misses = counts.get(stats_key(kind, 'misses'), 0)
+        total = hits + misses
+        stats[kind] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def reset_stats():
+    get_cache().delete_many(
+        [stats_key(kind, outcome) for kind in KINDS for outcome in ('hits', 'misses')]
+    )
+
+
+# Lookup
+
+def payload_key(kind, generations, request, vary):
+    identity = ' '.join([request.build_absolute_uri(), *map(str, vary)])
+    digest = hashlib.sha1(identity.encode()).hexdigest()
+    return f"{KEY_PREFIX}:{kind}:{'.'.join(map(str, generations))}:{digest}"
+
+
+def cached_payload(kind, scopes, request, build, vary=(), timeout=None):
+    """
+    Return ``(payload, hit)`` for the request, calling `build()` on a miss.
+
+    The key covers the absolute URI (so query parameters and pagination links
+    are part of it), any extra `vary` values for per-viewer payloads, and the
+    current generation of every scope in `scopes`. On a miss the freshly
+    built payload is returned as-is, so it is already correct for the current
+    viewer; callers only overlay per-viewer fields on hits. Payloads built
+    from a read replica are not stored.
+    """
+    if not is_enabled():
+        return build(), False
+    cache = get_cache()
+    key = payload_key(kind, get_generations(cache, scopes), request, vary)
+    payload = cache.get(key)
+    if payload is not None:
+        record(cache, kind, 'hits')
+        return payload, True
+    record(cache, kind, 'misses')
+    payload = build()
+    if not routers.reads_replica():
+        cache.set(key, payload, get_timeout() if timeout is None else timeout)
+    return payload, False
+
+
+async def acached_payload(kind, scopes, request, build, vary=(), timeout=None):
+    """cached_payload for async views; `build` is a coroutine function."""
+    if not is_enabled():
+        return await build(), False
+    cache = get_cache()
+    key = payload_key(kind, await aget_generations(cache, scopes), request, vary)
+    payload = await cache.aget(key)
+    if payload is not None:
+        await arecord(cache, kind, 'hits')
+        return payload, True
+    await arecord(cache, kind, 'misses')
+    payload = await build()
+    if not routers.reads_replica():
+        await cache.aset(key, payload, get_timeout() if timeout is None else timeout)
+    return payload, False
+
+
+# Conditional GET
+
+def etag(kind, generations, request, vary=()):
+    """
+    A weak ETag for the viewer's representation of the request at these
+    generations. It also changes every FEED_CACHE_TIMEOUT seconds, the bound
+    on staleness the generations do not track (e.g. author names).
+    """
+    identity = ' '.join([
+        kind, request.build_absolute_uri(), request.headers.get('Accept', ''),
+        str(request.user.pk), str(int(time.time() // get_timeout())),
+        *map(str, generations), *map(str, vary),
+    ])
+    return f'W/"{hashlib.sha1(identity.encode()).hexdigest()}"'
+
+
+def etag_matches(request, tag):
+    """Whether If-None-Match names `tag` (weak comparison) or is ``*``."""
+    tags = parse_etags(request.headers.get('If-None-Match', ''))
+    opaque = tag.removeprefix('W/')
+    return '*' in tags or any(candidate.removeprefix('W/') == opaque for candidate in tags)
+
+
+def validated(response, tag):
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = tag
+        # Per-viewer payloads: browsers keep them, but revalidate every time
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+    return response
+
+
+def conditional_response(kind, scopes, request, respond, vary=()):
+    """
+    ``respond()`` with an ETag derived from the generations of `scopes`, or a
+    304 Not Modified without calling it when the request's If-None-Match
+    still matches. `vary` lists any other inputs of the response. Responses
+    read from a replica may predate the generations and get no ETag.
+    """
+    tag = etag(kind, get_generations(get_cache(), scopes), request, vary)
+    if etag_matches(request, tag):
+        return validated(Response(status=status.HTTP_304_NOT_MODIFIED), tag)
+    response = respond()
+    return response if routers.reads_replica() else validated(response, tag)
+
+
+async def aconditional_response(kind, scopes, request, respond, vary=()):
+    """conditional_response for async views; `respond` is a coroutine function."""
+    tag = etag(kind, await aget_generations(get_cache(), scopes), request, vary)
+    if etag_matches(request, tag):
+        return validated(Response(status=status.HTTP_304_NOT_MODIFIED), tag)
+    response = await respond()
+    return response if routers.reads_replica() else validated(response, tag)
@@ -0,0 +1,65 @@
+"""
+Response compression.
+
+CompressionMiddleware is Django's GZipMiddleware with a size threshold
+(COMPRESSION_MIN_SIZE bytes) and Brotli, when the ``brotli`` package is
+installed and the client accepts ``br``: feed pages are repetitive JSON,
+which Brotli shrinks noticeably more than gzip for about the same CPU at a
+low quality level (COMPRESSION_BROTLI_QUALITY). Streamed exports are
+gzipped chunk by chunk; Server-Sent Events are never compressed, as
+buffering in the compressor would hold events back.
+
+`manage.py bench_payloads` measures bytes on the wire and latency of feed
+pages for each encoding, with and without sparse fieldsets.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+# Streams that must reach the client as they are written
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+
+def get_min_size():
+    return getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+
+def get_brotli_quality():
+    return getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+
+
+def accepts_brotli(request):
+    return brotli is not None and bool(re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Brotli or gzip for responses of at least COMPRESSION_MIN_SIZE bytes."""
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith(UNCOMPRESSED_TYPES):
+            return response
+        if not response.streaming and len(response.content) < get_min_size():
+            return response
+        if response.streaming or response.has_header('Content-Encoding') or not accepts_brotli(request):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=get_brotli_quality())
+        # Return the compressed content only if it's actually shorter
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # As GZipMiddleware: a strong ETag no longer describes these bytes
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
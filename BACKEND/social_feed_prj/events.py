@@ -0,0 +1,253 @@
+"""
+Publish/subscribe for the real-time feed endpoints (Server-Sent Events).
+
+Writes publish small events on named channels (``community:<id>``) from any
+thread; SSE views subscribe to the channels they stream and wait on the
+event loop, so an idle listener costs one Subscription object and no thread.
+
+Events are not pushed to listeners one by one. A broker buffers them per
+event loop and flushes every FEED_EVENTS_INTERVAL seconds, encoding each
+event once for all its listeners. Events published with a `key` replace any
+buffered event with the same key: a post liked a hundred times within an
+interval sends one like count, the latest. A listener whose backlog passes
+FEED_EVENTS_QUEUE_SIZE frames gets a single ``reset`` event instead, telling
+the client to reload the feed.
+
+A stream may outlive the credentials it was opened with. Subscriptions end
+with a ``close`` event at `expires_at`, and once `authorize`, awaited every
+FEED_EVENTS_HEARTBEAT seconds, returns False; clients then reconnect with
+fresh credentials.
+
+LocalBroker only reaches listeners in the same process. A multi-node backend
+subclasses BaseBroker, sends `publish` over its transport and calls
+`dispatch` for every message it receives; FEED_EVENTS_BROKER selects it.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from functools import cache
+from itertools import count
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+RESET_EVENT = 'reset'
+CLOSE_EVENT = 'close'
+
+
+class BrokerFull(Exception):
+    """The process already holds FEED_EVENTS_MAX_CONNECTIONS listeners."""
+
+
+def encode(event, data):
+    """One SSE frame."""
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
+
+
+def get_interval():
+    return getattr(settings, 'FEED_EVENTS_INTERVAL', 1.0)
+
+
+def get_heartbeat():
+    return getattr(settings, 'FEED_EVENTS_HEARTBEAT', 15)
+
+
+class Subscription:
+    """
+    One listener's channels and undelivered frames. Created, fed and read
+    on the listener's event loop only.
+    """
+
+    def __init__(self, broker, channels, loop, queue_size, expires_at=None, authorize=None):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.queue_size = queue_size
+        # Seconds since the epoch, and an async callable
+        self.expires_at = expires_at
+        self.authorize = authorize
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def __aiter__(self):
+        return self.stream()
+
+    def deliver(self, frames):
+        """Queue ``{key: frame}``; a newer frame replaces a pending one."""
+        if RESET_EVENT in self.pending:
+            return
+        for key, frame in frames.items():
+            self.pending.pop(key, None)
+            self.pending[key] = frame
+        if len(self.pending) > self.queue_size:
+            self.pending = {RESET_EVENT: encode(RESET_EVENT, {})}
+        self.ready.set()
+
+    async def stream(self):
+        """
+        The SSE body: pending frames as they arrive, with keepalives, until
+        the listener's credentials expire or stop authorizing it.
+        """
+        try:
+            yield f'retry: {int(get_interval() * 1000) + 1000}\n\n'.encode()
+            checked = self.loop.time()
+            while True:
+                timeout = get_heartbeat()
+                if self.expires_at is not None:
+                    timeout = min(timeout, self.expires_at - time.time())
+                    if timeout <= 0:
+                        break
+                try:
+                    await asyncio.wait_for(self.ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    frame = b': keepalive\n\n'
+                else:
+                    self.ready.clear()
+                    frames, self.pending = self.pending, {}
+                    frame = b''.join(frames.values())
+                if self.authorize is not None and self.loop.time() - checked >= get_heartbeat():
+                    checked = self.loop.time()
+                    if not await self.authorize():
+                        break
+                if self.expires_at is None or time.time() < self.expires_at:
+                    yield frame
+            yield encode(CLOSE_EVENT, {})
+        finally:
+            self.close()
+
+    def close(self):
+        # Also called by StreamingHttpResponse.close(), from a thread
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+
+class LoopBuffer:
+    """A broker's listeners and unflushed events on one event loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.listeners = defaultdict(set)
+        self.events = defaultdict(dict)
+        self.scheduled = False
+
+
+class BaseBroker:
+    """
+    Tracks this process's listeners and delivers events to them. Subclasses
+    implement `publish`; `listening` lets publishers skip building events
+    nobody receives and must stay True when other nodes may be listening.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffers = {}
+        self.connections = 0
+        self.sequence = count()
+
+    def publish(self, channel, event, data, key=None):
+        raise NotImplementedError
+
+    def listening(self, channel):
+        return True
+
+    def subscribe(self, channels, expires_at=None, authorize=None):
+        """
+        Start listening on the running loop; raises BrokerFull at the cap.
+        See Subscription for `expires_at` and `authorize`.
+        """
+        loop = asyncio.get_running_loop()
+        limit = getattr(settings, 'FEED_EVENTS_MAX_CONNECTIONS', 10_000)
+        queue_size = getattr(settings, 'FEED_EVENTS_QUEUE_SIZE', 100)
+        with self.lock:
+            if self.connections >= limit:
+                raise BrokerFull()
+            self.connections += 1
+            subscription = Subscription(self, channels, loop, queue_size, expires_at, authorize)
+            buffer = self.buffers.get(loop)
+            if buffer is None:
+                buffer = self.buffers[loop] = LoopBuffer(loop)
+            for channel in subscription.channels:
+                buffer.listeners[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.connections -= 1
+            buffer = self.buffers.get(subscription.loop)
+            if buffer is None:
+                return
+            for channel in subscription.channels:
+                listeners = buffer.listeners.get(channel)
+                if listeners is not None:
+                    listeners.discard(subscription)
+                    if not listeners:
+                        del buffer.listeners[channel]
+            if not buffer.listeners:
+                del self.buffers[subscription.loop]
+
+    def drop(self, buffer):
+        """Forget a loop's listeners; call with the lock held."""
+        self.buffers.pop(buffer.loop, None)
+        subscriptions = set().union(*buffer.listeners.values())
+        self.connections -= len(subscriptions)
+        for subscription in subscriptions:
+            subscription.closed = True
+
+    def dispatch(self, channel, event, data, key=None):
+        """Buffer an event for this process's listeners on `channel`."""
+        with self.lock:
+            buffers = [buffer for buffer in self.buffers.values() if channel in buffer.listeners]
+            if not buffers:
+                return
+            frame = encode(event, data)
+            if key is None:
+                key = next(self.sequence)
+            for buffer in buffers:
+                buffer.events[channel][key] = frame
+                if not buffer.scheduled:
+                    buffer.scheduled = True
+                    try:
+                        buffer.loop.call_soon_threadsafe(self.schedule_flush, buffer)
+                    except RuntimeError:
+                        # The loop was closed under its listeners
+                        self.drop(buffer)
+
+    def schedule_flush(self, buffer):
+        buffer.loop.call_later(get_interval(), self.flush, buffer)
+
+    def flush(self, buffer):
+        """Hand a loop's buffered events to its listeners (runs on that loop)."""
+        with self.lock:
+            events, buffer.events = buffer.events, defaultdict(dict)
+            buffer.scheduled = False
+            deliveries = [
+                (subscription, frames)
+                for channel, frames in events.items()
+                for subscription in buffer.listeners.get(channel, ())
+            ]
+        for subscription, frames in deliveries:
+            subscription.deliver(frames)
+
+
+class LocalBroker(BaseBroker):
+    """In-process broker: events reach listeners in this process only."""
+
+    def publish(self, channel, event, data, key=None):
+        self.dispatch(channel, event, data, key)
+
+    def listening(self, channel):
+        with self.lock:
+            return any(channel in buffer.listeners for buffer in self.buffers.values())
+
+
+@cache
+def load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    return load_broker(getattr(settings, 'FEED_EVENTS_BROKER', 'social_feed_prj.events.LocalBroker'))
@@ -0,0 +1,36 @@
+"""
+Streaming NDJSON exports for large related sets (members, likers).
+
+Rows are read with ``.iterator(chunk_size=...)`` so neither the queryset
+cache nor the response body ever holds the whole set in memory.
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def wants_export(request):
+    """Export mode is requested with ``?export=ndjson``."""
+    return request.query_params.get('export') == 'ndjson'
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def stream_ndjson(queryset, filename):
+    """Stream a ``.values()`` queryset as one JSON object per line."""
+    response = StreamingHttpResponse(
+        ndjson_lines(queryset.iterator(chunk_size=get_chunk_size())),
+        content_type=NDJSON_CONTENT_TYPE
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,144 @@
+"""
+Sparse fieldsets for the read endpoints.
+
+``?fields=id,like_count,is_liked`` keeps only the listed top-level fields of
+each object and ``?omit=author,content`` drops the listed ones; both can be
+combined. ``id`` is always kept, since clients and the per-viewer overlays
+(is_liked, is_member) key on it. Unknown names are a 400.
+
+Pruning happens at every layer, not just in the output:
+
+* SparseFieldsMixin removes the fields from a serializer, so they are
+  neither read nor formatted.
+* SparseQuerysetMixin narrows the view's queryset with ``only()`` and drops
+  the joins that only pruned fields needed.
+* Plan.subset (social_feed_prj.lean) leaves their columns out of the lean
+  read path's ``values_list``.
+
+Writes ignore both parameters.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from django.core.exceptions import FieldDoesNotExist
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+# Always part of the output
+REQUIRED = ('id',)
+
+
+def split(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested(request):
+    """``(fields, omit)`` name sets from the query string, or None without either."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    fields = split(params.get(FIELDS_PARAM, ''))
+    omit = split(params.get(OMIT_PARAM, ''))
+    if not fields and not omit:
+        return None
+    return fields, omit
+
+
+def select(request, available):
+    """
+    The names of `available` the request keeps, in their original order, or
+    None when it does not ask for a sparse fieldset.
+    """
+    sparse = requested(request)
+    if sparse is None:
+        return None
+    fields, omit = sparse
+    unknown = (fields | omit) - set(available)
+    if unknown:
+        raise ValidationError({'error': f"Unknown fields: {', '.join(sorted(unknown))}"})
+    return [
+        name for name in available
+        if name in REQUIRED or ((not fields or name in fields) and name not in omit)
+    ]
+
+
+def model_columns(model, fields, prefix=''):
+    """
+    ``(only, related)`` lookups reading `fields` (a serializer's fields) from
+    `model`, or None when a field reads something that cannot be told from
+    its source, like a model property.
+    """
+    only, related = [], []
+    for field in fields.values():
+        if field.source == '*':
+            # SerializerMethodField and the like: annotations or extra queries
+            continue
+        current, path = model, prefix
+        for position, attr in enumerate(field.source_attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            if model_field.many_to_many or model_field.one_to_many:
+                return None
+            path += attr
+            only.append(path)
+            if not model_field.is_relation:
+                break
+            last = position == len(field.source_attrs) - 1
+            if last and isinstance(field, serializers.PrimaryKeyRelatedField):
+                # Read from the foreign key column, without a join
+                break
+            # Anything else, e.g. StringRelatedField, loads the whole row
+            related.append(path)
+            current = model_field.related_model
+            if last and isinstance(field, serializers.BaseSerializer):
+                nested = model_columns(current, field.fields, f'{path}__')
+                if nested is None:
+                    return None
+                only += nested[0]
+                related += nested[1]
+            path += '__'
+    return only, related
+
+
+def prune_queryset(queryset, serializer, extra=()):
+    """
+    `queryset` narrowed to the columns and joins `serializer` reads, plus the
+    `extra` columns (e.g. a keyset paginator's key).
+    """
+    columns = model_columns(queryset.model, serializer.fields)
+    if columns is None:
+        return queryset
+    only, related = columns
+    only += extra
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*dict.fromkeys(related))
+    return queryset.only(*dict.fromkeys(only))
+
+
+class SparseFieldsMixin:
+    """Serializer mixin dropping the fields the request's sparse fieldset leaves out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = select(self.context.get('request'), list(self.fields))
+        if keep is not None:
+            for name in set(self.fields) - set(keep):
+                self.fields.pop(name)
+
+
+class SparseQuerysetMixin:
+    """
+    View mixin selecting only the columns, and joining only the tables, that
+    the serializer reads once pruned to the request's sparse fieldset.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if requested(self.request) is None:
+            return queryset
+        # Keyset paginators read their key from each row
+        extra = getattr(self.paginator, 'key_fields', ())
+        return prune_queryset(queryset, self.get_serializer(), extra)
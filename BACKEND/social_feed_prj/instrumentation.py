@@ -0,0 +1,329 @@
+"""
+Per-request query and latency instrumentation.
+
+InstrumentationMiddleware resolves every request to an endpoint name such as
+``PostViewSet.list`` and records:
+
+* the number of SQL queries and the time spent executing them, through a
+  ``connection.execute_wrapper`` on every database alias (transaction control
+  such as BEGIN or SAVEPOINT adds to the time but not to the count);
+* the time spent producing ``serializer.data`` (outermost serializer only);
+* the time spent rendering the response body;
+* the total time spent in the rest of the middleware chain.
+
+The numbers are sent back in a ``Server-Timing`` header and aggregated into
+in-process histograms, readable at ``/api/metrics/`` (admin only). Views may
+declare ``query_budgets = {action: max_queries}``; requests over budget are
+counted and logged, and QueryBudgetMixin lets tests assert them.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+TRANSACTION_CONTROL = ('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def is_enabled():
+    return getattr(settings, 'INSTRUMENTATION_ENABLED', True)
+
+
+def elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def is_transaction_control(sql):
+    return sql.lstrip().upper().startswith(TRANSACTION_CONTROL)
+
+
+class RequestMetrics:
+    """Counters for a single request."""
+
+    def __init__(self):
+        self.endpoint = None
+        self.budget = None
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+        self.serialize_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not is_transaction_control(sql):
+                self.queries += 1
+            self.db_ms += elapsed_ms(start)
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize_ms:.1f}',
+            f'render;dur={self.render_ms:.1f}',
+            f'total;dur={self.total_ms:.1f}',
+        ))
+
+
+def timed_serializer_data(fget):
+    """Wrap ``BaseSerializer.data`` to add its time to the current request."""
+    def data(serializer):
+        metrics = _current.get()
+        if metrics is None:
+            return fget(serializer)
+        # Nested `.data` calls are already covered by the outermost one
+        metrics.serialize_depth += 1
+        start = time.perf_counter()
+        try:
+            return fget(serializer)
+        finally:
+            metrics.serialize_depth -= 1
+            if not metrics.serialize_depth:
+                metrics.serialize_ms += elapsed_ms(start)
+
+    data.instrumented = True
+    return data
+
+
+def install_serializer_timing():
+    if not getattr(BaseSerializer.data.fget, 'instrumented', False):
+        BaseSerializer.data = property(timed_serializer_data(BaseSerializer.data.fget))
+
+
+# Aggregation
+
+class Histogram:
+    """Fixed-bucket histogram; the last bucket is unbounded."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self):
+        labels = [str(bound) for bound in self.bounds] + ['+Inf']
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else None,
+            'max': round(self.max, 2),
+            'p50': self.quantile(0.5) if self.count else None,
+            'p95': self.quantile(0.95) if self.count else None,
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_ms = Histogram(MS_BUCKETS)
+        self.serialize_ms = Histogram(MS_BUCKETS)
+        self.render_ms = Histogram(MS_BUCKETS)
+        self.total_ms = Histogram(MS_BUCKETS)
+        self.over_budget = 0
+        self.budget = None
+
+    def observe(self, metrics):
+        self.queries.observe(metrics.queries)
+        self.db_ms.observe(metrics.db_ms)
+        self.serialize_ms.observe(metrics.serialize_ms)
+        self.render_ms.observe(metrics.render_ms)
+        self.total_ms.observe(metrics.total_ms)
+        self.budget = metrics.budget
+        if metrics.budget is not None and metrics.queries > metrics.budget:
+            self.over_budget += 1
+
+    def snapshot(self):
+        return {
+            'query_budget': self.budget,
+            'over_budget': self.over_budget,
+            'queries': self.queries.snapshot(),
+            'db_ms': self.db_ms.snapshot(),
+            'serialize_ms': self.serialize_ms.snapshot(),
+            'render_ms': self.render_ms.snapshot(),
+            'total_ms': self.total_ms.snapshot(),
+        }
+
+
+_lock = threading.Lock()
+_endpoints = {}
+
+
+def record(metrics):
+    with _lock:
+        stats = _endpoints.get(metrics.endpoint)
+        if stats is None:
+            stats = _endpoints[metrics.endpoint] = EndpointStats()
+        stats.observe(metrics)
+
+
+def get_stats():
+    """Histogram snapshot per endpoint, for this process."""
+    with _lock:
+        return {endpoint: stats.snapshot() for endpoint, stats in sorted(_endpoints.items())}
+
+
+def reset_stats():
+    with _lock:
+        _endpoints.clear()
+
+
+# Endpoint resolution
+
+def resolve_action(request, view_func):
+    """
+    Return ``(view class, action)``: the viewset action, or the lowercase
+    method for other class-based views; the class is None for functions.
+    """
+    # DRF views set `cls`, plain Django class-based views `view_class`
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None)
+    return view_class, actions.get(method, method) if actions else method
+
+
+def resolve_endpoint(request, view_func):
+    """Return ``(endpoint name, declared query budget)`` for the view."""
+    view_class, action = resolve_action(request, view_func)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}', None
+    budget = getattr(view_class, 'query_budgets', {}).get(action)
+    return f'{view_class.__name__}.{action}', budget
+
+
+def watch_connections(stack, metrics):
+    """Count the queries of every database alias in this thread into `metrics`."""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics))
+
+
+def current():
+    """Metrics of the request being handled, or None."""
+    return _current.get()
+
+
+class InstrumentationMiddleware:
+    """
+    Measure each request and emit a Server-Timing header.
+
+    Place it first in MIDDLEWARE so that the total covers the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+        install_serializer_timing()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not is_enabled():
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                watch_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(metrics, start, response)
+
+    async def __acall__(self, request):
+        if not is_enabled():
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            # The async ORM runs queries on the request's sync thread, whose
+            # connections are not the event loop thread's
+            stack = ExitStack()
+            await sync_to_async(watch_connections)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self.finish(metrics, start, response)
+
+    def finish(self, metrics, start, response):
+        metrics.total_ms = elapsed_ms(start)
+        if metrics.endpoint is None:
+            # Unresolved URL (404) or short-circuited by earlier middleware
+            return response
+        record(metrics)
+        if metrics.budget is not None and metrics.queries > metrics.budget:
+            logger.warning(
+                '%s ran %d queries, over its budget of %d',
+                metrics.endpoint, metrics.queries, metrics.budget
+            )
+        response['Server-Timing'] = metrics.server_timing()
+        response.instrumentation = metrics
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.endpoint, metrics.budget = resolve_endpoint(request, view_func)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        # Installed as process_view in an async stack, so Django calls it in place
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.endpoint, metrics.budget = resolve_endpoint(request, view_func)
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time the renderer too
+        metrics = _current.get()
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.render_ms += elapsed_ms(start)
+
+            response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,130 @@
+"""
+Lean read path for the busiest list endpoints.
+
+A ModelSerializer walks its field tree for every row, on a model instance,
+and a nested serializer does it again for each relation. A Plan describes
+the serializer's output once, in terms of the columns it needs. Rows are
+fetched as named tuples with ``values_list(..., named=True)``; the keyset
+paginators still work on them, as they read key fields by attribute. Each
+dump compiles the plan into one getter per key, binding per-request state
+such as the time zone, and builds the dicts directly. Values the serializer
+formats, such as datetimes, go through the same DRF field, so responses are
+identical.
+
+LeanListMixin serves a view's ``list`` this way when LEAN_SERIALIZATION is
+on; `manage.py bench_serialization` compares both paths. Sparse fieldsets
+(social_feed_prj.fieldsets) dump, and fetch, a subset of the plan.
+"""
+from operator import itemgetter
+
+from rest_framework import serializers
+from rest_framework.response import Response
+from django.conf import settings
+from django.utils import timezone
+from . import fieldsets
+
+
+def is_enabled():
+    return getattr(settings, 'LEAN_SERIALIZATION', True)
+
+
+def datetime_format():
+    """
+    DateTimeField.to_representation, as the serializers format datetimes,
+    with the current time zone looked up once instead of once per value.
+    """
+    current = timezone.get_current_timezone() if settings.USE_TZ else None
+    return serializers.DateTimeField(default_timezone=current).to_representation
+
+
+class Constant:
+    """A shape value that is the same for every row, e.g. overlaid later."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Plan:
+    """
+    Compiled output shape. `shape` maps each output key, in output order, to
+    a column name, a ``(column, formatter)`` pair, a nested shape or a
+    Constant. `formatter` is called once per dump and returns the function
+    that formats each value of the column.
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.columns = tuple(dict.fromkeys(self.find_columns(shape)))
+        self.indexes = {column: index for index, column in enumerate(self.columns)}
+        self.subsets = {}
+
+    @classmethod
+    def find_columns(cls, shape):
+        for source in shape.values():
+            if isinstance(source, dict):
+                yield from cls.find_columns(source)
+            elif isinstance(source, tuple):
+                yield source[0]
+            elif not isinstance(source, Constant):
+                yield source
+
+    def compile(self, shape):
+        """A function building the output dict of one row."""
+        getters = []
+        for key, source in shape.items():
+            if isinstance(source, dict):
+                getter = self.compile(source)
+            elif isinstance(source, Constant):
+                getter = lambda row, value=source.value: value
+            elif isinstance(source, tuple):
+                column, formatter = source
+                getter = lambda row, index=self.indexes[column], fmt=formatter(): fmt(row[index])
+            else:
+                getter = itemgetter(self.indexes[source])
+            getters.append((key, getter))
+        return lambda row: {key: getter(row) for key, getter in getters}
+
+    def subset(self, keys):
+        """The plan of only the top-level `keys`, which only fetches their columns."""
+        keys = tuple(keys)
+        if keys not in self.subsets:
+            self.subsets[keys] = Plan({key: self.shape[key] for key in keys})
+        return self.subsets[keys]
+
+    def for_request(self, request):
+        """This plan, or its subset for the request's sparse fieldset."""
+        keys = fieldsets.select(request, list(self.shape))
+        return self if keys is None else self.subset(keys)
+
+    def rows(self, queryset, *extra):
+        """`queryset` as named tuples of the plan's columns, then `extra` ones."""
+        extra = [column for column in extra if column not in self.indexes]
+        return queryset.values_list(*self.columns, *extra, named=True)
+
+    def dump(self, rows):
+        build = self.compile(self.shape)
+        return [build(row) for row in rows]
+
+
+class LeanListMixin:
+    """
+    Serve ``list`` through `lean_plan` instead of the serializer. The plan
+    must produce what the serializer would; `lean_data` can fill in
+    per-viewer values.
+    """
+    lean_plan = None
+
+    def list(self, request, *args, **kwargs):
+        if self.lean_plan is None or not is_enabled():
+            return super().list(request, *args, **kwargs)
+        plan = self.lean_plan.for_request(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Keyset paginators read their key from each row
+        rows = plan.rows(queryset, *getattr(self.paginator, 'key_fields', ()))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(self.lean_data(rows, plan))
+        return self.get_paginated_response(self.lean_data(page, plan))
+
+    def lean_data(self, rows, plan):
+        return plan.dump(rows)
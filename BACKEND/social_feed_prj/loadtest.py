@@ -0,0 +1,305 @@
+"""
+API load-test harness used by ``manage.py bench_api`` and ``bench_asgi``.
+
+Scenarios drive the real URLconf through DRF's test client, authenticated
+with a real JWT so authentication costs are included. Each request is timed
+end to end, and its SQL query count is read from InstrumentationMiddleware.
+Results can be saved as JSON and compared with an earlier run.
+
+For concurrency, the same scenarios can be sent straight to the WSGI and
+ASGI applications with many requests in flight: WSGI from a pool of worker
+threads, as a threaded WSGI server would, and ASGI from coroutines on one
+event loop.
+"""
+import asyncio
+import io
+import json
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count
+from communities.models import Community, CommunityMember
+from posts.models import Post
+from .benchmark import percentile
+
+
+class Scenario:
+    """
+    One endpoint to measure. `path` may be a callable of the iteration number
+    for scenarios that vary their target; `reset`, when given, runs untimed
+    after every request to undo its effect (e.g. leave after join).
+    """
+
+    def __init__(self, name, method, path, data=None, reset=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.reset = reset
+
+    def url(self, iteration):
+        return self.path(iteration) if callable(self.path) else self.path
+
+
+def run_scenario(client, scenario, repeat=50, warmup=3):
+    """Measure `scenario` `repeat` times after `warmup` untimed calls."""
+    samples, queries, statuses = [], [], {}
+    for iteration in range(warmup + repeat):
+        url = scenario.url(iteration)
+        send = getattr(client, scenario.method)
+        start = time.perf_counter()
+        response = send(url, scenario.data) if scenario.data is not None else send(url)
+        elapsed = (time.perf_counter() - start) * 1000
+        if scenario.reset is not None:
+            scenario.reset(client, iteration)
+        if iteration < warmup:
+            continue
+        samples.append(elapsed)
+        metrics = getattr(response, 'instrumentation', None)
+        queries.append(metrics.queries if metrics is not None else 0)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    return summarize_run(samples, queries, statuses)
+
+
+def summarize_run(samples, queries, statuses):
+    busy_s = sum(samples) / 1000
+    return {
+        'runs': len(samples),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3) if samples else 0.0,
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else 0.0,
+        'queries_max': max(queries, default=0),
+        # One client issuing requests back to back
+        'requests_per_second': round(len(samples) / busy_s, 1) if busy_s else 0.0,
+        'statuses': statuses,
+    }
+
+
+def benchmark_targets():
+    """
+    The member of the most communities as viewer, with the largest community
+    they joined, its newest post, and the smallest community they did not.
+    Returns None without memberships; `post` and `other` may be None.
+    """
+    membership = CommunityMember.objects.values('user_id').annotate(
+        total=Count('id')
+    ).order_by('-total').first()
+    if membership is None:
+        return None
+    viewer_id = membership['user_id']
+    joined = CommunityMember.objects.filter(user_id=viewer_id).values('community_id')
+    community = Community.objects.filter(pk__in=joined).order_by('-member_count').first()
+    return {
+        'viewer': User.objects.get(pk=viewer_id),
+        'community': community,
+        'post': Post.objects.filter(community=community).order_by('-created_at').first(),
+        'other': Community.objects.exclude(pk__in=joined).order_by('member_count').first(),
+    }
+
+
+# Concurrent runs against the WSGI and ASGI applications
+
+def wsgi_environ(method, url, headers):
+    path, _, query = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': method.upper(), 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SCRIPT_NAME': '', 'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'CONTENT_LENGTH': '0',
+    }
+    for name, value in headers.items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    return environ
+
+
+def wsgi_request(application, environ):
+    """Call a WSGI application and return the response status code."""
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return statuses[0]
+
+
+def asgi_scope(method, url, headers):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method.upper(), 'scheme': 'http', 'path': path,
+        'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')] + [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+
+
+async def asgi_request(application, scope):
+    """Call an ASGI application and return the response status code."""
+    requested = False
+    statuses = []
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client never disconnects; the handler cancels this wait
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+@contextmanager
+def peak_threads(interval=0.001):
+    """Sample the process's thread count while the block runs."""
+    peak = {'threads': threading.active_count()}
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak['threads'] = max(peak['threads'], threading.active_count() - 1)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield peak
+    finally:
+        done.set()
+        sampler.join()
+
+
+def run_wsgi(application, scenario, headers, requests, concurrency):
+    """Send `requests` requests from `concurrency` threads."""
+    def call(iteration):
+        start = time.perf_counter()
+        status = wsgi_request(application, wsgi_environ(scenario.method, scenario.url(iteration), headers))
+        return (time.perf_counter() - start) * 1000, status
+
+    with peak_threads() as peak:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(call, range(requests)))
+        wall_s = time.perf_counter() - start
+    return summarize_concurrent(results, wall_s, concurrency, peak['threads'])
+
+
+def run_asgi(application, scenario, headers, requests, concurrency):
+    """Send `requests` requests from `concurrency` coroutines on one loop."""
+    results = []
+    iterations = iter(range(requests))
+
+    async def client():
+        for iteration in iterations:
+            start = time.perf_counter()
+            status = await asgi_request(
+                application, asgi_scope(scenario.method, scenario.url(iteration), headers)
+            )
+            results.append(((time.perf_counter() - start) * 1000, status))
+
+    async def run():
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    with peak_threads() as peak:
+        start = time.perf_counter()
+        asyncio.run(run())
+        wall_s = time.perf_counter() - start
+    return summarize_concurrent(results, wall_s, concurrency, peak['threads'])
+
+
+def summarize_concurrent(results, wall_s, concurrency, threads):
+    samples = [elapsed for elapsed, _ in results]
+    return {
+        'runs': len(samples),
+        'concurrency': concurrency,
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'requests_per_second': round(len(samples) / wall_s, 1) if wall_s else 0.0,
+        'peak_threads': threads,
+        'statuses': dict(Counter(str(status) for _, status in results)),
+    }
+
+
+# Persistence and comparison
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=settings.BASE_DIR, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_report(results, dataset):
+    return {
+        'meta': {
+            'recorded_at': datetime.now(dt_timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'dataset': dataset,
+        },
+        'scenarios': results,
+    }
+
+
+def save_report(report, path):
+    with open(path, 'w') as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+
+
+def load_report(path):
+    with open(path) as source:
+        return json.load(source)
+
+
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean')
+
+
+def compare(previous, current):
+    """
+    ``[(scenario, metric, before, after, change)]`` for scenarios in both
+    reports; `change` is the relative difference, None when `before` is 0.
+    """
+    rows = []
+    before_scenarios = previous.get('scenarios', {})
+    for name, after in current['scenarios'].items():
+        before = before_scenarios.get(name)
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else None
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,277 @@
+"""
+Keyset (cursor) pagination shared by the feed-style endpoints.
+
+Unlike PageNumberPagination this never issues an OFFSET scan or a COUNT(*):
+each page is a range read that starts right after the last row of the
+previous page, so latency stays flat however deep the client scrolls.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class LinkPagination(BasePagination):
+    """
+    Responses with ``next``/``previous`` links and ``results`` but no total
+    count; subclasses decide how pages are addressed.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+
+class KeysetPagination(LinkPagination):
+    """
+    Paginate on a unique composite key such as ``(created_at, id)``.
+
+    Cursors are opaque base64 tokens holding the key of the boundary row and
+    the direction to read in.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        def fetch(position, reverse, limit):
+            return list(self.page_queryset(queryset, position, reverse, limit))
+
+        return self.paginate_with(fetch, request)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views, read with the async ORM."""
+        async def fetch(position, reverse, limit):
+            return [row async for row in self.page_queryset(queryset, position, reverse, limit)]
+
+        return await self.apaginate_with(fetch, request)
+
+    def page_queryset(self, queryset, position, reverse, limit):
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(queryset.model, position, reverse))
+        return queryset.order_by(*self.get_ordering(reverse))[:limit]
+
+    def paginate_with(self, fetch, request):
+        """
+        Paginate rows produced by ``fetch(position, reverse, limit)``.
+
+        `fetch` must return at most `limit` rows strictly after `position`
+        in read order (the reversed ordering when `reverse` is set). This lets
+        sources other than a single queryset, such as merged feeds, share the
+        cursor format.
+        """
+        position, reverse = self.start_page(request)
+        return self.finish_page(fetch(position, reverse, self.page_size + 1), position, reverse)
+
+    async def apaginate_with(self, fetch, request):
+        """paginate_with for an async ``fetch(position, reverse, limit)``."""
+        position, reverse = self.start_page(request)
+        return self.finish_page(await fetch(position, reverse, self.page_size + 1), position, reverse)
+
+    def start_page(self, request):
+        """Read the page size and cursor; returns ``(position, reverse)``."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        return self.decode_cursor(request)
+
+    def finish_page(self, page, position, reverse):
+        """Trim the extra look-ahead row and work out the links."""
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    # Cursor handling
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_ordering(self, reverse=False):
+        return [self.flip(field) for field in self.ordering] if reverse else list(self.ordering)
+
+    @property
+    def key_fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def get_position(self, instance):
+        """Return the key of `instance` as JSON-safe values."""
+        values = []
+        for field in self.key_fields:
+            value = getattr(instance, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def encode_cursor(self, instance, reverse):
+        payload = {'p': self.get_position(instance)}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode()
+        ).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """Return ``(position, reverse)``; position is None on the first page."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            position = payload['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError(position)
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def decode_position(self, model, position):
+        """Convert raw cursor values back to Python values of `model`'s key fields."""
+        try:
+            return [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.key_fields, position)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def position_filter(self, model, position, reverse):
+        """
+        Build the "strictly after `position`" predicate for the ordering.
+
+        The leading column also gets a plain range bound so the database can
+        drive the scan from an index on it (e.g. ``(community, -created_at)``).
+        """
+        values = self.decode_position(model, position)
+
+        def lookup(index):
+            descending = self.ordering[index].startswith('-') != reverse
+            return f"{self.key_fields[index]}__{'lt' if descending else 'gt'}"
+
+        after = Q()
+        for index in reversed(range(len(values))):
+            term = Q(**{lookup(index): values[index]})
+            if index < len(values) - 1:
+                term |= Q(**{self.key_fields[index]: values[index]}) & after
+            after = term
+        leading = lookup(0) + 'e'
+        return Q(**{leading: values[0]}) & after
+
+
+class FeedCursorPagination(KeysetPagination):
+    """Newest-first post feeds keyed on ``(created_at, id)``."""
+    ordering = ('-created_at', '-id')
+
+
+class HotCursorPagination(KeysetPagination):
+    """Post feeds ordered by decayed like velocity (``?sort=hot``)."""
+    ordering = ('-hot_score', '-id')
+
+
+class TopCursorPagination(KeysetPagination):
+    """Post feeds ordered by like count (``?sort=top``)."""
+    ordering = ('-like_count', '-id')
+
+
+class MemberCursorPagination(KeysetPagination):
+    """Community members, most recently joined first."""
+    ordering = ('-joined_at', '-id')
+
+
+class LikeCursorPagination(KeysetPagination):
+    """A post's likes, most recent first."""
+    ordering = ('-created_at', '-id')
+
+
+class RankedPagination(LinkPagination):
+    """
+    Numbered pages for ranked results such as search hits.
+
+    Relevance order has no key to seek from, so pages are offsets into the
+    ranking; `max_page` bounds how deep a client can go.
+    """
+    page_query_param = 'page'
+    max_page_size = 50
+    max_page = 50
+    invalid_page_message = 'Invalid page'
+
+    def paginate_with(self, fetch, request):
+        """Paginate rows produced by ``fetch(offset, limit)`` in rank order."""
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.page_number = self.get_page_number(request)
+        rows = fetch((self.page_number - 1) * self.page_size, self.page_size + 1)
+        self.has_next = len(rows) > self.page_size and self.page_number < self.max_page
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_number(self, request):
+        try:
+            number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if not 1 <= number <= self.max_page:
+            raise NotFound(self.invalid_page_message)
+        return number
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        if self.page_number == 2:
+            return remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(self.base_url, self.page_query_param, self.page_number - 1)
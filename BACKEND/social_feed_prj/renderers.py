@@ -0,0 +1,38 @@
+"""
+JSON rendering with orjson, when it is installed.
+
+FastJSONRenderer writes the same bytes as DRF's JSONRenderer with compact
+separators: types orjson does not handle the same way (datetimes,
+dataclasses, decimals, ...) go through DRF's encoder, and U+2028/U+2029 are
+escaped the same way. Without orjson, for indented output (the browsable
+API, ``; indent=``) or for payloads orjson rejects, it is JSONRenderer.
+
+orjson writes some floats differently (``0.00001`` for ``1e-05``), so only
+views whose payloads hold no floats, like the feeds, should use it.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer through orjson; see the module docstring."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        usable = orjson is not None and not self.ensure_ascii and self.compact
+        if not usable or data is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep the output a strict JavaScript subset, like JSONRenderer
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
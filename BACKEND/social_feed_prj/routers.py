@@ -0,0 +1,195 @@
+"""
+Read-replica routing.
+
+ReplicaRouter sends the reads of read-only requests to one of the aliases in
+DATABASE_REPLICAS; everything else, including every write, uses 'default'.
+A request is read-only when its view lists the action in `replica_actions`
+(``{'list', 'retrieve'}`` on a viewset, ``{'get'}`` on other views).
+ReplicaRoutingMiddleware marks such requests.
+
+Replicas lag behind the primary, so after a user's successful write (any
+unsafe method) their reads stay on the primary for REPLICA_PIN_SECONDS. Pins
+are kept in the cache framework, which must be shared between processes for
+them to follow the user across processes. Within one request, reads move to
+the primary as soon as anything is written. The choice waits until DRF has
+authenticated the request, so the pin can be checked; queries run before
+that, such as reloading the token revocation list, read the primary.
+
+A replica may not have the writes that bumped the payload cache generations
+(social_feed_prj.cache) yet, so responses built from one are neither cached
+nor given generation ETags; see `reads_replica`.
+
+With SQLITE_REPLICAS set, settings add that many SQLite files as replicas;
+``manage.py sync_replicas`` copies the primary into them.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject
+from . import cache as feed_cache
+from .instrumentation import resolve_action
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_current = ContextVar('replica_routing', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin(user_id):
+    """Read from the primary for this user for REPLICA_PIN_SECONDS."""
+    feed_cache.get_cache().set(pin_key(user_id), True, get_pin_seconds())
+
+
+def is_pinned(user_id):
+    return feed_cache.get_cache().get(pin_key(user_id)) is not None
+
+
+def choose_replica(replicas):
+    return random.choice(replicas)
+
+
+def authenticated_user(request):
+    """The DRF-authenticated user, or None before DRF authenticated."""
+    user = getattr(request, 'user', None)
+    # Until DRF replaces it, request.user is AuthenticationMiddleware's lazy session user
+    if user is None or isinstance(user, SimpleLazyObject):
+        return None
+    return user
+
+
+class RequestRouting:
+    """Routing state of one request, shared with its sync threads."""
+
+    def __init__(self, request):
+        self.request = request
+        self.read_only = False
+        self.wrote = False
+        self.alias = None
+        # Whether any read chose a replica; stays set if a write follows
+        self.replica = False
+
+    def read_alias(self):
+        if self.alias is not None:
+            return self.alias
+        replicas = get_replicas()
+        if not (self.read_only and replicas) or self.wrote:
+            return None
+        user = authenticated_user(self.request)
+        if user is None:
+            return None
+        if user.is_authenticated and is_pinned(user.pk):
+            self.alias = DEFAULT_DB_ALIAS
+        else:
+            # One replica per request keeps its reads consistent
+            self.alias = choose_replica(replicas)
+            self.replica = True
+        return self.alias
+
+
+def reads_replica():
+    """Whether the current request reads, or has read, from a replica."""
+    routing = _current.get()
+    if routing is None:
+        return False
+    routing.read_alias()
+    return routing.replica
+
+
+class ReplicaRouter:
+    """Database router for DATABASE_REPLICAS; see the module docstring."""
+
+    def db_for_read(self, model, **hints):
+        routing = _current.get()
+        if routing is None:
+            return None
+        return routing.read_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = _current.get()
+        if routing is not None:
+            routing.wrote = True
+            routing.alias = DEFAULT_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, schema included
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Mark read-only requests for ReplicaRouter, and pin users to the primary
+    after their writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        routing = RequestRouting(request)
+        token = _current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(routing, request, response)
+
+    async def __acall__(self, request):
+        routing = RequestRouting(request)
+        token = _current.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(routing, request, response)
+
+    def finish(self, routing, request, response):
+        wrote = routing.wrote or request.method not in SAFE_METHODS
+        if wrote and response.status_code < 400 and get_replicas():
+            user = authenticated_user(request)
+            if user is not None and user.is_authenticated:
+                pin(user.pk)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mark_read_only(request, view_func)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        # Installed as process_view in an async stack, so Django calls it in place
+        mark_read_only(request, view_func)
+
+
+def mark_read_only(request, view_func):
+    routing = _current.get()
+    if routing is not None and request.method in SAFE_METHODS:
+        view_class, action = resolve_action(request, view_func)
+        routing.read_only = action in getattr(view_class, 'replica_actions', ())
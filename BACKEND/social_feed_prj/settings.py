@@ -46,9 +46,13 @@ INSTALLED_APPS = [
     'users',
     'communities',
     'posts',
+    'search',
 ]
 
 MIDDLEWARE = [
+    'social_feed_prj.instrumentation.InstrumentationMiddleware',
+    'social_feed_prj.routers.ReplicaRoutingMiddleware',
+    'social_feed_prj.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -60,11 +64,16 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'social_feed_prj.urls'
+# Used by the ASGI application: async views for the hottest post endpoints
+ASGI_URLCONF = 'social_feed_prj.urls_asgi'
+# Threads shared by in-flight ASGI requests to async views for synchronous work
+ASGI_SYNC_THREADS = 8
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        # Shared admin templates (social_feed_prj.admin)
+        'DIRS': [BASE_DIR / 'social_feed_prj' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -82,10 +91,60 @@ WSGI_APPLICATION = 'social_feed_prj.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Connections are kept for CONN_MAX_AGE seconds and checked before reuse.
+# SQLite runs in WAL mode so readers do not block the writer; write
+# transactions take the lock up front instead of failing to upgrade it.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA temp_store=MEMORY;'
+    'PRAGMA cache_size=-20000;'
+    'PRAGMA mmap_size=134217728;'
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS,
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Read replicas (social_feed_prj.routers): read-only actions read from one of
+# DATABASE_REPLICAS; a user's reads stay on the primary for
+# REPLICA_PIN_SECONDS after they write. SQLITE_REPLICAS adds that many local
+# SQLite copies of the primary (refreshed by `manage.py sync_replicas`).
+SQLITE_REPLICAS = 0
+for index in range(1, SQLITE_REPLICAS + 1):
+    DATABASES[f'replica{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.replica{index}.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS + 'PRAGMA query_only=ON;',
+            'timeout': 20,
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['social_feed_prj.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'social-feed',
     }
 }
 
@@ -134,7 +193,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -143,6 +202,82 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# Home feed (posts.timelines)
+# Users in at least this many communities get a precomputed timeline that is
+# filled on write; smaller users are served by merging their communities on read.
+FEED_FANOUT_MIN_COMMUNITIES = 5
+FEED_TIMELINE_LENGTH = 500
+
+# ?sort=hot (posts.ranking): a like's weight halves every this many hours
+FEED_HOT_HALF_LIFE_HOURS = 12
+
+# Read-endpoint payload cache (social_feed_prj.cache)
+FEED_CACHE_ENABLED = True
+FEED_CACHE_ALIAS = 'default'
+FEED_CACHE_TIMEOUT = 300
+
+# Post and community lists are built from value rows by precompiled plans
+# instead of the serializers (social_feed_prj.lean); same responses
+LEAN_SERIALIZATION = True
+
+# Response compression (social_feed_prj.compression): gzip, or Brotli when the
+# brotli package is installed, for bodies of at least COMPRESSION_MIN_SIZE bytes
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Community recommendations (communities.recommendations): affinities kept per
+# community by build_recommendations, and how long a user's list is cached
+RECOMMENDATION_NEIGHBORS = 50
+RECOMMENDATION_CACHE_TIMEOUT = 3600
+
+# Real-time feed events (social_feed_prj.events), served under ASGI: events
+# are batched and coalesced per FEED_EVENTS_INTERVAL seconds; each process
+# accepts up to FEED_EVENTS_MAX_CONNECTIONS streams, and a stream more than
+# FEED_EVENTS_QUEUE_SIZE events behind is told to reload instead. Browsers
+# open streams with a ticket valid for FEED_EVENTS_TICKET_LIFETIME seconds.
+FEED_EVENTS_BROKER = 'social_feed_prj.events.LocalBroker'
+FEED_EVENTS_INTERVAL = 1.0
+FEED_EVENTS_HEARTBEAT = 15
+FEED_EVENTS_MAX_CONNECTIONS = 10_000
+FEED_EVENTS_QUEUE_SIZE = 100
+FEED_EVENTS_TICKET_LIFETIME = 30
+
+# Write-behind like buffer (posts.like_buffer): like and unlike intents are
+# coalesced in process and written every LIKE_BUFFER_INTERVAL seconds, or as
+# soon as LIKE_BUFFER_BATCH_SIZE are waiting
+LIKE_BUFFER_ENABLED = False
+LIKE_BUFFER_INTERVAL = 1.0
+LIKE_BUFFER_BATCH_SIZE = 5000
+
+# Bulk ingestion (posts.ingest): rows per validation/write transaction
+INGEST_BATCH_SIZE = 1000
+
+# Member and liker lists
+COMMUNITY_MEMBERS_PREVIEW = 10
+EXPORT_CHUNK_SIZE = 2000
+
+# Full-text search (search.backends): 'auto' uses SQLite FTS5 when available
+# and falls back to an in-process inverted index; 'fts5' or 'memory' force one.
+# The in-process index only sees the writes of its own process: run a single
+# worker process with it.
+SEARCH_BACKEND = 'auto'
+# Broad queries are ranked among their newest SEARCH_RANK_WINDOW matches only
+SEARCH_RANK_WINDOW = 5000
+
+# Admin change lists of large tables (social_feed_prj.admin): unfiltered
+# lists over this many rows are counted from table statistics
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+
+# Per-request query/latency instrumentation (social_feed_prj.instrumentation)
+INSTRUMENTATION_ENABLED = True
+
+# Stateless authentication (users.authentication): fields beyond the token
+# claims are read from a cached copy of the user row kept this many seconds
+AUTH_USER_CACHE_TIMEOUT = 60
+# Token revocations (users.revocation) reach processes that do not share the
+# cache within this many seconds, when their snapshot is reloaded
+AUTH_REVOCATION_MAX_AGE = 5
+
 # JWT Configuration
 from datetime import timedelta
 
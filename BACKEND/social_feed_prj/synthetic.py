@@ -0,0 +1,178 @@
+"""
+Synthetic social data with the skew of a real deployment.
+
+Everything popular follows a Zipf (power-law) distribution: a few communities
+hold most members and posts, a few users belong to many communities while
+most belong to one or two, and a few posts collect most likes, mostly soon
+after they were posted. Rows are loaded through posts.ingest, so counters,
+hot scores and timelines come out exactly as if users had created them.
+"""
+import random
+from bisect import bisect
+from collections import defaultdict
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+from communities.models import Community
+from posts import ingest
+from posts.models import Post
+from .benchmark import explicit_timestamps
+
+VOCABULARY_SIZE = 5000
+# Mean delay between a post and its likes
+LIKE_DELAY_HOURS = 6
+
+
+def zipf_cum_weights(count, exponent):
+    """Cumulative weights where rank r is drawn with weight 1 / r**exponent."""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def pick(rng, items, cum_weights):
+    """One weighted draw; faster than rng.choices for a single item."""
+    return items[bisect(cum_weights, rng.random() * cum_weights[-1])]
+
+
+class SyntheticData:
+    """
+    Generate and load one synthetic dataset. Usernames and community names
+    start with `prefix`, so several datasets can share a database.
+    """
+
+    def __init__(self, users=1000, communities=50, posts=20_000, likes=50_000,
+                 memberships_per_user=3, days=30, exponent=1.1, seed=0,
+                 prefix='synthetic', batch_size=None, progress=None):
+        self.counts = {'users': users, 'communities': communities, 'posts': posts, 'likes': likes}
+        self.memberships_per_user = memberships_per_user
+        self.days = days
+        self.exponent = exponent
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.progress = progress
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=days)
+
+    def exists(self):
+        return User.objects.filter(username__startswith=f'{self.prefix}-').exists()
+
+    def generate(self):
+        """Create the whole dataset; returns ``{kind: rows created}``."""
+        created = {}
+        user_ids = self.create_users()
+        created['users'] = len(user_ids)
+        communities = self.create_communities(user_ids)
+        created['communities'] = len(communities)
+        members = self.memberships(user_ids, communities)
+        created['memberships'] = self.load('memberships', (
+            {'user_id': user_id, 'community_id': community_id, 'joined_at': joined_at}
+            for community_id, joined in members.items()
+            for user_id, joined_at in joined
+        ))
+        created['posts'] = self.load('posts', self.posts(communities, members))
+        created['likes'] = self.load('likes', self.likes(user_ids, members))
+        return created
+
+    def load(self, kind, records):
+        rows = enumerate(records, start=1)
+        return ingest.ingest(kind, rows, batch_size=self.batch_size, progress=self.progress).created
+
+    # Users and communities
+
+    def create_users(self):
+        password = make_password(None)
+        users = User.objects.bulk_create(
+            [
+                User(username=f'{self.prefix}-{index}', password=password)
+                for index in range(self.counts['users'])
+            ],
+            batch_size=5000,
+        )
+        return [user.pk for user in users]
+
+    def create_communities(self, user_ids):
+        # bulk_create skips Community.save(); creators join in memberships()
+        with explicit_timestamps(Community._meta.get_field('created_at')):
+            communities = Community.objects.bulk_create([
+                Community(
+                    name=f'{self.prefix} community {index}',
+                    description=f'Synthetic community {index}',
+                    created_by_id=self.rng.choice(user_ids),
+                    created_at=self.start,
+                )
+                for index in range(self.counts['communities'])
+            ])
+        return [(community.pk, community.created_by_id) for community in communities]
+
+    def memberships(self, user_ids, communities):
+        """``{community_id: [(user_id, joined_at)]}``; rank 0 is the most popular."""
+        community_ids = [community_id for community_id, _ in communities]
+        cum_weights = zipf_cum_weights(len(community_ids), self.exponent)
+        joined = defaultdict(dict)
+        for community_id, creator_id in communities:
+            joined[community_id][creator_id] = self.start
+        # Pareto with shape 1.5 has mean 3, scaled to the requested mean
+        scale = self.memberships_per_user / 3
+        for user_id in user_ids:
+            count = min(len(community_ids), max(1, int(self.rng.paretovariate(1.5) * scale)))
+            for _ in range(count):
+                community_id = pick(self.rng, community_ids, cum_weights)
+                joined[community_id].setdefault(user_id, self.random_moment(self.start))
+        return {
+            community_id: list(members.items()) for community_id, members in joined.items()
+        }
+
+    # Posts and likes
+
+    def random_moment(self, after):
+        return after + (self.now - after) * self.rng.random()
+
+    def posts(self, communities, members):
+        community_ids = [community_id for community_id, _ in communities]
+        cum_weights = zipf_cum_weights(len(community_ids), self.exponent)
+        vocabulary = [f'word{index}' for index in range(VOCABULARY_SIZE)]
+        word_weights = zipf_cum_weights(VOCABULARY_SIZE, 1.0)
+        for _ in range(self.counts['posts']):
+            community_id = pick(self.rng, community_ids, cum_weights)
+            author_id, joined_at = self.rng.choice(members[community_id])
+            yield {
+                'author_id': author_id,
+                'community_id': community_id,
+                'content': ' '.join(
+                    self.rng.choices(vocabulary, cum_weights=word_weights, k=self.rng.randint(5, 30))
+                ),
+                'created_at': self.random_moment(joined_at),
+            }
+
+    def likes(self, user_ids, members):
+        # Read back the imported posts; popularity is Zipf over a shuffled order
+        posts = list(
+            Post.objects.filter(author_id__gte=min(user_ids), author_id__lte=max(user_ids))
+            .order_by('id').values_list('id', 'community_id', 'created_at')
+        )
+        if not posts:
+            return
+        self.rng.shuffle(posts)
+        cum_weights = zipf_cum_weights(len(posts), self.exponent)
+        member_ids = {
+            community_id: [user_id for user_id, _ in joined]
+            for community_id, joined in members.items()
+        }
+        seen = set()
+        target, attempts = self.counts['likes'], self.counts['likes'] * 3
+        while len(seen) < target and attempts:
+            attempts -= 1
+            post_id, community_id, created_at = pick(self.rng, posts, cum_weights)
+            user_id = self.rng.choice(member_ids[community_id])
+            if (user_id, post_id) in seen:
+                continue
+            seen.add((user_id, post_id))
+            delay = timedelta(hours=self.rng.expovariate(1 / LIKE_DELAY_HOURS))
+            yield {
+                'user_id': user_id,
+                'post_id': post_id,
+                'created_at': min(created_at + delay, self.now),
+            }
@@ -0,0 +1,94 @@
+"""
+Test helpers shared by the app test suites.
+"""
+import inspect
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from users import revocation
+from .instrumentation import is_transaction_control
+
+
+def clear_caches():
+    """
+    Empty the cache and reload the token revocation snapshot it invalidates,
+    so that reload does not land in the first request a test measures.
+    """
+    cache.clear()
+    revocation.current()
+
+
+class QueryBudgetMixin:
+    """
+    Assert that a request stays within the query budget its view declares
+    (``query_budgets`` on the view class) or an explicit one.
+
+    Queries are counted like InstrumentationMiddleware counts them, so
+    transaction control (including TestCase's savepoints) is not included.
+    Pass `client` to use another client than ``self.client``, such as an
+    AsyncClient for the async views.
+    """
+
+    def assertWithinQueryBudget(self, method, path, budget=None, client=None, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client or self.client, method)(path, **kwargs)
+            if inspect.isawaitable(response):
+                pending = response
+
+                async def wait():
+                    return await pending
+
+                response = async_to_sync(wait)()
+        metrics = getattr(response, 'instrumentation', None)
+        if budget is None:
+            if metrics is None or metrics.budget is None:
+                self.fail(f'{method.upper()} {path} has no declared query budget')
+            budget = metrics.budget
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not is_transaction_control(query['sql'])
+        ]
+        if len(queries) > budget:
+            endpoint = metrics.endpoint if metrics else path
+            self.fail(
+                f'{endpoint} ran {len(queries)} queries, over its budget of {budget}:\n'
+                + '\n'.join(f'{index}. {sql}' for index, sql in enumerate(queries, 1))
+            )
+        return response
+
+
+class FileDatabaseMixin:
+    """
+    Run a TransactionTestCase against a migrated SQLite file of its own.
+
+    On the default in-memory test database concurrent writers fail with
+    "table is locked" instead of waiting for the lock, so tests of
+    concurrent writes need a file; the rest of the suite stays in memory.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            directory = tempfile.TemporaryDirectory()
+            # Closing the in-memory connection would drop that database
+            memory, name = connection.connection, connection.settings_dict['NAME']
+            connection.connection = None
+            connection.settings_dict['NAME'] = str(Path(directory.name, 'test.sqlite3'))
+
+            def restore():
+                connection.close()
+                connection.settings_dict['NAME'] = name
+                connection.connection = memory
+                ContentType.objects.clear_cache()
+                directory.cleanup()
+
+            cls.addClassCleanup(restore)
+            ContentType.objects.clear_cache()
+            call_command('migrate', verbosity=0, interactive=False)
+        super().setUpClass()
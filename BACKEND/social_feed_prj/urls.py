@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from .views import CacheStatsView, MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -23,4 +24,7 @@ urlpatterns = [
     path('api/auth/', include('users.urls')),
     path('api/communities/', include('communities.urls')),
     path('api/posts/', include('posts.urls')),
+    path('api/search/', include('search.urls')),
+    path('api/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -0,0 +1,26 @@
+"""
+URL configuration used under ASGI (see FeedASGIHandler).
+
+The async post views answer the same paths as the DRF views they mirror and
+take precedence; everything else falls through to the regular URLconf. The
+event streams are only served here.
+"""
+from django.urls import path
+from posts.async_views import (
+    AsyncCommunityEventsView, AsyncCommunityPostListView, AsyncHomeFeedEventsView,
+    AsyncLikeStateView, AsyncPostLikeView, AsyncPostListView,
+)
+from posts.views import PostViewSet
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/posts/', AsyncPostListView.as_view(
+        fallback=PostViewSet.as_view({'post': 'create'})
+    )),
+    path('api/posts/like-state/', AsyncLikeStateView.as_view()),
+    path('api/posts/<int:pk>/like/', AsyncPostLikeView.as_view()),
+    path('api/posts/community/<int:community_id>/', AsyncCommunityPostListView.as_view()),
+    path('api/posts/feed/events/', AsyncHomeFeedEventsView.as_view()),
+    path('api/posts/community/<int:community_id>/events/', AsyncCommunityEventsView.as_view()),
+    *sync_urlpatterns,
+]
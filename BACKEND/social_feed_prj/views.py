@@ -0,0 +1,50 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from . import cache as feed_cache
+from . import instrumentation
+
+
+class CacheStatsView(APIView):
+    """
+    GET /api/cache/stats/
+    Hit/miss counters of the read-endpoint payload cache (admin only).
+
+    DELETE /api/cache/stats/
+    Reset the counters.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            'enabled': feed_cache.is_enabled(),
+            'timeout': feed_cache.get_timeout(),
+            'kinds': feed_cache.get_stats(),
+        })
+
+    def delete(self, request):
+        feed_cache.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricsView(APIView):
+    """
+    GET /api/metrics/
+    Query count and latency histograms per endpoint, for this process
+    (admin only).
+
+    DELETE /api/metrics/
+    Reset the histograms.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            'enabled': instrumentation.is_enabled(),
+            'endpoints': instrumentation.get_stats(),
+        })
+
+    def delete(self, request):
+        instrumentation.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
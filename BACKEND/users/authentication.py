@@ -0,0 +1,124 @@
+"""
+Stateless JWT authentication.
+
+simplejwt's JWTAuthentication loads the user row on every request. Here the
+request user is built from the access token instead: a ClaimsUser holding
+the id and username claims, with every other field deferred until a view
+reads it. Blacklisted tokens and inactive users are rejected through the
+in-memory snapshot in users.revocation, so authenticating a request does not
+touch the database. A username changed on the profile reaches the claims at
+the next login; views that show the viewer's own profile load the full user.
+
+StreamTicket is the credential of the event streams, which browsers can only
+authenticate through the URL (see social_feed_prj.async_api).
+"""
+from datetime import timedelta
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+from django.conf import settings
+from . import revocation
+from .models import ClaimsUser
+
+USERNAME_CLAIM = 'username'
+# Expiry of the access token a stream ticket was issued for
+SESSION_EXPIRY_CLAIM = 'session_exp'
+
+
+def token_pair(user):
+    """Refresh and access tokens for `user`, carrying the claims read below."""
+    refresh = RefreshToken.for_user(user)
+    refresh[USERNAME_CLAIM] = user.username
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+class StreamTicket(Token):
+    """
+    A short-lived token that only opens event streams, so that the access
+    token never appears in a URL (and in proxy and access logs). It shares
+    the jti of the access token it was issued for, so blacklisting that
+    token at logout revokes it too, and carries that token's expiry.
+    """
+    token_type = 'stream'
+
+    @property
+    def lifetime(self):
+        return timedelta(seconds=getattr(settings, 'FEED_EVENTS_TICKET_LIFETIME', 30))
+
+    @classmethod
+    def for_access_token(cls, access_token):
+        ticket = cls()
+        for claim in (jwt_settings.USER_ID_CLAIM, USERNAME_CLAIM, jwt_settings.JTI_CLAIM):
+            if claim in access_token:
+                ticket[claim] = access_token[claim]
+        ticket[SESSION_EXPIRY_CLAIM] = access_token['exp']
+        return ticket
+
+
+def session_expiry(validated_token):
+    """When access through `validated_token` ends, in seconds since the epoch."""
+    return validated_token.get(SESSION_EXPIRY_CLAIM, validated_token['exp'])
+
+
+def user_from_claims(validated_token):
+    """A ClaimsUser with the token's id and, when present, username loaded."""
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError as e:
+        raise InvalidToken('Token contained no recognizable user identification') from e
+    claims = {
+        jwt_settings.USER_ID_FIELD: ClaimsUser._meta.get_field(jwt_settings.USER_ID_FIELD).to_python(user_id),
+        # Only users that passed the revocation check get here
+        'is_active': True,
+    }
+    if USERNAME_CLAIM in validated_token:
+        claims['username'] = validated_token[USERNAME_CLAIM]
+    fields = [field for field in ClaimsUser._meta.concrete_fields if field.attname in claims]
+    return ClaimsUser.from_db(
+        'default', [field.attname for field in fields], [claims[field.attname] for field in fields]
+    )
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication without the per-request user query."""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation.is_revoked(validated_token):
+            raise InvalidToken('Token is blacklisted')
+        return validated_token
+
+    def get_user(self, validated_token):
+        return user_from_claims(validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate for async views; returns ``(user, token)`` or None."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        # Decode only: the revocation check may need to reload asynchronously
+        return await self.aauthenticate_token(JWTAuthentication.get_validated_token(self, raw_token))
+
+    async def aauthenticate_token(self, validated_token):
+        """``(user, token)`` for a decoded token, unless it was revoked."""
+        if await revocation.ais_revoked(validated_token):
+            raise InvalidToken('Token is blacklisted')
+        return self.get_user(validated_token), validated_token
+
+
+def full_user(user):
+    """`user` with all of its fields loaded, e.g. to serialize or save it."""
+    deferred = user.get_deferred_fields()
+    if deferred:
+        # One attribute read loads every deferred field (ClaimsUser.refresh_from_db)
+        getattr(user, next(iter(deferred)))
+    return user
+
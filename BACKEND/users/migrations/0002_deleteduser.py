@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedUser',
+            fields=[
+                ('user_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
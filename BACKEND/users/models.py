@@ -1,3 +1,62 @@
+from rest_framework.exceptions import AuthenticationFailed
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
+from social_feed_prj import cache as feed_cache
 
-# Create your models here.
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def cached_user_values(user_id):
+    """
+    Every column of a user row, from the cache when it was loaded within
+    AUTH_USER_CACHE_TIMEOUT seconds; saving the user evicts it.
+    """
+    cache = feed_cache.get_cache()
+    key = user_cache_key(user_id)
+    values = cache.get(key)
+    if values is None:
+        values = User.objects.filter(pk=user_id).values(
+            *(field.attname for field in User._meta.concrete_fields)
+        ).first()
+        if values is None:
+            raise User.DoesNotExist('User not found')
+        cache.set(key, values, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return values
+
+
+class ClaimsUser(User):
+    """
+    A User built from access token claims by users.authentication, without
+    a query. Fields missing from the token are deferred; reading any of them
+    fills them all in from cached_user_values.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is None or from_queryset is not None or not deferred.issuperset(fields):
+            return super().refresh_from_db(using, fields, from_queryset)
+        try:
+            values = cached_user_values(self.pk)
+        except User.DoesNotExist as e:
+            # Deleted after the token was issued; this process's revocation
+            # snapshot has not caught up yet
+            raise AuthenticationFailed('User not found', code='user_not_found') from e
+        for attname, value in values.items():
+            if attname in deferred:
+                self.__dict__[attname] = value
+
+
+class DeletedUser(models.Model):
+    """
+    Tombstone of a deleted user, kept while access tokens issued before the
+    deletion can still be valid, so users.revocation rejects them.
+    """
+    user_id = models.IntegerField(primary_key=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
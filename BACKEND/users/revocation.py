@@ -0,0 +1,147 @@
+"""
+In-memory revocation list for stateless authentication.
+
+users.authentication never reads the database to authenticate a request, so
+it needs another way to reject access tokens that were blacklisted at logout
+and tokens of deactivated or deleted users. Each process keeps a snapshot of both sets
+and checks every token against it. A generation number in the cache (see
+social_feed_prj.cache) is bumped, after commit, whenever either set changes;
+a process that sees a new generation reloads its snapshot once. Processes
+that do not share that cache (e.g. with the default locmem backend) miss the
+bump, so a snapshot is also reloaded once it is AUTH_REVOCATION_MAX_AGE
+seconds old: that bounds how long another worker accepts a revoked token.
+
+Only blacklisted tokens that expire within ACCESS_TOKEN_LIFETIME can be
+access tokens, so refresh tokens blacklisted by rotation neither enter the
+snapshot nor trigger reloads. Deleted users are remembered by a DeletedUser
+tombstone for ACCESS_TOKEN_LIFETIME, the longest their tokens stay valid.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from social_feed_prj import cache as feed_cache
+from .models import DeletedUser
+
+Snapshot = namedtuple('Snapshot', 'generation jtis user_ids loaded_at')
+
+SCOPE = 'auth-revocations'
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def get_max_age():
+    return getattr(settings, 'AUTH_REVOCATION_MAX_AGE', 5)
+
+
+def access_horizon():
+    """Blacklisted tokens expiring before this may be access tokens."""
+    return timezone.now() + jwt_settings.ACCESS_TOKEN_LIFETIME
+
+
+def tombstone_horizon():
+    """Access tokens of users deleted before this have all expired."""
+    return timezone.now() - jwt_settings.ACCESS_TOKEN_LIFETIME
+
+
+def load(generation):
+    jtis = BlacklistedToken.objects.filter(
+        token__expires_at__gt=timezone.now(), token__expires_at__lte=access_horizon()
+    ).values_list('token__jti', flat=True)
+    user_ids = [
+        *User.objects.filter(is_active=False).values_list('pk', flat=True),
+        *DeletedUser.objects.filter(deleted_at__gt=tombstone_horizon()).values_list('user_id', flat=True),
+    ]
+    # Token claims hold the user id as a string
+    return Snapshot(generation, frozenset(jtis), frozenset(map(str, user_ids)), time.monotonic())
+
+
+def is_stale(snapshot, generation):
+    return (
+        snapshot is None
+        or snapshot.generation != generation
+        or time.monotonic() - snapshot.loaded_at >= get_max_age()
+    )
+
+
+def reload(generation):
+    global _snapshot
+    with _lock:
+        if is_stale(_snapshot, generation):
+            _snapshot = load(generation)
+        return _snapshot
+
+
+def current():
+    """This process's snapshot, reloaded if the generation moved or it is too old."""
+    generation, = feed_cache.get_generations(feed_cache.get_cache(), [SCOPE])
+    snapshot = _snapshot
+    if is_stale(snapshot, generation):
+        snapshot = reload(generation)
+    return snapshot
+
+
+async def acurrent():
+    """current for async views."""
+    generation, = await feed_cache.aget_generations(feed_cache.get_cache(), [SCOPE])
+    snapshot = _snapshot
+    if is_stale(snapshot, generation):
+        snapshot = await sync_to_async(reload)(generation)
+    return snapshot
+
+
+def revoked_in(snapshot, token):
+    return (
+        token.get(jwt_settings.JTI_CLAIM) in snapshot.jtis
+        or str(token.get(jwt_settings.USER_ID_CLAIM)) in snapshot.user_ids
+    )
+
+
+def is_revoked(token):
+    return revoked_in(current(), token)
+
+
+async def ais_revoked(token):
+    return revoked_in(await acurrent(), token)
+
+
+def is_user_revoked(user_id):
+    """Whether the last loaded snapshot has the user as inactive."""
+    return _snapshot is not None and str(user_id) in _snapshot.user_ids
+
+
+def changed():
+    """Make processes sharing the cache reload their snapshot once the transaction commits."""
+    transaction.on_commit(lambda: feed_cache.invalidate(SCOPE))
+
+
+def user_deleted(user_id):
+    """Reject the tokens of a deleted user, and forget expired tombstones."""
+    DeletedUser.objects.filter(deleted_at__lte=tombstone_horizon()).delete()
+    DeletedUser.objects.update_or_create(user_id=user_id, defaults={'deleted_at': timezone.now()})
+    changed()
+
+
+def revoke(token, user_id):
+    """
+    Blacklist any token, e.g. the access token presented at logout, which
+    simplejwt cannot blacklist itself.
+    """
+    outstanding, _ = OutstandingToken.objects.get_or_create(
+        jti=token[jwt_settings.JTI_CLAIM],
+        defaults={
+            'user_id': user_id,
+            'token': str(token),
+            'expires_at': datetime_from_epoch(token['exp']),
+        },
+    )
+    BlacklistedToken.objects.get_or_create(token=outstanding)
@@ -1,10 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from social_feed_prj.fieldsets import SparseFieldsMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """Serializer for User model - read only."""
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer for User model - read only; ?fields= / ?omit= prune it."""
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'date_joined')
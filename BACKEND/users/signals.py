@@ -0,0 +1,35 @@
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from social_feed_prj import cache as feed_cache
+from . import revocation
+from .models import ClaimsUser, user_cache_key
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=ClaimsUser)
+def forget_user(sender, instance, **kwargs):
+    """Evict the cached row and track deactivation for token checks."""
+    feed_cache.get_cache().delete(user_cache_key(instance.pk))
+    if kwargs.get('created'):
+        return
+    if not instance.is_active or revocation.is_user_revoked(instance.pk):
+        revocation.changed()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=ClaimsUser)
+def track_deletion(sender, instance, **kwargs):
+    """Reject the deleted user's tokens in every process."""
+    revocation.user_deleted(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+@receiver(post_delete, sender=BlacklistedToken)
+def update_revocations(sender, instance, **kwargs):
+    """Reload revocation snapshots when an access token is (un)blacklisted."""
+    if instance.token.expires_at <= revocation.access_horizon():
+        revocation.changed()
@@ -1,3 +1,128 @@
-from django.test import TestCase
+import time
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from social_feed_prj.testing import clear_caches
+from . import revocation
+from .authentication import token_pair, user_from_claims
+
+
+class StatelessAuthenticationTests(TestCase):
+    """Requests authenticate from token claims, without reading the user."""
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='reader', email='reader@example.com')
+        self.tokens = token_pair(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def test_login_tokens_carry_the_username(self):
+        self.user.set_password('s3cret-pass')
+        self.user.save()
+        response = APIClient().post('/api/auth/login/', {'username': 'reader', 'password': 's3cret-pass'})
+        self.assertEqual(AccessToken(response.data['tokens']['access'])['username'], 'reader')
+
+    def test_user_is_built_from_claims(self):
+        user = user_from_claims(AccessToken(self.tokens['access']))
+        self.assertIsInstance(user, User)
+        self.assertEqual((user.pk, user.username, user.is_authenticated), (self.user.pk, 'reader', True))
+        self.assertEqual(user.get_deferred_fields() & {'id', 'username'}, set())
+
+    def test_reads_do_not_query_the_user(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries.captured_queries if 'FROM "auth_user"' in query['sql']])
+
+    def test_other_fields_load_once_and_are_cached(self):
+        token = AccessToken(self.tokens['access'])
+        with self.assertNumQueries(1):
+            user = user_from_claims(token)
+            self.assertEqual((user.email, user.date_joined), (self.user.email, self.user.date_joined))
+        with self.assertNumQueries(0):
+            self.assertEqual(user_from_claims(token).email, 'reader@example.com')
+
+    def test_profile_sparse_fieldset(self):
+        response = self.client.get('/api/auth/profile/?omit=email,date_joined')
+        self.assertEqual(list(response.data), ['id', 'username', 'first_name', 'last_name'])
+
+    def test_profile_reads_and_updates_the_full_user(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').data['email'], 'reader@example.com')
+        response = self.client.patch('/api/auth/profile/', {'email': 'new@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.email, self.user.username), ('new@example.com', 'reader'))
+        # Saving evicted the cached row
+        self.assertEqual(self.client.get('/api/auth/profile/').data['email'], 'new@example.com')
+
+    def test_logout_revokes_the_access_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/logout/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        # Other sessions of the same user keep working
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.assertEqual(other.get('/api/auth/profile/').status_code, 200)
+
+    @contextmanager
+    def other_process(self):
+        """Run as another worker: its own locmem cache and revocation snapshot."""
+        other_cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'other-process'}
+        with override_settings(CACHES={'default': other_cache}), \
+                mock.patch.object(revocation, '_snapshot', self.other_snapshot):
+            yield
+            self.other_snapshot = revocation._snapshot
+
+    def test_other_processes_reject_revoked_tokens_within_max_age(self):
+        self.other_snapshot = None
+        with self.other_process():
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/auth/logout/', {'refresh': self.tokens['refresh']})
+        with self.other_process():
+            # The generation bump never reached this process's cache
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+            later = time.monotonic() + revocation.get_max_age()
+            with mock.patch.object(revocation.time, 'monotonic', return_value=later):
+                self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_deactivated_users_are_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = True
+            self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+    def test_deleted_users_are_rejected(self):
+        self.other_snapshot = None
+        with self.other_process():
+            self.assertFalse(revocation.is_revoked(AccessToken(self.tokens['access'])))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        response = self.client.post('/api/communities/', {'name': 'Orphans', 'description': 'None'})
+        self.assertEqual(response.status_code, 401)
+        with self.other_process():
+            # Before its snapshot reloads, the missing row still fails authentication
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+            later = time.monotonic() + revocation.get_max_age()
+            with mock.patch.object(revocation.time, 'monotonic', return_value=later):
+                self.assertTrue(revocation.is_revoked(AccessToken(self.tokens['access'])))
+
+    def test_refresh_rotation_keeps_the_revocation_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = APIClient().post('/api/auth/token/refresh/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(RefreshToken(response.data['refresh'])['username'], 'reader')
@@ -1,6 +1,6 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import UserRegistrationView, UserLoginView, UserProfileView, UserLogoutView
+from .views import StreamTicketView, UserRegistrationView, UserLoginView, UserProfileView, UserLogoutView
 
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='user-register'),
@@ -8,4 +8,5 @@ urlpatterns = [
     path('logout/', UserLogoutView.as_view(), name='user-logout'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('stream-ticket/', StreamTicketView.as_view(), name='stream-ticket'),
 ]
@@ -5,6 +5,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from . import revocation
+from .authentication import StreamTicket, full_user, token_pair
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
 
 
@@ -22,15 +24,9 @@ class UserRegistrationView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         
-        # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
-        
         return Response({
             'user': UserSerializer(user).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            },
+            'tokens': token_pair(user),
             'message': 'User registered successfully'
         }, status=status.HTTP_201_CREATED)
 
@@ -57,15 +53,9 @@ class UserLoginView(APIView):
                 'error': 'Invalid credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
-        
         return Response({
             'user': UserSerializer(user).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            },
+            'tokens': token_pair(user),
             'message': 'Login successful'
         }, status=status.HTTP_200_OK)
 
@@ -82,13 +72,31 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
 
     def get_object(self):
-        return self.request.user
+        # The request user only holds the token's claims
+        return full_user(self.request.user)
+
+
+class StreamTicketView(APIView):
+    """
+    POST /api/auth/stream-ticket/
+    Issue a short-lived ticket opening the event streams (``?ticket=``),
+    which browsers cannot authenticate with a header.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        ticket = StreamTicket.for_access_token(request.auth)
+        return Response({
+            'ticket': str(ticket),
+            'expires_in': int(ticket.lifetime.total_seconds()),
+        }, status=status.HTTP_201_CREATED)
 
 
 class UserLogoutView(APIView):
     """
     POST /api/auth/logout/
-    Logout user by blacklisting refresh token.
+    Logout user by blacklisting the refresh token and the access token
+    used for this request.
     """
     permission_classes = (IsAuthenticated,)
 
@@ -98,6 +106,8 @@ class UserLogoutView(APIView):
             if refresh_token:
                 token = RefreshToken(refresh_token)
                 token.blacklist()
+            if request.auth is not None:
+                revocation.revoke(request.auth, request.user.pk)
             return Response({
                 'message': 'Logout successful'
             }, status=status.HTTP_200_OK)
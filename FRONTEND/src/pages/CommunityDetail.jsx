@@ -20,6 +20,22 @@ const CommunityDetail = () => {
     loadCommunityData();
   }, [id]);
 
+  // Live new posts and like counts while the page is open
+  useEffect(() => {
+    if (!community?.is_member) return;
+    const events = postsAPI.communityEvents(id);
+    events.addEventListener('post', (e) => {
+      const post = JSON.parse(e.data);
+      setPosts(current => current.some(p => p.id === post.id) ? current : [post, ...current]);
+    });
+    events.addEventListener('like', (e) => {
+      const { id: postId, like_count } = JSON.parse(e.data);
+      setPosts(current => current.map(p => p.id === postId ? { ...p, like_count } : p));
+    });
+    events.addEventListener('reset', () => loadCommunityData());
+    return () => events.close();
+  }, [id, community?.is_member]);
+
   const loadCommunityData = async () => {
     try {
       const communityRes = await communitiesAPI.getById(id);
@@ -68,6 +68,7 @@ export const authAPI = {
   logout: (refreshToken) => api.post('/auth/logout/', { refresh: refreshToken }),
   getProfile: () => api.get('/auth/profile/'),
   updateProfile: (data) => api.patch('/auth/profile/', data),
+  getStreamTicket: () => api.post('/auth/stream-ticket/'),
 };
 
 // Communities API
@@ -80,24 +81,43 @@ export const communitiesAPI = {
   join: (id) => api.post(`/communities/${id}/join/`),
   leave: (id) => api.post(`/communities/${id}/leave/`),
   getMembers: (id) => api.get(`/communities/${id}/members/`),
+  getRecommended: (limit = 20) => api.get(`/communities/recommended/?limit=${limit}`),
+};
+
+// EventSource cannot send headers, and URLs end up in access logs, so streams
+// are opened with a short-lived ticket instead of the access token. The server
+// sends a `close` event when the session behind it ends; open a new stream then.
+const openEvents = async (path) => {
+  const { data } = await authAPI.getStreamTicket();
+  return new EventSource(`${API_BASE_URL}${path}?ticket=${encodeURIComponent(data.ticket)}`);
 };
 
 // Posts API
+// Feeds are cursor-paginated: fetch the first page without `next`, then pass
+// the previous response's `data.next` URL to get the page after it.
 export const postsAPI = {
-  getAll: (page = 1, communityId = null) => {
-    const url = communityId 
-      ? `/posts/?community=${communityId}&page=${page}`
-      : `/posts/?page=${page}`;
-    return api.get(url);
-  },
-  getCommunityFeed: (communityId, page = 1) => 
-    api.get(`/posts/community/${communityId}/?page=${page}`),
+  getAll: (communityId = null, next = null) =>
+    api.get(next || (communityId ? `/posts/?community=${communityId}` : '/posts/')),
+  getCommunityFeed: (communityId, next = null) =>
+    api.get(next || `/posts/community/${communityId}/`),
   getById: (id) => api.get(`/posts/${id}/`),
   create: (data) => api.post('/posts/', data),
   update: (id, data) => api.patch(`/posts/${id}/`, data),
   delete: (id) => api.delete(`/posts/${id}/`),
   toggleLike: (id) => api.post(`/posts/${id}/like/`),
   getLikes: (id) => api.get(`/posts/${id}/likes/`),
+  getLikeState: (ids) => api.get(`/posts/like-state/?ids=${ids.join(',')}`),
+  // Server-Sent Events (ASGI only); these resolve to an EventSource
+  communityEvents: (communityId) => openEvents(`/posts/community/${communityId}/events/`),
+  feedEvents: () => openEvents('/posts/feed/events/'),
+};
+
+// Search API
+export const searchAPI = {
+  search: (query, { type = 'post', communityId = null, page = 1 } = {}) =>
+    api.get('/search/', {
+      params: { q: query, type, page, ...(communityId && { community: communityId }) },
+    }),
 };
 
 export default api;